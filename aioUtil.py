@@ -0,0 +1,154 @@
+#async 핸들러용 공통 유틸 (실행기 + 이벤트루프 멈춤 감시 + 비동기 TTL 캐시)
+#async def 안에서 requests / 동기 SDK / matplotlib / DTW 를 그대로 부르면 그동안 다른 사용자 요청이 전부 멈춘다.
+#블로킹 작업은 용도별 크기가 정해진 실행기로 보내고, 그래도 루프가 멈추면 어느 코루틴이 잡고 있었는지 로그로 남긴다.
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# 네트워크 대기(동기 HTTP, SDK 호출) 위주라 넉넉하게
+io_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="io")
+# 계산 위주(DTW 등). 코어 수 이상 돌려봐야 느려지기만 함
+cpu_executor = ThreadPoolExecutor(max_workers=max((os.cpu_count() or 2) - 1, 1), thread_name_prefix="cpu")
+# pyplot 은 전역 상태를 써서 스레드에 안전하지 않으므로 차트 그리기는 한 줄로 세움
+plot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plot")
+
+
+async def run_in(executor, func, *args, **kwargs):
+    """
+    동기 함수를 지정한 실행기에서 돌리고 결과를 기다린다 (이벤트 루프는 그동안 다른 요청 처리)
+    """
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    for executor in (io_executor, cpu_executor, plot_executor):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LoopStallMonitor:
+    """
+    이벤트 루프에 interval 마다 heartbeat 콜백을 걸어두고, 감시 스레드가 heartbeat 가 threshold 이상 늦어지면
+    그 순간 루프 스레드의 스택(sys._current_frames)과 실행중인 태스크(코루틴)를 경고 로그로 남긴다.
+    한 번 멈춘 동안에는 한 번만 남긴다.
+    """
+    def __init__(self, threshold=0.25, interval=0.05, logger=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.logger = logger or logging.getLogger("loop-stall")
+        self._loop = None
+        self._loop_thread_id = None
+        self._last_beat = None
+        self._handle = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._beat()
+        self._thread = threading.Thread(target=self._watch, name="loop-stall-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _describe_task(self):
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "<no task (callback)>"
+        coro = task.get_coro()
+        return "%s (%s)" % (task.get_name(), getattr(coro, "__qualname__", repr(coro)))
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.interval):
+            beat = self._last_beat
+            stalled = time.monotonic() - beat
+            if stalled < self.threshold:
+                continue
+            if reported == beat:
+                continue  # 같은 멈춤은 한번만
+            reported = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else '<no frame>'
+            self.logger.warning("Event loop stalled for %.3fs in task %s\n%s", stalled, self._describe_task(), stack)
+
+
+class SWRCache:
+    """
+    비동기 TTL 캐시 (stale-while-revalidate + 요청 합치기).
+    ttl 안이면 캐시값, ttl 이 지났어도 stale_ttl 안이면 캐시값을 바로 주고 백그라운드에서 한번만 다시 받아온다.
+    캐시가 없거나 너무 오래됐으면 받아올때까지 기다리는데, 같은 키를 동시에 요청한 쪽들은 upstream 호출 하나를 같이 기다린다.
+    실패한 결과는 캐시하지 않는다 (백그라운드 갱신 실패시엔 이전 값을 계속 씀).
+    """
+    def __init__(self, ttl, stale_ttl=0, maxsize=256, logger=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self.logger = logger or logging.getLogger("swr-cache")
+        self._entries = OrderedDict()  # key -> (값, 받아온 시각)
+        self._inflight = {}            # key -> 진행중인 upstream 호출 태스크
+
+    async def get(self, key, fetch):
+        """
+        fetch 는 인자 없는 코루틴 함수. key 에 대한 값을 돌려준다
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[1]
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[0]
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._start(key, fetch).add_done_callback(self._log_failure)
+                return entry[0]
+        task = self._inflight.get(key) or self._start(key, fetch)
+        # 기다리던 요청 하나가 취소돼도 같이 기다리는 다른 요청들의 upstream 호출은 계속 돌도록 shield
+        return await asyncio.shield(task)
+
+    def _start(self, key, fetch):
+        task = asyncio.create_task(self._fetch(key, fetch))
+        self._inflight[key] = task
+        return task
+
+    async def _fetch(self, key, fetch):
+        try:
+            value = await fetch()
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _log_failure(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error("Background refresh failed, serving stale value: %s", task.exception())
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
@@ -0,0 +1,128 @@
+#yahooNews 크롤러 처리량 벤치마크 (네트워크 없이 로컬 HTML stub 서버로 측정)
+#사용법: python bench/bench_crawler.py [기사 수] [기사당 지연 ms]
+#stub 서버는 Seeking Alpha 검색 결과 페이지(기사 링크 목록)와 기사 페이지를 흉내내고, ETag / If-None-Match 를 지원한다.
+#예전 방식(requests 로 검색 페이지 + 기사들을 하나씩 순서대로)과 NewsCrawler(worker 수별, 호스트별 요청 간격 제한 포함)를 비교하고,
+#같은 상태 파일로 한번 더 돌렸을때 검색 페이지는 304, 기사는 seen 으로 하나도 안 받고, 검색 결과 링크(links)는 그대로 나오는지 확인한다.
+import asyncio
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from httpPool import HttpPool
+from yahooNews import NewsCrawler
+
+ARTICLES = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+LATENCY = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+
+def search_page(n):
+    links = ''.join('<li><a data-test-id="post-list-item-title" href="/news/%d-bond-story-%d">Bond story %d</a></li>'
+                    % (4000000 + i, i, i) for i in range(n))
+    return '<html><body><ul>%s</ul></body></html>' % links
+
+
+def article_page(article_id):
+    paragraphs = ''.join('<p>Treasury yields moved as investors weighed the Fed outlook, paragraph %d.</p>' % i for i in range(12))
+    return ('<html><head><meta property="og:title" content="Bond story %s">'
+            '<meta property="article:published_time" content="2024-03-01T08:00:00-05:00">'
+            '<meta property="og:image" content="https://static.seekingalpha.com/%s.jpg"></head>'
+            '<body><h1>Bond story %s</h1><div data-test-id="content-container">%s</div></body></html>'
+            % (article_id, article_id, article_id, paragraphs))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_GET(self):
+        if self.path.startswith('/search'):
+            body = search_page(ARTICLES)
+        elif self.path.startswith('/news/'):
+            time.sleep(LATENCY)  # 기사 페이지 응답 지연 흉내
+            body = article_page(self.path.split('/')[2].split('-')[0])
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        payload = body.encode('utf-8')
+        etag = '"%s"' % hashlib.md5(payload).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def legacy_crawl(base_url):
+    # 기존 scrape_finance_news 에 기사별 스크랩을 그대로 순서대로 붙인 경우
+    session = requests.Session()
+    soup = BeautifulSoup(session.get(base_url + '/search?q=bonds&tab=headlines').content, 'html.parser')
+    articles = []
+    for link in soup.select('a[data-test-id="post-list-item-title"]'):
+        page = BeautifulSoup(session.get(base_url + link['href']).content, 'html.parser')
+        articles.append(page.find('h1').get_text(strip=True))
+    return articles
+
+
+async def crawl(base_url, state_path, workers, rate):
+    pool = HttpPool(default_limit=workers, http2=False)
+    crawler = NewsCrawler(pool=pool, workers=workers, rate=rate, state_path=state_path, base_url=base_url)
+    try:
+        return await crawler.crawl('bonds')
+    finally:
+        await pool.aclose()
+
+
+def report(name, seconds, fetched):
+    print('%-38s %7.2f s  %6.1f articles/s' % (name, seconds, fetched / seconds if seconds else 0))
+
+
+if __name__ == '__main__':
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://127.0.0.1:%d' % server.server_address[1]
+    state_dir = tempfile.mkdtemp()
+    print('stub server %s, %d articles, %d ms per article' % (base_url, ARTICLES, LATENCY * 1000))
+    try:
+        started = time.perf_counter()
+        legacy = legacy_crawl(base_url)
+        report('legacy (sequential requests)', time.perf_counter() - started, len(legacy))
+
+        for workers, rate in [(1, 0), (8, 0), (32, 0), (32, 50)]:
+            state_path = os.path.join(state_dir, 'state_%d_%d.json' % (workers, rate))
+            result = asyncio.run(crawl(base_url, state_path, workers, rate))
+            assert result['meta']['fetched'] == ARTICLES and result['meta']['errors'] == 0, result['meta']
+            assert sorted(item['attributes']['title'] for item in result['data']) == sorted(legacy)
+            name = 'crawler workers=%d%s' % (workers, ', %d req/s per host' % rate if rate else '')
+            report(name, result['meta']['seconds'], result['meta']['fetched'])
+
+        # 같은 상태로 다시: 검색 페이지 304, 기사 요청 0, 링크 목록은 지난번 그대로
+        result = asyncio.run(crawl(base_url, state_path, 32, 50))
+        again = result['meta']
+        assert again['search_not_modified'] == 1 and again['fetched'] == 0, again
+        assert len(result['links']) == ARTICLES, len(result['links'])
+        print('repeat run: search 304=%d, articles fetched=%d, %.3f s' % (
+            again['search_not_modified'], again['fetched'], again['seconds']))
+    finally:
+        server.shutdown()
+        shutil.rmtree(state_dir)
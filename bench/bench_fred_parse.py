@@ -0,0 +1,82 @@
+#fredAll 관측치 파서 벤치마크 (네트워크 없이 FRED 응답 fixture 로 측정)
+#사용법: python bench/bench_fred_parse.py [FRED all-releases XML 파일]
+#파일을 안 주면 GDP all-releases 규모(약 300개 분기 x 100개 빈티지)의 fixture 를 만들어서 씀
+import os
+import sys
+import json
+import time
+import xml.etree.ElementTree as ET
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import fredAll
+
+FIELDS = ['realtime_start', 'date', 'value']
+
+
+def make_fixture(n_dates=300, n_vintages=100):
+    dates = pd.date_range('1947-01-01', periods=n_dates, freq='QS')
+    vintages = pd.date_range('1991-12-04', periods=n_vintages, freq='MS')
+    rows = []
+    for d in dates.strftime('%Y-%m-%d'):
+        for i, v in enumerate(vintages.strftime('%Y-%m-%d')):
+            value = '.' if i == 0 else '%.1f' % (1000 + i)
+            rows.append({'realtime_start': v, 'realtime_end': '9999-12-31', 'date': d, 'value': value})
+    xml = ['<?xml version="1.0" encoding="utf-8" ?>\n<observations count="%d">' % len(rows)]
+    xml += ['<observation realtime_start="%(realtime_start)s" realtime_end="%(realtime_end)s" '
+            'date="%(date)s" value="%(value)s"/>' % row for row in rows]
+    xml.append('</observations>')
+    return '\n'.join(xml).encode('utf-8'), json.dumps({'observations': rows}).encode('utf-8')
+
+
+def legacy_parse(fred, raw):
+    # 기존 get_series_all_releases 방식: 관측치마다 _parse 두번 + dict-of-dicts 를 transpose
+    root = ET.fromstring(raw)
+    data = {}
+    for i, child in enumerate(root):
+        val = child.get('value')
+        val = float('NaN') if val == fred.nan_char else float(val)
+        data[i] = {'realtime_start': fred._parse(child.get('realtime_start')),
+                   'date': fred._parse(child.get('date')),
+                   'value': val}
+    return pd.DataFrame(data).T
+
+
+def iterparse_xml(fred, raw):
+    return fred._observations_frame(fred._iterparse_observations(BytesIO(raw), FIELDS))
+
+
+def parse_json(fred, raw):
+    observations = json.loads(raw)['observations']
+    return fred._observations_frame({field: [obs.get(field) for obs in observations] for field in FIELDS})
+
+
+def best_of(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == '__main__':
+    fred = fredAll.Fred(api_key='bench')
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            xml_raw = f.read()
+        json_raw = None
+    else:
+        xml_raw, json_raw = make_fixture()
+
+    legacy_time, legacy = best_of(legacy_parse, fred, xml_raw, repeat=1)
+    xml_time, parsed = best_of(iterparse_xml, fred, xml_raw)
+    print('rows: %d' % len(parsed))
+    print('legacy loop   : %8.3f s' % legacy_time)
+    print('iterparse xml : %8.3f s  (x%.1f)' % (xml_time, legacy_time / xml_time))
+    if json_raw is not None:
+        json_time, _ = best_of(parse_json, fred, json_raw)
+        print('json          : %8.3f s  (x%.1f)' % (json_time, legacy_time / json_time))
+    assert len(legacy) == len(parsed)
@@ -0,0 +1,126 @@
+#네이버 뉴스 HTML 파서 벤치마크 + 회귀 확인 (네트워크 없이 bench/fixtures 의 저장된 HTML 로 측정)
+#사용법: python bench/bench_naver_parse.py [fixture 디렉토리]
+#예전 방식(전체 페이지 html.parser + 항목마다 select_one/find)과 naverParse(lxml + SoupStrainer + 컴파일된 셀렉터)를 비교하고,
+#두 결과가 같은지도 확인한다. 네이버 마크업이 바뀌면 새 페이지를 fixtures 에 저장해서 돌려보면 된다.
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup, NavigableString
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import naverParse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# fixture 파일 -> 그 페이지를 가져올때 쓰는 url (메인뉴스/실시간 분기용)
+PAGES = {
+    'naver_mainnews.html': 'https://finance.naver.com/news/mainnews.naver',
+    'naver_realtime.html': 'https://finance.naver.com/news/news_list.naver?mode=LSS2D&section_id=101&section_id2=258',
+}
+ARTICLE = 'naver_article.html'
+
+
+def legacy_news_list(html, url):
+    # 기존 fetch_naver_finance_news 의 파싱 부분
+    soup = BeautifulSoup(html, 'html.parser')
+    news_items = []
+    if 'mainnews.naver' in url:
+        news_section = soup.find('div', class_='mainNewsList')
+        for item in news_section.find_all('li', class_='block1'):
+            thumb_element = item.select_one('.thumb img')
+            article_subject_element = item.select_one('dd.articleSubject a')
+            if article_subject_element:
+                article_subject = article_subject_element.get_text(strip=True)
+                article_link = article_subject_element['href']
+            else:
+                article_subject, article_link = None, None
+            article_summary_element = item.select_one('dd.articleSummary')
+            if article_summary_element:
+                summary = ''.join([str(child) for child in article_summary_element.contents if type(child) == NavigableString]).strip()
+            else:
+                summary = None
+            news_items.append({
+                "thumb_url": thumb_element['src'] if thumb_element else None,
+                "article_subject": article_subject,
+                "article_link": article_link,
+                "summary": summary,
+                "press": item.select_one('.press').get_text(strip=True) if item.select_one('.press') else None,
+                "wdate": item.select_one('.wdate').get_text(strip=True) if item.select_one('.wdate') else None,
+            })
+        return news_items
+    for li in soup.select('ul.realtimeNewsList > li'):
+        for dl in li.find_all('dl'):
+            thumb_url, article_subject, article_link = None, '', ''
+            for element in dl.find_all(['dt', 'dd']):
+                if element.name == 'dt' and 'thumb' in element.get('class', []):
+                    thumb_url = element.find('img')['src'] if element.find('img') else None
+                elif element.name == 'dt' and 'articleSubject' in element.get('class', []):
+                    thumb_url = None
+                    article_subject = element.find('a').get('title', '')
+                    article_link = "https://news.naver.com" + element.find('a')['href']
+                elif 'articleSubject' in element.get('class', []):
+                    article_subject = element.find('a').get('title', '')
+                    article_link = "https://news.naver.com" + element.find('a')['href']
+                elif 'articleSummary' in element.get('class', []):
+                    news_items.append({
+                        "thumb_url": thumb_url,
+                        "article_subject": article_subject,
+                        "article_link": article_link,
+                        "summary": element.contents[0].strip() if element.contents else '',
+                        "press": element.find('span', class_='press').text if element.find('span', class_='press') else '',
+                        "wdate": element.find('span', class_='wdate').text if element.find('span', class_='wdate') else '',
+                    })
+    return news_items
+
+
+def legacy_news_detail(html):
+    # 기존 fetch_news_detail 의 파싱 부분
+    soup = BeautifulSoup(html, 'html.parser')
+    newsct_article = soup.find('div', id='newsct_article')
+    dic_area = newsct_article.find('article', id='dic_area') if newsct_article is not None else None
+    return dic_area.decode_contents() if dic_area is not None else None
+
+
+def _unmangle(items):
+    # html.parser 는 링크의 '&section_id' 를 '&sect' 엔티티로 보고 '§ion_id' 로 바꿔버림 (lxml 은 그대로 둠). 그 차이만 맞춰서 비교
+    return [dict(item, article_link=item['article_link'].replace('\u00a7', '&sect')) if item.get('article_link') else item
+            for item in items]
+
+
+def _squash(html):
+    # 파서마다 태그 직렬화(<br> vs <br/>)나 공백이 조금 달라서 비교할때는 clean_html_content 처럼 공백만 정리
+    return ' '.join(html.replace('<br/>', '<br>').split()) if html is not None else None
+
+
+def best_of(func, *args, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(name, size, legacy_time, fast_time):
+    print('%-22s %7.1f KB  legacy %7.2f ms | lxml+strainer %7.2f ms  (x%.1f)' % (
+        name, size / 1024, legacy_time * 1000, fast_time * 1000, legacy_time / fast_time))
+
+
+if __name__ == '__main__':
+    fixtures = sys.argv[1] if len(sys.argv) > 1 else FIXTURES
+    for name, url in PAGES.items():
+        with open(os.path.join(fixtures, name), encoding='utf-8') as f:
+            html = f.read()
+        legacy_time, legacy = best_of(legacy_news_list, html, url)
+        fast_time, fast = best_of(naverParse.parse_news_list, html, url)
+        assert fast == _unmangle(legacy), '%s: parsed items differ from the legacy parser' % name
+        assert fast, '%s: no items parsed, markup may have changed' % name
+        report('%s (%d)' % (name, len(fast)), len(html.encode('utf-8')), legacy_time, fast_time)
+
+    with open(os.path.join(fixtures, ARTICLE), encoding='utf-8') as f:
+        html = f.read()
+    legacy_time, legacy = best_of(legacy_news_detail, html)
+    fast_time, fast = best_of(naverParse.parse_news_detail, html)
+    assert fast is not None, '%s: article body not found, markup may have changed' % ARTICLE
+    assert _squash(fast) == _squash(legacy), '%s: article body differs from the legacy parser' % ARTICLE
+    report(ARTICLE, len(html.encode('utf-8')), legacy_time, fast_time)
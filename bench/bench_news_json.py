@@ -0,0 +1,107 @@
+#뉴스 파이프라인 직렬화 벤치마크 (네트워크 없이 Seeking Alpha 응답 fixture 100건으로 측정)
+#사용법: python bench/bench_news_json.py [Seeking Alpha news/v2/list 응답 json 파일]
+#예전 방식: extract_news_data 가 json.dumps(indent=4) 문자열을 만들고, JSONResponse 가 그 문자열을 한번 더 인코딩,
+#          /gptRequest 는 문자열로 돌아온 g_news 를 다시 json.loads.
+#지금 방식: NewsRecord 리스트를 그대로 들고 있다가 orjson 으로 한번만 직렬화, /gptRequest 는 리스트를 그대로 받음.
+#지금 방식은 newbond 의 extract_news_data / ORJSONResponse / extract_title_and_content 를 그대로 불러서 잰다
+#(예전 방식은 코드에서 없어졌으므로 여기 남겨둔 것으로). newbond 는 import 시점에 config 키를 읽으므로 없으면 빈 값으로 채운다.
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # newbond 가 static/템플릿 디렉터리를 상대경로로 씀
+
+import config
+
+for key in ('RAPID_API_KEY', 'FRED_API_KEY', 'FINNHUB_KEY', 'OPENAI_API_KEY', 'NAVER_API_KEY', 'NAVER_SECRET'):
+    if not hasattr(config, key):
+        setattr(config, key, '')
+
+from fastapi.responses import ORJSONResponse
+from newbond import extract_news_data, extract_title_and_content
+
+
+def make_fixture(n=100, paragraphs=8):
+    rng = random.Random(0)
+    words = ('Treasury yields rose as the "Fed" signalled higher-for-longer rates; investors — wary of inflation — '
+             'sold bonds, while equities slipped and the dollar firmed').split()
+    data = []
+    for i in range(n):
+        content = '\n'.join('<p>%s <a href="https://seekingalpha.com/symbol/TLT">TLT</a></p>'
+                            % ' '.join(rng.choice(words) for _ in range(40)) for _ in range(paragraphs))
+        data.append({'id': str(4000000 + i), 'type': 'news', 'attributes': {
+            'publishOn': '2024-03-%02dT08:%02d:00-04:00' % (1 + i % 28, i % 60),
+            'gettyImageUrl': 'https://static.seekingalpha.com/cdn/s3/uploads/getty_images/%d/image.jpg' % i,
+            'title': ' '.join(rng.choice(words) for _ in range(10)),
+            'content': content, 'isLockedPro': False, 'commentCount': i}})
+    return {'data': data}
+
+
+def legacy_extract(news_json):
+    extracted_data = []
+    for item in news_json['data']:
+        news_item = item['attributes']
+        extracted_data.append({'publishOn': news_item.get('publishOn', None),
+                               'gettyImageUrl': news_item.get('gettyImageUrl', None),
+                               'title': news_item.get('title', None),
+                               'content': news_item.get('content', None)})
+    return json.dumps(extracted_data, indent=4, ensure_ascii=False)
+
+
+def legacy_response(news_json):
+    # JSONResponse.render 와 같은 인코딩 (문자열을 다시 JSON 문자열로)
+    body = json.dumps(legacy_extract(news_json), ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(',', ':')).encode('utf-8')
+    return body
+
+
+def legacy_gpt_request(body):
+    # 클라이언트가 JSON.parse(g_news) 하고 g_news(문자열)를 그대로 돌려보냄 -> 요청 파싱 + extract_title_and_content 의 json.loads
+    g_news = json.loads(body)
+    request = json.dumps({'action': 'summarize', 'g_news': g_news}).encode('utf-8')
+    news = json.loads(json.loads(request)['g_news'])
+    return [{'title': item['title'], 'content': item['content']} for item in news]
+
+
+def new_response(news_json):
+    return ORJSONResponse(extract_news_data(news_json)).body
+
+
+def new_gpt_request(body):
+    g_news = json.loads(body)
+    request = json.dumps({'action': 'summarize', 'g_news': g_news}).encode('utf-8')
+    return extract_title_and_content(json.loads(request)['g_news'])
+
+
+def best_of(func, *args, repeat=50):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            news_json = json.load(f)
+    else:
+        news_json = make_fixture()
+
+    legacy_time, legacy_body = best_of(legacy_response, news_json)
+    new_time, new_body = best_of(new_response, news_json)
+    legacy_gpt_time, legacy_digest = best_of(legacy_gpt_request, legacy_body)
+    new_gpt_time, new_digest = best_of(new_gpt_request, new_body)
+    assert legacy_digest == new_digest
+
+    print('articles: %d' % len(news_json['data']))
+    print('/seekingNews response  legacy %8.2f ms %9d bytes | orjson %8.2f ms %9d bytes  (x%.1f, -%.0f%% bytes)' % (
+        legacy_time * 1000, len(legacy_body), new_time * 1000, len(new_body),
+        legacy_time / new_time, 100 * (1 - len(new_body) / len(legacy_body))))
+    print('/gptRequest round trip legacy %8.2f ms | single decode %8.2f ms  (x%.1f)' % (
+        legacy_gpt_time * 1000, new_gpt_time * 1000, legacy_gpt_time / new_gpt_time))
@@ -0,0 +1,70 @@
+#서버 콜드스타트 벤치마크 (python -X importtime 기반)
+#사용법: python bench/bench_startup.py [--json 결과파일]
+#newbond 를 import 하는데 드는 시간과, 라우트 그룹별로 첫 요청때 추가로 로딩되는 모듈 시간을 따로 잰다.
+#결과를 json 으로 남겨두면 이전 결과와 비교해서 콜드스타트가 느려졌는지 확인할 수 있다.
+import os
+import re
+import sys
+import json
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# 라우트 그룹 -> 그 그룹의 첫 요청때 lazy import 되는 모듈들
+ROUTE_GROUPS = {
+    'economic/bonds (FRED, parquet)': ['pyarrow.parquet'],
+    'fingpt charts (matplotlib, yfinance, finnhub)': ['matplotlib.pyplot', 'yfinance', 'finnhub'],
+    'gpt (openai)': ['openai'],
+    'ocr (google vision)': ['google.cloud.vision', 'google.oauth2.service_account'],
+    'similar period (dtaidistance, yfinance)': ['dtaidistance.dtw', 'yfinance'],
+}
+
+LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S.*)$')
+
+
+def import_time_us(modules):
+    """
+    새 인터프리터에서 modules 를 import 하고 -X importtime 의 self 시간을 모두 더한 값(us)
+    """
+    code = '; '.join('import %s' % module for module in modules)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    total = 0
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            total += int(match.group(1))
+    return total
+
+
+def best_of(modules, repeat=3):
+    return min(import_time_us(modules) for _ in range(repeat))
+
+
+if __name__ == '__main__':
+    results = {}
+    base = best_of(['newbond'])
+    results['import newbond'] = base
+    print('%-50s %8.1f ms' % ('import newbond', base / 1000))
+    for group, modules in ROUTE_GROUPS.items():
+        try:
+            extra = best_of(['newbond'] + modules) - base
+        except RuntimeError as e:
+            print('%-50s   skipped (%s)' % (group, e))
+            continue
+        results[group] = extra
+        print('%-50s %+8.1f ms' % (group, extra / 1000))
+
+    if '--json' in sys.argv:
+        path = sys.argv[sys.argv.index('--json') + 1]
+        previous = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                previous = json.load(f)
+        for key, value in results.items():
+            if key in previous:
+                print('%-50s %+8.1f ms vs previous' % (key, (value - previous[key]) / 1000))
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
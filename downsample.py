@@ -0,0 +1,73 @@
+#차트 데이터 다운샘플링 (Largest-Triangle-Three-Buckets)
+#브라우저가 트레이스당 1~2천 포인트 이상은 어차피 못 보여주므로, 서버에서 화면 폭 기준으로 줄여서 내려준다.
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(y, n_out, x=None):
+    """
+    LTTB 알고리즘으로 y 에서 남길 포인트의 위치(정수 인덱스 배열)를 고른다.
+    첫 점과 마지막 점은 항상 남기고, 나머지는 버킷마다 직전 선택점/다음 버킷 평균과 만드는 삼각형 넓이가 가장 큰 점을 고른다.
+    NaN 인 점은 선택 대상에서 빠진다. n_out 이 2 면 첫 점과 마지막 점, 1 이면 마지막 점만.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(len(y), dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if n_out >= n:
+        return valid
+    if n_out < 3:
+        return valid[[0, -1]][-max(n_out, 1):]
+    xv, yv = x[valid], y[valid]
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    # 첫점/끝점을 뺀 나머지를 n_out-2 개 버킷으로 나눔
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = xv[next_start:next_end].mean()
+        avg_y = yv[next_start:next_end].mean()
+        area = np.abs((xv[prev] - avg_x) * (yv[start:end] - yv[prev])
+                      - (xv[prev] - xv[start:end]) * (avg_y - yv[prev]))
+        prev = start + int(area.argmax())
+        selected[i + 1] = prev
+    return valid[selected]
+
+
+def _positions(index):
+    # 날짜 인덱스면 실제 시간 간격을 x 로 씀 (휴장일 등 불규칙 간격 반영)
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8
+    return None
+
+
+def downsample_series(series, max_points):
+    """
+    max_points 이하로 줄인 Series 를 돌려준다. max_points 가 없거나 0 이하이면 그대로 돌려준다.
+    """
+    if not max_points or max_points <= 0 or len(series) <= max_points:
+        return series
+    idx = lttb_indices(series.to_numpy(dtype=np.float64, na_value=np.nan), max_points, _positions(series.index))
+    return series.iloc[idx]
+
+
+def downsample_frame(df, max_points, columns=None):
+    """
+    여러 컬럼이 같은 라벨(날짜)을 공유하는 패널용. 컬럼마다 LTTB 로 고른 행들의 합집합만 남겨서
+    전체 행 수가 max_points 를 넘지 않게 한다. columns 를 주면 그 컬럼들만 기준으로 행을 고른다.
+    """
+    if not max_points or max_points <= 0 or len(df) <= max_points:
+        return df
+    columns = list(df.columns) if columns is None else list(columns)
+    # 첫/끝 행은 컬럼들이 같이 쓰므로 컬럼당 2 + (max_points-2) // 컬럼수 개씩이면 합집합도 max_points 이하
+    budget = 2 + (max_points - 2) // max(len(columns), 1) if max_points >= 2 else 1
+    x = _positions(df.index)
+    keep = [lttb_indices(df[col].to_numpy(dtype=np.float64, na_value=np.nan), budget, x) for col in columns]
+    rows = np.unique(np.concatenate(keep)) if keep else np.arange(len(df))
+    if len(rows) > max_points:
+        # 컬럼마다 NaN 위치가 달라 첫/끝 행이 다를때: 고른 행들 중에서 고르게 max_points 개
+        rows = rows[np.unique(np.linspace(0, len(rows) - 1, max_points).round().astype(np.int64))]
+    return df.iloc[rows]
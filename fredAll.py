@@ -1,7 +1,10 @@
 
 import os
 import sys
+import io
+import json
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 if sys.version_info[0] >= 3:
     import urllib.request as url_request
     import urllib.parse as url_parse
@@ -12,8 +15,7 @@ else:
     import urllib2 as url_error
 
 import pandas as pd
-import plotly.express as px
-from pystlouisfed import FRED
+from fredCache import VintageStore
 #config 파일
 import config
 
@@ -28,17 +30,30 @@ class Fred:
     latest_realtime_end = '9999-12-31'
     nan_char = '.'
     max_results_per_request = 1000
+    max_concurrent_requests = 4
     root_url = 'https://api.stlouisfed.org/fred'
 
     def __init__(self,
                  api_key=None,
-                 api_key_file=None):
+                 api_key_file=None,
+                 file_type='xml',
+                 http_get=None):
         """
         Initialize the Fred class that provides useful functions to query the Fred dataset. You need to specify a valid
         API key in one of 3 ways: pass the string via api_key, or set api_key_file to a file with the api key in the
         first line, or set the environment variable 'FRED_API_KEY' to the value of your api key. You can sign up for a
         free api key on the Fred website at http://research.stlouisfed.org/fred2/
+
+        file_type selects the wire format used for observation endpoints: 'xml' (streamed with iterparse) or 'json'.
+
+        http_get is an optional callable taking a URL and returning a response with status_code and content (e.g. a
+        pooled keep-alive client's get). When it is not given every request opens a new connection with urlopen.
         """
+        if file_type not in ('xml', 'json'):
+            raise ValueError("file_type should be 'xml' or 'json'")
+        self.file_type = file_type
+        self.http_get = http_get
+        self._vintages = None
         #일웅's FRED api key         
         if api_key is not None:
             self.api_key = api_key
@@ -50,19 +65,93 @@ class Fred:
             raise ValueError(textwrap.dedent("""\
                     You need to set a valid API key."""))
 
-    def _fetch_data(self, url):
+    @property
+    def vintages(self):
         """
-        helper function for fetching data given a request URL
+        lazily created VintageStore that caches get_series_all_releases output per series id, so that first-release and
+        as-of queries are answered locally instead of downloading the full release history on every call
+        """
+        if self._vintages is None:
+            self._vintages = VintageStore(self)
+        return self._vintages
+
+    def _open(self, url):
+        """
+        helper function for opening a request URL. FRED error responses are raised as ValueError
         """
         url += '&api_key=' + self.api_key
+        if self.http_get is not None:
+            response = self.http_get(url)
+            if response.status_code >= 400:
+                self._raise_error(url, response.content)
+            return io.BytesIO(response.content)
         try:
-            response = urlopen(url)
-            root = ET.fromstring(response.read())
+            return urlopen(url)
         except HTTPError as exc:
-            root = ET.fromstring(exc.read())
-            raise ValueError(root.get('message'))
+            self._raise_error(url, exc.read())
+
+    @staticmethod
+    def _raise_error(url, body):
+        if 'file_type=json' in url:
+            raise ValueError(json.loads(body).get('error_message'))
+        raise ValueError(ET.fromstring(body).get('message'))
+
+    def _fetch_data(self, url):
+        """
+        helper function for fetching data given a request URL
+        """
+        with self._open(url) as response:
+            root = ET.fromstring(response.read())
         return root
 
+    def _fetch_json(self, url):
+        """
+        helper function for fetching data given a request URL, using FRED's file_type=json output
+        """
+        with self._open(url + '&file_type=json') as response:
+            return json.load(response)
+
+    @staticmethod
+    def _iterparse_observations(source, fields):
+        """
+        helper function for streaming <observation> elements out of a FRED XML response. Only collects the raw
+        attribute strings per field; conversion is left to _observations_frame so it runs once per column.
+        """
+        columns = {field: [] for field in fields}
+        appenders = [(field, columns[field].append) for field in fields]
+        for _, elem in ET.iterparse(source, events=('end',)):
+            if elem.tag == 'observation':
+                get = elem.get
+                for field, append in appenders:
+                    append(get(field))
+                elem.clear()
+        return columns
+
+    def _observations_frame(self, columns):
+        """
+        helper function for converting raw observation strings into a typed DataFrame with one vectorized
+        to_datetime / to_numeric call per column. FRED's missing value marker '.' becomes NaN.
+        """
+        data = pd.DataFrame(columns)
+        for field in data.columns:
+            if field == 'value':
+                data[field] = pd.to_numeric(data[field], errors='coerce')
+            else:
+                data[field] = pd.to_datetime(data[field], format='%Y-%m-%d')
+        return data
+
+    def _fetch_observations(self, url, fields):
+        """
+        helper function for fetching a series/observations URL into a DataFrame with the given fields as columns
+        """
+        if self.file_type == 'json':
+            observations = self._fetch_json(url).get('observations', [])
+            columns = {field: [obs.get(field) for obs in observations] for field in fields}
+        else:
+            with self._open(url) as response:
+                columns = self._iterparse_observations(response, fields)
+        return self._observations_frame(columns)
+
     def _parse(self, date_str, format='%Y-%m-%d'):
         """
         helper function for parsing FRED date string into datetime
@@ -87,7 +176,7 @@ class Fred:
             a pandas Series containing information about the Fred series
         """
         url = "%s/series?series_id=%s" % (self.root_url, series_id)
-        root = self.__fetch_data(url)
+        root = self._fetch_data(url)
         if root is None or not len(root):
             raise ValueError('No info exists for series id: ' + series_id)
         info = pd.Series(list(root)[0].attrib)
@@ -123,18 +212,8 @@ class Fred:
             url += '&observation_end=' + observation_end.strftime('%Y-%m-%d')
         if kwargs.keys():
             url += '&' + urlencode(kwargs)
-        root = self.__fetch_data(url)
-        if root is None:
-            raise ValueError('No data exists for series id: ' + series_id)
-        data = {}
-        for child in root:
-            val = child.get('value')
-            if val == self.nan_char:
-                val = float('NaN')
-            else:
-                val = float(val)
-            data[self._parse(child.get('date'))] = val
-        return pd.Series(data)
+        observations = self._fetch_observations(url, ['date', 'value'])
+        return pd.Series(observations['value'].to_numpy(), index=pd.DatetimeIndex(observations['date']))
 
     def get_series_latest_release(self, series_id):
         """
@@ -168,9 +247,7 @@ class Fred:
         data : Series
             a Series where each index is the observation date and the value is the data for the Fred series
         """
-        df = self.get_series_all_releases(series_id)
-        first_release = df.groupby('date').head(1)
-        data = first_release.set_index('date')['value']
+        data = self.vintages.first_release(series_id)
         return data
 
     def get_series_as_of_date(self, series_id, as_of_date):
@@ -190,9 +267,7 @@ class Fred:
         data : Series
             a Series where each index is the observation date and the value is the data for the Fred series
         """
-        as_of_date = pd.to_datetime(as_of_date)
-        df = self.get_series_all_releases(series_id)
-        data = df[df['realtime_start'] <= as_of_date]
+        data = self.vintages.releases_as_of(series_id, as_of_date)
         return data
 
     def get_series_all_releases(self, series_id, realtime_start=None, realtime_end=None):
@@ -227,27 +302,7 @@ class Fred:
                                                                                          series_id,
                                                                                          realtime_start,
                                                                                          realtime_end)
-        root = self.__fetch_data(url)
-        if root is None:
-            raise ValueError('No data exists for series id: ' + series_id)
-        data = {}
-        i = 0
-        for child in root:
-            val = child.get('value')
-            if val == self.nan_char:
-                val = float('NaN')
-            else:
-                val = float(val)
-            realtime_start = self._parse(child.get('realtime_start'))
-            # realtime_end = self._parse(child.get('realtime_end'))
-            date = self._parse(child.get('date'))
-
-            data[i] = {'realtime_start': realtime_start,
-                       # 'realtime_end': realtime_end,
-                       'date': date,
-                       'value': val}
-            i += 1
-        data = pd.DataFrame(data).T
+        data = self._fetch_observations(url, ['realtime_start', 'date', 'value'])
         return data
 
     def get_series_vintage_dates(self, series_id):
@@ -266,19 +321,65 @@ class Fred:
             list of vintage dates
         """
         url = "%s/series/vintagedates?series_id=%s" % (self.root_url, series_id)
-        root = self.__fetch_data(url)
+        root = self._fetch_data(url)
         if root is None:
             raise ValueError('No vintage date exists for series id: ' + series_id)
-        dates = []
-        for child in root:
-            dates.append(self._parse(child.text))
-        return dates
+        dates = pd.to_datetime([child.text for child in root], format='%Y-%m-%d')
+        return list(dates.to_pydatetime())
+
+    def get_series_release(self, series_id):
+        """
+        Get the release that a series belongs to, e.g. 'Consumer Price Index' (id 10) for 'CPIAUCSL'
+
+        Parameters
+        ----------
+        series_id : str
+            Fred series id such as 'CPIAUCSL'
+
+        Returns
+        -------
+        info : Series
+            a pandas Series containing the release 'id', 'name', 'press_release', 'link', etc.
+        """
+        url = "%s/series/release?series_id=%s" % (self.root_url, series_id)
+        root = self._fetch_data(url)
+        if root is None or not len(root):
+            raise ValueError('No release exists for series id: ' + series_id)
+        info = pd.Series(list(root)[0].attrib)
+        return info
+
+    def get_release_dates(self, release_id, realtime_start=None, include_release_dates_with_no_data=True):
+        """
+        Get release dates for a release id. With include_release_dates_with_no_data (the default) this includes
+        scheduled future release dates, which is what a release calendar needs.
+
+        Parameters
+        ----------
+        release_id : int
+            release id, e.g., 10
+        realtime_start : datetime or datetime-like str, optional
+            only return release dates on or after this date
+        include_release_dates_with_no_data : bool, optional
+            include scheduled release dates that have no data yet
+
+        Returns
+        -------
+        dates : DatetimeIndex
+            release dates in ascending order
+        """
+        url = "%s/release/dates?release_id=%d&sort_order=asc&limit=10000" % (self.root_url, release_id)
+        if realtime_start is not None:
+            url += '&realtime_start=' + pd.to_datetime(realtime_start).strftime('%Y-%m-%d')
+        if include_release_dates_with_no_data:
+            url += '&include_release_dates_with_no_data=true'
+        root = self._fetch_data(url)
+        return pd.to_datetime([child.text for child in root], format='%Y-%m-%d')
 
     def _do_series_search(self, url):
         """
         helper function for making one HTTP request for data, and parsing the returned results into a DataFrame
         """
-        root = self.__fetch_data(url)
+        root = self._fetch_data(url)
 
         series_ids = []
         data = {}
@@ -335,7 +436,7 @@ class Fred:
             else:
                 raise ValueError('%s is not in the valid list of sort_order options: %s' % (sort_order, str(sort_order_options)))
 
-        data, num_results_total = self.__do_series_search(url)
+        data, num_results_total = self._do_series_search(url)
         if data is None:
             return data
 
@@ -344,11 +445,14 @@ class Fred:
         else:
             max_results_needed = limit
 
-        if max_results_needed > self.max_results_per_request:
-            for i in range(1, max_results_needed // self.max_results_per_request + 1):
-                offset = i * self.max_results_per_request
-                next_data, _ = self.__do_series_search(url + '&offset=' + str(offset))
-                data = pd.concat([data, next_data])
+        # the first page tells us the total count, so the remaining offset pages can be fetched concurrently
+        offsets = range(self.max_results_per_request, min(max_results_needed, num_results_total),
+                        self.max_results_per_request)
+        if len(offsets):
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrent_requests, len(offsets))) as executor:
+                pages = list(executor.map(lambda offset: self._do_series_search(url + '&offset=' + str(offset))[0],
+                                          offsets))
+            data = pd.concat([data] + [page for page in pages if page is not None])
         return data.head(max_results_needed)
 
     def search(self, text, limit=1000, order_by=None, sort_order=None, filter=None):
@@ -378,7 +482,7 @@ class Fred:
         """
         url = "%s/series/search?search_text=%s&" % (self.root_url,
                                                     quote_plus(text))
-        info = self.__get_search_results(url, limit, order_by, sort_order, filter)
+        info = self._get_search_results(url, limit, order_by, sort_order, filter)
         return info
 
     def search_by_release(self, release_id, limit=0, order_by=None, sort_order=None, filter=None):
@@ -407,7 +511,7 @@ class Fred:
             a DataFrame containing information about the matching Fred series
         """
         url = "%s/release/series?release_id=%d" % (self.root_url, release_id)
-        info = self.__get_search_results(url, limit, order_by, sort_order, filter)
+        info = self._get_search_results(url, limit, order_by, sort_order, filter)
         if info is None:
             raise ValueError('No series exists for release id: ' + str(release_id))
         return info
@@ -439,7 +543,7 @@ class Fred:
         """
         url = "%s/category/series?category_id=%d&" % (self.root_url,
                                                       category_id)
-        info = self.__get_search_results(url, limit, order_by, sort_order, filter)
+        info = self._get_search_results(url, limit, order_by, sort_order, filter)
         if info is None:
             raise ValueError('No series exists for category id: ' + str(category_id))
         return info
@@ -449,13 +553,14 @@ class Fred:
 #data=fred.search('potential gdp').T
 
 
-source_id = '2'
-fred = Fred(api_key=config.FRED_API_KEY)
-url = f'https://api.stlouisfed.org/fred/source/releases?source_id={source_id}'
+if __name__ == '__main__':
+    source_id = '2'
+    fred = Fred(api_key=config.FRED_API_KEY)
+    url = f'https://api.stlouisfed.org/fred/source/releases?source_id={source_id}'
 
-df = fred._fetch_data(url)
+    df = fred._fetch_data(url)
 
-print(df)
+    print(df)
 '''
 
 fig = px.scatter(
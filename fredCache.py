@@ -0,0 +1,302 @@
+#FRED 시리즈 로컬 캐시 (Parquet 저장소)
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class SeriesStore:
+    """
+    series_id 별로 FRED 관측치를 Parquet 파일 하나씩에 저장해두는 로컬 시리즈 저장소.
+    캐시가 refresh_interval(초) 안에 확인된 적이 있으면 네트워크 없이 메모리/디스크에서 바로 돌려주고,
+    오래된 경우에는 마지막 캐시 날짜 이후의 관측치만 FRED에 요청(observation_start)해서 이어붙인다.
+    """
+    def __init__(self, fred, cache_dir='fredCache', refresh_interval=6 * 60 * 60, max_derived=256):
+        self.fred = fred
+        self.cache_dir = cache_dir
+        self.refresh_interval = refresh_interval
+        self._series = {}      # series_id -> pd.Series (메모리 캐시)
+        self._checked_at = {}  # series_id -> 마지막으로 FRED에 확인한 시각(epoch)
+        self._versions = {}    # series_id -> 데이터가 바뀔때마다 올라가는 번호 (파생지표 memo 무효화용)
+        self._derived = OrderedDict()  # (series_ids, transform, window) -> (원본 버전들, 계산결과). 최근 max_derived 개만 (LRU)
+        self.max_derived = max_derived
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, series_id):
+        return os.path.join(self.cache_dir, f'{series_id}.parquet')
+
+    def _bump(self, series_id):
+        self._versions[series_id] = self._versions.get(series_id, 0) + 1
+
+    def _lock(self, series_id):
+        # 같은 시리즈를 여러 요청이 동시에 갱신하지 않도록 시리즈별 락
+        with self._locks_guard:
+            return self._locks.setdefault(series_id, threading.Lock())
+
+    @staticmethod
+    def _normalize(series):
+        series = pd.to_numeric(series, errors='coerce').astype('float64')
+        series.index = pd.to_datetime(series.index)
+        series = series[~series.index.duplicated(keep='last')].sort_index()
+        series.index.name = 'date'
+        series.name = 'value'
+        return series
+
+    def _load(self, series_id):
+        # 메모리 -> 디스크 순으로 확인. 둘 다 없으면 None
+        if series_id in self._series:
+            return self._series[series_id]
+        path = self._path(series_id)
+        if not os.path.exists(path):
+            return None
+        series = pd.read_parquet(path)['value']
+        self._series[series_id] = series
+        self._checked_at[series_id] = os.path.getmtime(path)
+        self._bump(series_id)
+        return series
+
+    def _save(self, series_id, series):
+        path = self._path(series_id)
+        tmp_path = path + '.tmp'
+        series.to_frame('value').to_parquet(tmp_path)
+        os.replace(tmp_path, path)  # 쓰는 도중에 다른 요청이 깨진 파일을 읽지 않도록
+        self._series[series_id] = series
+        self._checked_at[series_id] = os.path.getmtime(path)
+        self._bump(series_id)
+
+    def is_fresh(self, series_id):
+        checked_at = self._checked_at.get(series_id)
+        return checked_at is not None and time.time() - checked_at < self.refresh_interval
+
+    def refresh(self, series_id, force=True):
+        """
+        캐시된 마지막 날짜 이후의 관측치만 FRED에서 받아서 저장소에 이어붙인다. 캐시가 없으면 전체 이력을 받는다.
+        force=False 이면 락을 기다리는 동안 다른 요청이 이미 갱신한 경우 FRED를 다시 부르지 않는다.
+        """
+        with self._lock(series_id):
+            cached = self._load(series_id)
+            if not force and cached is not None and self.is_fresh(series_id):
+                return cached
+            if cached is None or cached.empty:
+                series = self._normalize(self.fred.get_series(series_id))
+            else:
+                observation_start = cached.index[-1] + pd.Timedelta(days=1)
+                new_data = self.fred.get_series(series_id, observation_start=observation_start)
+                if len(new_data) == 0:
+                    # 새 관측치가 없으면 확인 시각만 갱신
+                    os.utime(self._path(series_id))
+                    self._checked_at[series_id] = time.time()
+                    return cached
+                series = self._normalize(pd.concat([cached, self._normalize(new_data)]))
+            self._save(series_id, series)
+            return series
+
+    def get_series(self, series_id, observation_start=None, observation_end=None):
+        """
+        series_id 의 전체(또는 기간 제한된) 관측치를 돌려준다. 캐시가 신선하면 네트워크를 타지 않는다.
+        """
+        series = self._load(series_id)
+        if series is None or not self.is_fresh(series_id):
+            try:
+                series = self.refresh(series_id, force=False)
+            except Exception as e:
+                if series is None:
+                    raise
+                # FRED 장애시에는 오래된 캐시라도 돌려주자
+                logging.warning("FRED refresh failed for %s, serving cached data: %s", series_id, str(e))
+        if observation_start is not None or observation_end is not None:
+            series = series[observation_start:observation_end]
+        return series
+
+    def invalidate(self, series_id):
+        # 다음 조회때 FRED 확인을 강제 (데이터 파일은 그대로 두고 증분 갱신)
+        self._checked_at.pop(series_id, None)
+
+    def version(self, series_id):
+        # 시리즈 데이터가 바뀔때마다 올라가는 번호 (한번도 안 읽었으면 None)
+        return self._versions.get(series_id)
+
+    def get_derived(self, key, series_ids):
+        """
+        파생지표 memo 조회. 계산에 쓴 원본 시리즈들이 그 뒤로 갱신됐으면 None
+        """
+        with self._locks_guard:
+            cached = self._derived.get(key)
+            if cached is not None and cached[0] == tuple(self._versions.get(series_id) for series_id in series_ids):
+                self._derived.move_to_end(key)
+                return cached[1]
+        return None
+
+    def put_derived(self, key, series_ids, value):
+        with self._locks_guard:
+            self._derived[key] = (tuple(self._versions.get(series_id) for series_id in series_ids), value)
+            self._derived.move_to_end(key)
+            while len(self._derived) > self.max_derived:
+                self._derived.popitem(last=False)
+
+
+class _Vintages:
+    """
+    한 시리즈의 all-releases 데이터를 (date, realtime_start) 순으로 정렬해서 numpy 배열로 들고 있는 객체.
+    관측일 순번과 realtime_start(일 단위)를 합친 복합키가 전체 정렬되어 있어서, 모든 관측일의 as-of 위치를
+    searchsorted 한번으로 찾을 수 있다.
+    """
+    def __init__(self, frame):
+        frame = frame.sort_values(['date', 'realtime_start'], kind='mergesort').reset_index(drop=True)
+        dates = frame['date'].to_numpy('datetime64[D]').astype(np.int64)
+        realtime = frame['realtime_start'].to_numpy('datetime64[D]').astype(np.int64)
+        self.frame = frame
+        self.values = frame['value'].to_numpy(dtype=np.float64)
+        self.realtime = realtime
+        self.group_start = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]]) if len(dates) else np.array([], dtype=np.int64)
+        self.group_end = np.r_[self.group_start[1:], len(dates)].astype(np.int64)
+        self.dates = frame['date'].to_numpy()[self.group_start]
+        self.realtime_min = realtime.min() if len(realtime) else 0
+        self.span = (realtime.max() - self.realtime_min + 2) if len(realtime) else 1
+        group_no = np.repeat(np.arange(len(self.group_start)), self.group_end - self.group_start)
+        self.group_key = np.arange(len(self.group_start)) * self.span
+        self.keys = group_no * self.span + (realtime - self.realtime_min)
+        # 발표일(realtime_start) 순 위치. releases_as_of 가 프레임을 다시 훑지 않고 앞부분만 잘라 쓰도록
+        self.realtime_order = np.argsort(realtime, kind='stable')
+        self.realtime_sorted = realtime[self.realtime_order]
+
+    def _day(self, when):
+        return pd.Timestamp(when).to_datetime64().astype('datetime64[D]').astype(np.int64)
+
+    def as_of(self, as_of_date):
+        # 관측일마다 realtime_start <= as_of_date 인 마지막 행의 위치
+        offset = min(self._day(as_of_date) - self.realtime_min, self.span - 1)
+        pos = np.searchsorted(self.keys, self.group_key + offset, side='right') - 1
+        known = pos >= self.group_start
+        return pd.Series(self.values[pos[known]], index=pd.DatetimeIndex(self.dates[known], name='date'))
+
+    def first_release(self):
+        return pd.Series(self.values[self.group_start], index=pd.DatetimeIndex(self.dates, name='date'))
+
+    def revisions(self, observation_date):
+        i = np.searchsorted(self.dates, pd.Timestamp(observation_date).to_datetime64())
+        if i == len(self.dates) or self.dates[i] != pd.Timestamp(observation_date).to_datetime64():
+            return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([], name='realtime_start'))
+        rows = slice(self.group_start[i], self.group_end[i])
+        index = pd.DatetimeIndex(self.frame['realtime_start'].to_numpy()[rows], name='realtime_start')
+        return pd.Series(self.values[rows], index=index)
+
+    def releases_as_of(self, as_of_date):
+        # realtime_start <= as_of_date 인 행들 (원래 (date, realtime_start) 순서 유지)
+        count = np.searchsorted(self.realtime_sorted, self._day(as_of_date), side='right')
+        return self.frame.take(np.sort(self.realtime_order[:count]))
+
+
+class VintageStore:
+    """
+    ALFRED 스타일 시점별(vintage) 시리즈 저장소. get_series_all_releases 결과를 시리즈당 한번만 받아서
+    Parquet 으로 저장해두고, as-of / 최초발표 / 수정이력 조회를 네트워크나 프레임 재스캔 없이 처리한다.
+    갱신할 때는 마지막 vintage 날짜 이후(realtime_start)만 FRED에 요청해서 합친다.
+    """
+    def __init__(self, fred, cache_dir=os.path.join('fredCache', 'vintages'), refresh_interval=24 * 60 * 60):
+        self.fred = fred
+        self.cache_dir = cache_dir
+        self.refresh_interval = refresh_interval
+        self._vintages = {}    # series_id -> _Vintages
+        self._checked_at = {}  # series_id -> 마지막으로 FRED에 확인한 시각(epoch)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, series_id):
+        return os.path.join(self.cache_dir, f'{series_id}.parquet')
+
+    def _lock(self, series_id):
+        with self._locks_guard:
+            return self._locks.setdefault(series_id, threading.Lock())
+
+    @staticmethod
+    def _merge(cached, new_data):
+        frames = [new_data[['realtime_start', 'date', 'value']]]
+        if cached is not None:
+            frames.insert(0, cached)
+        frame = pd.concat(frames, ignore_index=True)
+        frame = frame.drop_duplicates(['date', 'realtime_start'], keep='last')
+        frame = frame.sort_values(['date', 'realtime_start'], kind='mergesort')
+        # realtime_start 를 주고 요청하면 그 이전부터 유효하던 값도 realtime_start 날짜로 다시 내려오므로,
+        # 같은 관측일에서 값이 바뀌지 않은 행은 수정이 아니니 버린다
+        same_date = frame['date'].eq(frame['date'].shift())
+        same_value = frame['value'].eq(frame['value'].shift()) | (frame['value'].isna() & frame['value'].shift().isna())
+        return frame[~(same_date & same_value)].reset_index(drop=True)
+
+    def _load(self, series_id):
+        if series_id in self._vintages:
+            return self._vintages[series_id]
+        path = self._path(series_id)
+        if not os.path.exists(path):
+            return None
+        vintages = _Vintages(pd.read_parquet(path))
+        self._vintages[series_id] = vintages
+        self._checked_at[series_id] = os.path.getmtime(path)
+        return vintages
+
+    def is_fresh(self, series_id):
+        checked_at = self._checked_at.get(series_id)
+        return checked_at is not None and time.time() - checked_at < self.refresh_interval
+
+    def refresh(self, series_id, force=True):
+        with self._lock(series_id):
+            cached = self._load(series_id)
+            if not force and cached is not None and self.is_fresh(series_id):
+                return cached
+            if cached is None or cached.frame.empty:
+                frame = self._merge(None, self.fred.get_series_all_releases(series_id))
+            else:
+                realtime_start = cached.frame['realtime_start'].max().strftime('%Y-%m-%d')
+                frame = self._merge(cached.frame, self.fred.get_series_all_releases(series_id, realtime_start=realtime_start))
+            path = self._path(series_id)
+            frame.to_parquet(path + '.tmp')
+            os.replace(path + '.tmp', path)
+            vintages = _Vintages(frame)
+            self._vintages[series_id] = vintages
+            self._checked_at[series_id] = os.path.getmtime(path)
+            return vintages
+
+    def get(self, series_id):
+        vintages = self._load(series_id)
+        if vintages is None or not self.is_fresh(series_id):
+            try:
+                vintages = self.refresh(series_id, force=False)
+            except Exception as e:
+                if vintages is None:
+                    raise
+                logging.warning("FRED vintage refresh failed for %s, serving cached data: %s", series_id, str(e))
+        return vintages
+
+    def as_of(self, series_id, as_of_date):
+        """
+        as_of_date 시점에 알려져 있던 최신 값들 (관측일별로 그 시점까지의 마지막 수정치)
+        """
+        return self.get(series_id).as_of(as_of_date)
+
+    def first_release(self, series_id):
+        """
+        관측일별 최초 발표치 (이후 수정은 무시)
+        """
+        return self.get(series_id).first_release()
+
+    def revisions(self, series_id, observation_date):
+        """
+        한 관측일의 발표/수정 이력. realtime_start 를 인덱스로 하는 Series
+        """
+        return self.get(series_id).revisions(observation_date)
+
+    def releases_as_of(self, series_id, as_of_date):
+        """
+        as_of_date 이전에 발표된 모든 행 (fredAll.Fred.get_series_as_of_date 와 같은 형태의 DataFrame)
+        """
+        return self.get(series_id).releases_as_of(as_of_date)
+
+    def invalidate(self, series_id):
+        self._checked_at.pop(series_id, None)
@@ -0,0 +1,164 @@
+#FRED 시리즈 메타데이터 로컬 카탈로그 (SQLite FTS5)
+#지표 검색은 FRED 에 가지 않고 여기서 바로 응답하고, 갱신은 last_updated 기준으로 바뀐 것만 받아온다.
+import os
+import re
+import sqlite3
+from contextlib import closing
+from urllib.parse import quote_plus
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    series_id TEXT PRIMARY KEY,
+    title TEXT,
+    units TEXT,
+    frequency TEXT,
+    seasonal_adjustment TEXT,
+    popularity INTEGER,
+    observation_start TEXT,
+    observation_end TEXT,
+    last_updated TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS series_fts USING fts5(
+    series_id, title, units, frequency, content='series', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS series_ai AFTER INSERT ON series BEGIN
+    INSERT INTO series_fts(rowid, series_id, title, units, frequency)
+    VALUES (new.rowid, new.series_id, new.title, new.units, new.frequency);
+END;
+CREATE TRIGGER IF NOT EXISTS series_ad AFTER DELETE ON series BEGIN
+    INSERT INTO series_fts(series_fts, rowid, series_id, title, units, frequency)
+    VALUES ('delete', old.rowid, old.series_id, old.title, old.units, old.frequency);
+END;
+CREATE TRIGGER IF NOT EXISTS series_au AFTER UPDATE ON series BEGIN
+    INSERT INTO series_fts(series_fts, rowid, series_id, title, units, frequency)
+    VALUES ('delete', old.rowid, old.series_id, old.title, old.units, old.frequency);
+    INSERT INTO series_fts(rowid, series_id, title, units, frequency)
+    VALUES (new.rowid, new.series_id, new.title, new.units, new.frequency);
+END;
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT PRIMARY KEY,
+    last_updated TEXT
+);
+"""
+
+COLUMNS = ['series_id', 'title', 'units', 'frequency', 'seasonal_adjustment', 'popularity',
+           'observation_start', 'observation_end', 'last_updated']
+
+
+def _to_text(value, fmt='%Y-%m-%d'):
+    # FRED last_updated 는 '2024-05-10 07:51:04-05' 처럼 타임존이 붙어옴. 비교가 되도록 UTC 문자열로 저장
+    if value is None or pd.isna(value):
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return ts.strftime(fmt)
+
+
+class SeriesCatalog:
+    """
+    FRED 시리즈 메타데이터(title, units, frequency, popularity, last_updated ...)를 담아두는 로컬 SQLite 카탈로그.
+    refresh 는 검색 범위(scope)별로 마지막으로 본 last_updated 를 기억해두고 그 이후에 바뀐 시리즈만 받아온다.
+    """
+    def __init__(self, db_path=os.path.join('fredCache', 'catalog.sqlite')):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def upsert(self, info):
+        """
+        fredAll.Fred 검색 결과(DataFrame, index 가 series id)를 카탈로그에 넣거나 갱신한다
+        """
+        if info is None or info.empty:
+            return 0
+        rows = []
+        for series_id, row in info.iterrows():
+            rows.append((series_id, row.get('title'), row.get('units'), row.get('frequency'),
+                         row.get('seasonal_adjustment'), int(row.get('popularity') or 0),
+                         _to_text(row.get('observation_start')), _to_text(row.get('observation_end')),
+                         _to_text(row.get('last_updated'), '%Y-%m-%d %H:%M:%S')))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO series (%s) VALUES (%s) "
+                "ON CONFLICT(series_id) DO UPDATE SET %s" % (
+                    ', '.join(COLUMNS), ', '.join('?' * len(COLUMNS)),
+                    ', '.join('%s=excluded.%s' % (col, col) for col in COLUMNS[1:])),
+                rows)
+        return len(rows)
+
+    def search(self, text, limit=20, frequency=None):
+        """
+        제목/단위/주기에 대한 전문검색. 단어마다 접두어 매칭이고, 관련도(bm25) -> popularity 순으로 정렬
+        """
+        tokens = re.findall(r'\w+', text or '')
+        if not tokens:
+            return []
+        query = ' '.join('"%s"*' % token for token in tokens)
+        sql = ("SELECT s.series_id, s.title, s.units, s.frequency, s.seasonal_adjustment, s.popularity, "
+               "s.observation_start, s.observation_end, s.last_updated "
+               "FROM series_fts JOIN series s ON s.rowid = series_fts.rowid WHERE series_fts MATCH ?")
+        params = [query]
+        if frequency:
+            sql += " AND s.frequency = ?"
+            params.append(frequency)
+        sql += " ORDER BY bm25(series_fts), s.popularity DESC LIMIT ?"
+        params.append(limit)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def contains(self, series_id):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM series WHERE series_id = ?", (series_id,)).fetchone() is not None
+
+    def _watermark(self, scope):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT last_updated FROM sync_state WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else None
+
+    def refresh(self, fred, text=None, release_id=None, category_id=None, max_pages=10):
+        """
+        search / release / category 중 하나의 범위를 last_updated 내림차순으로 한 페이지씩 받아서,
+        지난번 갱신 이후 바뀐 시리즈가 더 이상 안 나오면 멈춘다. 새로 반영한 시리즈 수를 돌려준다.
+        max_pages 에서 끊겨 지난번 지점(또는 범위 끝)까지 못 갔으면 last_updated 기준점을 옮기지 않는다
+        (옮기면 못 본 나머지 페이지의 시리즈는 다음 갱신때도 건너뛰게 됨).
+        """
+        if text is not None:
+            scope = 'search:' + text
+            url = "%s/series/search?search_text=%s" % (fred.root_url, quote_plus(text))
+        elif release_id is not None:
+            scope = 'release:%d' % release_id
+            url = "%s/release/series?release_id=%d" % (fred.root_url, release_id)
+        elif category_id is not None:
+            scope = 'category:%d' % category_id
+            url = "%s/category/series?category_id=%d" % (fred.root_url, category_id)
+        else:
+            raise ValueError('One of text, release_id or category_id is required')
+        url += '&order_by=last_updated&sort_order=desc'
+
+        watermark = self._watermark(scope)
+        newest, updated, complete = None, 0, False
+        for page in range(max_pages):
+            data, total = fred._do_series_search(url + '&offset=%d' % (page * fred.max_results_per_request))
+            if data is None:
+                complete = True
+                break
+            last_updated = data['last_updated'].map(lambda v: _to_text(v, '%Y-%m-%d %H:%M:%S'))
+            newest = newest or last_updated.iloc[0]
+            if watermark is not None:
+                data = data[last_updated > watermark]
+            updated += self.upsert(data)
+            if len(data) < fred.max_results_per_request or (page + 1) * fred.max_results_per_request >= total:
+                complete = True
+                break
+        if complete and newest is not None:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("INSERT INTO sync_state (scope, last_updated) VALUES (?, ?) "
+                             "ON CONFLICT(scope) DO UPDATE SET last_updated = excluded.last_updated", (scope, newest))
+        return updated
@@ -0,0 +1,126 @@
+#FRED 발표일 기반 캐시 갱신 스케줄러 (배치모듈)
+#CPI, PCE, PPI 같은 지표는 정해진 발표일에만 바뀌므로 TTL 로 추측하지 않고 발표일 직후에만 무효화 + 미리 받아둔다.
+import asyncio
+import logging
+from collections import deque
+from datetime import timedelta
+
+import pandas as pd
+
+
+class ReleaseScheduler:
+    """
+    서빙하는 시리즈들의 FRED 발표일(release/dates)을 읽어두고, 발표일마다 check_offsets 시점(UTC 자정 기준)에
+    해당 시리즈만 캐시를 무효화하고 다시 받아둔다(pre-warm). 시작할때 전체 시리즈를 한번 데워두므로
+    사용자 요청이 FRED 를 직접 기다리는 일이 없다.
+    기본 check_offsets 는 미 동부 오전(08:30 ET 발표분)과 오후(H.15 금리 등) 발표 이후 시점.
+    catalog 를 주면 지표 검색 카탈로그도 catalog_scopes(검색어들) 범위로 시작할때 채우고 catalog_interval 마다 갱신한다.
+    """
+    def __init__(self, fred, store, series_ids,
+                 check_offsets=(timedelta(hours=14), timedelta(hours=22)),
+                 calendar_interval=timedelta(hours=12), poll_interval=300,
+                 catalog=None, catalog_scopes=(), catalog_interval=timedelta(days=1)):
+        self.fred = fred
+        self.store = store
+        self.series_ids = list(series_ids)
+        self.check_offsets = check_offsets
+        self.calendar_interval = calendar_interval
+        self.poll_interval = poll_interval
+        self._release_ids = {}  # series_id -> release_id
+        self._due = {}          # series_id -> 앞으로 갱신할 시각들(UTC, 오름차순)
+        self._calendar_loaded_at = None
+        self.catalog = catalog
+        self.catalog_scopes = list(catalog_scopes)
+        self.catalog_interval = catalog_interval
+        self._catalog_refreshed_at = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def warm_all(self):
+        for series_id in self.series_ids:
+            try:
+                self.store.get_series(series_id)
+            except Exception as e:
+                logging.error("An error occurred while warming %s: %s", series_id, str(e))
+
+    def load_calendar(self):
+        """
+        시리즈별 release_id 를 찾고, 릴리즈별 발표일 목록으로 시리즈마다 다음 갱신 시각들을 만든다
+        """
+        now = pd.Timestamp.now(tz='UTC')
+        release_dates = {}
+        for series_id in self.series_ids:
+            try:
+                if series_id not in self._release_ids:
+                    self._release_ids[series_id] = int(self.fred.get_series_release(series_id)['id'])
+                release_id = self._release_ids[series_id]
+                if release_id not in release_dates:
+                    # 어제 발표분도 오후 체크가 남아있을 수 있으니 하루 전부터
+                    release_dates[release_id] = self.fred.get_release_dates(release_id, realtime_start=now - timedelta(days=1))
+            except Exception as e:
+                logging.error("An error occurred while loading release dates for %s: %s", series_id, str(e))
+                continue
+            times = sorted(pd.Timestamp(day).tz_localize('UTC') + offset
+                           for day in release_dates[release_id] for offset in self.check_offsets)
+            self._due[series_id] = deque(t for t in times if t > now)
+        self._calendar_loaded_at = now
+
+    def due_series(self, now):
+        due = []
+        for series_id, times in self._due.items():
+            if times and times[0] <= now:
+                while times and times[0] <= now:
+                    times.popleft()
+                due.append(series_id)
+        return due
+
+    def _refresh(self, series_id):
+        try:
+            self.store.invalidate(series_id)
+            self.store.refresh(series_id)
+            logging.info("Refreshed %s after its FRED release", series_id)
+        except Exception as e:
+            logging.error("An error occurred while refreshing %s: %s", series_id, str(e))
+
+    def refresh_catalog(self):
+        for scope in self.catalog_scopes:
+            try:
+                updated = self.catalog.refresh(self.fred, text=scope)
+                logging.info("Refreshed %d catalog series for '%s'", updated, scope)
+            except Exception as e:
+                logging.error("An error occurred while refreshing the catalog for '%s': %s", scope, str(e))
+        self._catalog_refreshed_at = pd.Timestamp.now(tz='UTC')
+
+    def _seconds_until_next(self, now):
+        wake = [now + timedelta(seconds=self.poll_interval)]
+        wake += [times[0] for times in self._due.values() if times]
+        if self._calendar_loaded_at is not None:
+            wake.append(self._calendar_loaded_at + self.calendar_interval)
+        if self.catalog is not None and self._catalog_refreshed_at is not None:
+            wake.append(self._catalog_refreshed_at + self.catalog_interval)
+        return max((min(wake) - now).total_seconds(), 1)
+
+    async def _run(self):
+        await asyncio.to_thread(self.warm_all)  # 시작할때 한번 전체 데워두기
+        while True:
+            now = pd.Timestamp.now(tz='UTC')
+            if self._calendar_loaded_at is None or now - self._calendar_loaded_at >= self.calendar_interval:
+                await asyncio.to_thread(self.load_calendar)
+            for series_id in self.due_series(now):
+                await asyncio.to_thread(self._refresh, series_id)
+            if self.catalog is not None and (self._catalog_refreshed_at is None or
+                                             now - self._catalog_refreshed_at >= self.catalog_interval):
+                await asyncio.to_thread(self.refresh_catalog)
+            await asyncio.sleep(self._seconds_until_next(pd.Timestamp.now(tz='UTC')))
@@ -0,0 +1,108 @@
+#파생지표 계산 엔진 (YoY, MoM, QoQ 연율, 이동평균, z-score, 스프레드, 로그차분)
+#"CPIAUCSL:yoy", "UNRATE:zscore:36", "DGS10-DGS2:spread" 같은 문자열로 요청하고,
+#같은 계산끼리 묶어서 여러 시리즈를 한 패널로 한번에 벡터 연산한다.
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+TransformSpec = namedtuple('TransformSpec', ['series_ids', 'transform', 'window'])
+
+SERIES_ID = re.compile(r'^[A-Za-z0-9_]+$')
+DEFAULT_WINDOWS = {'rolling_mean': 12, 'zscore': 36}
+MAX_WINDOW = 520  # 주간 기준 10년. 이보다 긴 창은 받지 않음
+
+
+def _lag(panel, offset):
+    # 관측 주기와 상관없이 '1년 전/1달 전 시점에 알려진 값'을 가져옴 (월간이면 shift(12) 와 같음)
+    lagged = panel.reindex(panel.index - offset, method='ffill')
+    lagged.index = panel.index
+    return lagged
+
+
+OPS = {
+    'level': lambda panel, window: panel,
+    'yoy': lambda panel, window: (panel / _lag(panel, pd.DateOffset(years=1)) - 1) * 100,
+    'mom': lambda panel, window: (panel / _lag(panel, pd.DateOffset(months=1)) - 1) * 100,
+    'qoq_ann': lambda panel, window: ((panel / _lag(panel, pd.DateOffset(months=3))) ** 4 - 1) * 100,
+    'logdiff': lambda panel, window: np.log(panel).diff() * 100,
+    'rolling_mean': lambda panel, window: panel.rolling(window, min_periods=window).mean(),
+    'zscore': lambda panel, window: (panel - panel.rolling(window).mean()) / panel.rolling(window).std(),
+    'spread': None,  # 두 시리즈 차이. compute 에서 따로 처리
+}
+
+
+def parse_spec(text):
+    """
+    'SERIES[:transform[:window]]' 또는 'A-B:spread' 형태의 문자열을 TransformSpec 으로 바꾼다
+    """
+    parts = text.split(':')
+    if len(parts) > 3:
+        raise ValueError(f"Invalid spec '{text}', should be 'SERIES[:transform[:window]]'")
+    series_ids = tuple(parts[0].split('-'))
+    transform = parts[1].lower() if len(parts) > 1 and parts[1] else 'level'
+    if transform not in OPS:
+        raise ValueError(f"Unknown transform '{transform}', should be one of {list(OPS)}")
+    if not all(SERIES_ID.match(series_id) for series_id in series_ids):
+        raise ValueError(f"Invalid series id in '{text}'")
+    if len(series_ids) != (2 if transform == 'spread' else 1):
+        raise ValueError(f"'{transform}' needs {'two series (A-B)' if transform == 'spread' else 'one series'}")
+    window = int(parts[2]) if len(parts) > 2 else DEFAULT_WINDOWS.get(transform)
+    if window is not None and not 0 < window <= MAX_WINDOW:
+        raise ValueError(f"window should be an integer between 1 and {MAX_WINDOW}")
+    return TransformSpec(series_ids, transform, window)
+
+
+def compute(base, specs):
+    """
+    base(series_id -> Series)로 specs 를 계산해서 spec -> Series 를 돌려준다.
+    같은 계산/윈도우이고 관측일(index)이 완전히 같은 시리즈들은 한 DataFrame 으로 묶어서 연산 한번에 처리한다.
+    """
+    groups = {}
+    indexes = {}  # (transform, window) -> [(index, group key), ...]
+    for spec in specs:
+        if spec.transform == 'spread':
+            key = ('spread', None)
+        else:
+            # 길이/시작/끝만 같고 중간 관측일이 다른 시리즈를 묶으면 concat 에서 NaN 행이 생기므로 index 가 같을때만
+            index = base[spec.series_ids[0]].index
+            buckets = indexes.setdefault((spec.transform, spec.window), [])
+            key = next((bucket_key for bucket_index, bucket_key in buckets if bucket_index.equals(index)), None)
+            if key is None:
+                key = (spec.transform, spec.window, len(buckets))
+                buckets.append((index, key))
+        groups.setdefault(key, []).append(spec)
+
+    results = {}
+    for key, group in groups.items():
+        if key[0] == 'spread':
+            left = pd.concat({i: base[spec.series_ids[0]] for i, spec in enumerate(group)}, axis=1)
+            right = pd.concat({i: base[spec.series_ids[1]] for i, spec in enumerate(group)}, axis=1)
+            left, right = left.align(right, join='outer')
+            panel = left.ffill() - right.ffill()
+        else:
+            panel = pd.concat({i: base[spec.series_ids[0]] for i, spec in enumerate(group)}, axis=1)
+            panel = OPS[key[0]](panel, key[1])
+        for i, spec in enumerate(group):
+            results[spec] = panel[i].rename(None)
+    return results
+
+
+def compute_cached(store, base, specs):
+    """
+    series store 의 memo 에 (시리즈, 계산, 윈도우) 결과가 있고 원본이 그 뒤로 안 바뀌었으면 재사용하고,
+    없는 것만 compute 로 한번에 계산해서 memo 에 넣는다
+    """
+    results, pending = {}, []
+    for spec in specs:
+        cached = store.get_derived(spec, spec.series_ids)
+        if cached is None:
+            pending.append(spec)
+        else:
+            results[spec] = cached
+    if pending:
+        for spec, series in compute(base, pending).items():
+            store.put_derived(spec, spec.series_ids, series)
+            results[spec] = series
+    return results
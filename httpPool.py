@@ -0,0 +1,163 @@
+#외부 API 공용 HTTP 커넥션 풀
+#요청마다 httpx.AsyncClient() / requests.get 을 새로 열면 매번 TCP+TLS 연결부터 다시 한다.
+#앱 수명(lifespan) 동안 호스트별 클라이언트를 하나씩 두고 keep-alive 로 재사용하며, 호스트별 사용량을 집계한다.
+#HOST_LIMITS 에 없는 호스트(사용자가 넘긴 url 등)는 호스트마다 클라이언트를 만들지 않고 공용 클라이언트 하나로 보낸다.
+import importlib.util
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import httpx
+
+# h2 패키지가 있을때만 HTTP/2 사용 (httpx 는 h2 없이 http2=True 면 에러)
+HTTP2 = importlib.util.find_spec('h2') is not None
+
+# 호스트별 최대 동시 연결 수. 목록에 없는 호스트는 DEFAULT_LIMIT
+HOST_LIMITS = {
+    'seeking-alpha.p.rapidapi.com': 10,
+    'trader-calendar.p.rapidapi.com': 4,
+    'openapi.naver.com': 10,
+    'finance.naver.com': 8,
+    'seekingalpha.com': 8,
+    'n.news.naver.com': 16,
+    'kind.krx.co.kr': 2,
+    'api.stlouisfed.org': 8,
+    'api.openai.com': 64,  # 동시 호출 수는 llmGateway 의 모델별 세마포어가 정함
+}
+DEFAULT_LIMIT = 10
+OTHER_HOSTS = '*'  # 목록에 없는 호스트들이 같이 쓰는 클라이언트/집계 키 (연결 수는 DEFAULT_LIMIT)
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+
+class _HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.seconds = 0.0
+        self.status = Counter()
+
+
+class HttpPool:
+    """
+    호스트별 httpx 클라이언트(비동기용 AsyncClient, 스레드에서 쓰는 동기 Client)를 처음 쓸때 만들어 재사용한다.
+    연결 수 제한/타임아웃은 호스트별로, HTTP/2 는 가능할때만. metrics() 로 호스트별 요청수/에러/지연/열린 연결 수를 본다.
+    """
+    def __init__(self, host_limits=HOST_LIMITS, default_limit=DEFAULT_LIMIT, timeout=DEFAULT_TIMEOUT, http2=HTTP2):
+        self.host_limits = dict(host_limits)
+        self.default_limit = default_limit
+        self.timeout = timeout
+        self.http2 = http2
+        self._async_clients = {}
+        self._sync_clients = {}
+        self._stats = {}
+        self._guard = threading.Lock()
+
+    def _limits(self, host):
+        limit = self.host_limits.get(host, self.default_limit)
+        return httpx.Limits(max_connections=limit, max_keepalive_connections=limit, keepalive_expiry=60)
+
+    def _key(self, host):
+        return host if host in self.host_limits else OTHER_HOSTS
+
+    def _client(self, clients, factory, host):
+        host = self._key(host)
+        client = clients.get(host)
+        if client is None:
+            with self._guard:
+                client = clients.get(host)
+                if client is None:
+                    client = clients[host] = factory(limits=self._limits(host), timeout=self.timeout,
+                                                     http2=self.http2, follow_redirects=True)
+                    self._stats.setdefault(host, _HostStats())
+        return client
+
+    def async_client(self, host):
+        return self._client(self._async_clients, httpx.AsyncClient, host)
+
+    def sync_client(self, host):
+        return self._client(self._sync_clients, httpx.Client, host)
+
+    def _begin(self, host):
+        host = self._key(host)
+        with self._guard:
+            stats = self._stats.setdefault(host, _HostStats())
+            stats.requests += 1
+            stats.in_flight += 1
+        return stats, time.perf_counter()
+
+    def _end(self, stats, started, response=None):
+        with self._guard:
+            stats.in_flight -= 1
+            stats.seconds += time.perf_counter() - started
+            if response is None:
+                stats.errors += 1
+            else:
+                stats.status[response.status_code] += 1
+
+    async def request(self, method, url, **kwargs):
+        host = urlsplit(url).hostname
+        client = self.async_client(host)
+        stats, started = self._begin(host)
+        response = None
+        try:
+            response = await client.request(method, url, **kwargs)
+            return response
+        finally:
+            self._end(stats, started, response)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    def request_sync(self, method, url, **kwargs):
+        """
+        스레드(동기 라우트, 실행기, fredAll)에서 쓰는 버전. 같은 호스트 제한/집계를 따른다
+        """
+        host = urlsplit(url).hostname
+        client = self.sync_client(host)
+        stats, started = self._begin(host)
+        response = None
+        try:
+            response = client.request(method, url, **kwargs)
+            return response
+        finally:
+            self._end(stats, started, response)
+
+    def get_sync(self, url, **kwargs):
+        return self.request_sync('GET', url, **kwargs)
+
+    @staticmethod
+    def _open_connections(client):
+        # httpx 가 공개 API 로 안 보여주므로 transport 의 커넥션 풀을 조심스럽게 들여다봄
+        pool = getattr(getattr(client, '_transport', None), '_pool', None)
+        return len(getattr(pool, 'connections', ()) or ())
+
+    def metrics(self):
+        with self._guard:
+            hosts = {}
+            for host, stats in self._stats.items():
+                connections = sum(self._open_connections(clients[host])
+                                  for clients in (self._async_clients, self._sync_clients) if host in clients)
+                hosts[host] = {
+                    'requests': stats.requests,
+                    'errors': stats.errors,
+                    'in_flight': stats.in_flight,
+                    'avg_ms': round(stats.seconds / stats.requests * 1000, 1) if stats.requests else None,
+                    'status': dict(stats.status),
+                    'open_connections': connections,
+                    'max_connections': self.host_limits.get(host, self.default_limit),
+                }
+        return {'http2': self.http2, 'hosts': hosts}
+
+    async def aclose(self):
+        with self._guard:
+            async_clients, self._async_clients = list(self._async_clients.values()), {}
+            sync_clients, self._sync_clients = list(self._sync_clients.values()), {}
+        for client in async_clients:
+            await client.aclose()
+        for client in sync_clients:
+            client.close()
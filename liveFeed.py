@@ -0,0 +1,126 @@
+#뉴스 목록 실시간 피드 (Server-Sent Events)
+#화면마다 같은 목록을 계속 다시 받아가지 않도록, 소스(키)마다 서버에 poller 하나만 돌리고 바뀐 부분만 구독자들에게 밀어준다.
+#처음 붙은 구독자는 현재 목록 전체(snapshot)를 받고, 그 뒤로는 새로 생긴 기사(added)와 목록에서 빠진 기사 id(removed),
+#그리고 서버 목록 순서대로의 id 리스트(order)만 받는다 (관련도 순 목록은 새 기사가 맨 앞에 오지 않으므로 순서는 order 로 맞춤).
+#마지막 구독자가 나가면 poller 도 멈춘다. 그래서 upstream 호출 수는 보는 사람 수와 상관없이 소스 수 x 주기로 고정.
+import asyncio
+import contextlib
+import logging
+from collections import OrderedDict
+
+import orjson
+
+KEEPALIVE = 15  # 바뀐게 없어도 이 간격(초)으로 주석 줄을 보내서 프록시가 연결을 끊지 않게
+
+
+def sse_event(event, data):
+    return b'event: ' + event.encode('utf-8') + b'\ndata: ' + orjson.dumps(data) + b'\n\n'
+
+
+class _Feed:
+    def __init__(self, fetch, id_of, interval):
+        self.fetch = fetch
+        self.id_of = id_of
+        self.interval = interval
+        self.records = None  # 첫 poll 전에는 None, 이후 id -> record (upstream 순서)
+        self.subscribers = set()
+        self.task = None
+
+
+class FeedHub:
+    """
+    키별 poller 하나 + 구독자별 asyncio.Queue. 느린 구독자의 큐가 차면 쌓인 diff 를 버리고 snapshot 하나로 바꿔서 다시 맞춘다
+    """
+    def __init__(self, queue_size=32, logger=None):
+        self.queue_size = queue_size
+        self.logger = logger or logging.getLogger("live-feed")
+        self._feeds = {}
+
+    async def subscribe(self, key, fetch, id_of, interval=60):
+        """
+        fetch: 인자 없는 코루틴 함수 (기사 리스트를 돌려줌), id_of: 기사 -> id.
+        (event, data) 를 계속 내주는 async generator. 같은 key 로 먼저 붙은 구독이 있으면 fetch/interval 은 그쪽 것을 씀
+        """
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = self._feeds[key] = _Feed(fetch, id_of, interval)
+            feed.task = asyncio.create_task(self._poll(key, feed), name="live-feed %s" % (key,))
+        queue = asyncio.Queue(self.queue_size)
+        feed.subscribers.add(queue)
+        if feed.records is not None:
+            queue.put_nowait(self._snapshot(feed))
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            feed.subscribers.discard(queue)
+            if not feed.subscribers and self._feeds.get(key) is feed:
+                del self._feeds[key]
+                feed.task.cancel()
+
+    def _snapshot(self, feed):
+        return 'snapshot', {'records': list(feed.records.values())}
+
+    def _publish(self, feed, message):
+        for queue in feed.subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._snapshot(feed))
+
+    async def _poll(self, key, feed):
+        while True:
+            try:
+                records = OrderedDict((feed.id_of(record), record) for record in await feed.fetch())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 이번 주기는 건너뛰고 이전 목록 유지
+                self.logger.error("Live feed %s poll failed: %s", key, e)
+            else:
+                if feed.records is None:
+                    feed.records = records
+                    self._publish(feed, self._snapshot(feed))
+                else:
+                    added = [record for record_id, record in records.items() if record_id not in feed.records]
+                    removed = [record_id for record_id in feed.records if record_id not in records]
+                    reordered = list(records) != list(feed.records)
+                    feed.records = records
+                    if added or removed or reordered:
+                        self._publish(feed, ('diff', {'added': added, 'removed': removed, 'order': list(records)}))
+            await asyncio.sleep(feed.interval)
+
+    def metrics(self):
+        return {str(key): {'subscribers': len(feed.subscribers), 'records': len(feed.records or ()),
+                           'interval': feed.interval} for key, feed in self._feeds.items()}
+
+    def close(self):
+        for feed in self._feeds.values():
+            feed.task.cancel()
+        self._feeds.clear()
+
+
+async def sse_stream(events, request=None, keepalive=KEEPALIVE):
+    """
+    (event, data) async generator -> SSE 바이트 스트림. 바뀐게 없으면 keepalive 초마다 주석 줄
+    """
+    try:
+        next_event = asyncio.ensure_future(events.__anext__())
+        while True:
+            done, _ = await asyncio.wait({next_event}, timeout=keepalive)
+            if not done:
+                if request is not None and await request.is_disconnected():
+                    break
+                yield b': keepalive\n\n'
+                continue
+            event, data = next_event.result()
+            yield sse_event(event, data)
+            next_event = asyncio.ensure_future(events.__anext__())
+    finally:
+        # 기다리던 __anext__ 를 취소하면 subscribe 쪽 finally 에서 구독 해제 (마지막이면 poller 도 정지)
+        next_event.cancel()
+        with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+            await next_event
+        await events.aclose()
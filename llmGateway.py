@@ -0,0 +1,148 @@
+#OpenAI 호출 공용 게이트웨이 (비동기)
+#동기 client.chat.completions.create 를 스레드에서 부르면 답이 올때까지(10~60초) 실행기 worker 하나를 통째로 잡고 있는다.
+#AsyncOpenAI 하나를 공용 HTTP 풀(httpPool 의 api.openai.com 클라이언트) 위에 두고, 모델별 세마포어로 동시에 나가는 호출 수를,
+#호출별 타임아웃으로 기다리는 시간을 제한한다. 기다리는 동안엔 이벤트 루프만 쓰므로 다른 API 요청은 그대로 처리된다.
+#stream() 은 답변을 토큰 단위로 넘겨주고, 받는 쪽이 그만 받으면 OpenAI 응답도 바로 닫아서 세마포어 자리를 돌려준다.
+import asyncio
+import logging
+import time
+
+# 모델별 동시 호출 수 (OpenAI 계정의 분당 한도에 맞춰 조정). 목록에 없는 모델은 DEFAULT_LIMIT
+MODEL_LIMITS = {
+    'gpt-4': 8,
+    'gpt-4-0125-preview': 16,
+}
+DEFAULT_LIMIT = 8
+DEFAULT_TIMEOUT = 120  # 초. 세마포어 대기 + 응답까지 전체
+
+
+class _ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.seconds = 0.0
+
+
+class LLMGateway:
+    """
+    chat() 한 곳으로 모든 GPT 호출을 보낸다. 모델마다 세마포어로 동시 호출 수를 막고, 넘치는 호출은 순서대로 기다린다.
+    timeout 은 기다리는 시간까지 포함한 전체 시간이라 넘으면 asyncio.TimeoutError. metrics() 로 모델별 대기/진행/에러 수를 본다
+    """
+    def __init__(self, api_key, http_client=None, model_limits=MODEL_LIMITS, default_limit=DEFAULT_LIMIT,
+                 timeout=DEFAULT_TIMEOUT, max_retries=2, logger=None):
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=api_key, http_client=http_client, timeout=timeout, max_retries=max_retries)
+        self.model_limits = dict(model_limits)
+        self.default_limit = default_limit
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger("llm-gateway")
+        self._semaphores = {}
+        self._stats = {}
+
+    def _slot(self, model):
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.model_limits.get(model, self.default_limit))
+            self._stats[model] = _ModelStats()
+        return self._semaphores[model], self._stats[model]
+
+    async def _call(self, model, messages, timeout, **kwargs):
+        semaphore, stats = self._slot(model)
+        stats.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await self.client.chat.completions.create(model=model, messages=messages, timeout=timeout, **kwargs)
+        finally:
+            stats.in_flight -= 1
+            stats.seconds += time.perf_counter() - started
+            semaphore.release()
+
+    async def complete(self, model, messages, timeout=None, **kwargs):
+        """
+        chat completion 원본 응답 객체
+        """
+        timeout = timeout or self.timeout
+        _, stats = self._slot(model)
+        stats.calls += 1
+        try:
+            return await asyncio.wait_for(self._call(model, messages, timeout, **kwargs), timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            self.logger.warning("%s call timed out after %ss", model, timeout)
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+
+    async def chat(self, model, messages, timeout=None, **kwargs):
+        """
+        첫번째 답변 텍스트만 (답이 없으면 None)
+        """
+        completion = await self.complete(model, messages, timeout, **kwargs)
+        return completion.choices[0].message.content if completion.choices else None
+
+    async def stream(self, model, messages, timeout=None, **kwargs):
+        """
+        답변 텍스트 조각(토큰)을 오는 대로 내주는 async generator. timeout 은 chat 과 같이 대기 포함 전체 시간.
+        중간에 닫히면(aclose / 취소 = 클라이언트가 연결을 끊음) OpenAI 스트림을 닫고 끝낸다 (에러로 세지 않음)
+        """
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        semaphore, stats = self._slot(model)
+        stats.calls += 1
+        stats.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            self.logger.warning("%s stream timed out after %ss waiting for a slot", model, timeout)
+            raise
+        finally:
+            stats.waiting -= 1
+        stats.in_flight += 1
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await asyncio.wait_for(
+                self.client.chat.completions.create(model=model, messages=messages, stream=True, timeout=timeout, **kwargs),
+                deadline - loop.time())
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(response.__anext__(), deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            self.logger.warning("%s stream timed out after %ss", model, timeout)
+            raise
+        except (GeneratorExit, asyncio.CancelledError):
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            if response is not None:
+                await response.close()
+            stats.in_flight -= 1
+            stats.seconds += time.perf_counter() - started
+            semaphore.release()
+
+    def metrics(self):
+        return {model: {'limit': self.model_limits.get(model, self.default_limit),
+                        'calls': stats.calls,
+                        'errors': stats.errors,
+                        'timeouts': stats.timeouts,
+                        'waiting': stats.waiting,
+                        'in_flight': stats.in_flight,
+                        'avg_s': round(stats.seconds / stats.calls, 2) if stats.calls else None}
+                for model, stats in self._stats.items()}
@@ -0,0 +1,103 @@
+#네이버 금융 뉴스 HTML 파서
+#페이지 전체를 html.parser 로 트리로 만들지 않고, lxml 파서 + SoupStrainer 로 필요한 영역(mainNewsList / realtimeNewsList / dic_area)만
+#트리로 만든 뒤, 미리 컴파일해둔 CSS 셀렉터로 항목을 뽑는다. 벤치마크는 bench/bench_naver_parse.py (저장된 HTML fixture 사용)
+import re
+
+import soupsieve as sv
+from bs4 import BeautifulSoup, NavigableString, SoupStrainer
+
+PARSER = 'lxml'
+
+def _has_class(name):
+    # 파싱 도중에는 class 가 'mainNewsList _replaceNewsLink' 같은 문자열 그대로라 단어 단위로 매칭
+    return re.compile(r'(?:^|\s)%s(?:\s|$)' % re.escape(name))
+
+
+MAIN_NEWS = SoupStrainer('div', class_=_has_class('mainNewsList'))
+REALTIME_NEWS = SoupStrainer('ul', class_=_has_class('realtimeNewsList'))
+ARTICLE_BODY = SoupStrainer('article', id='dic_area')
+
+# 항목마다 반복해서 쓰는 셀렉터는 한번만 컴파일
+MAIN_ITEM = sv.compile('li.block1')
+MAIN_THUMB = sv.compile('.thumb img')
+MAIN_SUBJECT = sv.compile('dd.articleSubject a')
+MAIN_SUMMARY = sv.compile('dd.articleSummary')
+PRESS = sv.compile('.press')
+WDATE = sv.compile('.wdate')
+REALTIME_ITEM = sv.compile('ul.realtimeNewsList > li dl')
+REALTIME_FIELDS = sv.compile(':is(dt, dd)')
+ARTICLE = sv.compile('article#dic_area')
+
+
+def _text(selector, tag, strip=True):
+    found = selector.select_one(tag)
+    return found.get_text(strip=strip) if found is not None else None
+
+
+def _parse_main(html):
+    soup = BeautifulSoup(html, PARSER, parse_only=MAIN_NEWS)
+    news_items = []
+    for item in MAIN_ITEM.select(soup):
+        thumb_element = MAIN_THUMB.select_one(item)
+        # 타이틀이랑 링크까지 갖고오기
+        subject_element = MAIN_SUBJECT.select_one(item)
+        # 요약은 press랑 wdate 빼고 본문 텍스트만
+        summary_element = MAIN_SUMMARY.select_one(item)
+        news_items.append({
+            "thumb_url": thumb_element['src'] if thumb_element is not None else None,
+            "article_subject": subject_element.get_text(strip=True) if subject_element is not None else None,
+            "article_link": subject_element['href'] if subject_element is not None else None,
+            "summary": ''.join(str(child) for child in summary_element.contents
+                               if type(child) == NavigableString).strip() if summary_element is not None else None,
+            "press": _text(PRESS, item),
+            "wdate": _text(WDATE, item),
+        })
+    return news_items
+
+
+def _parse_realtime(html):
+    soup = BeautifulSoup(html, PARSER, parse_only=REALTIME_NEWS)
+    news_items = []
+    #  <dl> <dt><dd><dd> 순으로 1개 게시글인데 이미지 없으면 <dt>에 타이틀이 들어옴
+    for dl in REALTIME_ITEM.select(soup):
+        thumb_url, article_subject, article_link = None, '', ''
+        for element in REALTIME_FIELDS.select(dl):
+            classes = element.get('class', [])
+            if element.name == 'dt' and 'thumb' in classes:
+                img = element.find('img')
+                thumb_url = img['src'] if img is not None else None
+            elif 'articleSubject' in classes:
+                if element.name == 'dt':
+                    thumb_url = None  # 이미지 없이 제목만 있는 경우
+                link = element.find('a')
+                article_subject = link.get('title', '')
+                article_link = "https://news.naver.com" + link['href']
+            elif 'articleSummary' in classes:
+                first = element.contents[0] if element.contents else ''
+                news_items.append({
+                    "thumb_url": thumb_url,
+                    "article_subject": article_subject,
+                    "article_link": article_link,
+                    "summary": first.strip() if isinstance(first, str) else '',
+                    "press": _text(PRESS, element, strip=False) or '',
+                    "wdate": _text(WDATE, element, strip=False) or '',
+                })
+    return news_items
+
+
+def parse_news_list(html, url):
+    """
+    네이버 증권 뉴스 목록 페이지에서 기사 목록을 뽑는다. 메인뉴스(mainnews.naver)와 나머지(실시간 속보 등)는 마크업이 달라서 분기
+    """
+    if 'mainnews.naver' in url:
+        return _parse_main(html)
+    return _parse_realtime(html)
+
+
+def parse_news_detail(html):
+    """
+    기사 본문(article#dic_area) 안쪽 HTML. 본문이 없으면 None
+    """
+    soup = BeautifulSoup(html, PARSER, parse_only=ARTICLE_BODY)
+    dic_area = ARTICLE.select_one(soup)
+    return dic_area.decode_contents() if dic_area is not None else None
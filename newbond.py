@@ -2,75 +2,156 @@
 import time
 import json
 import random
-import requests
 import httpx
-from urllib.parse import quote 
 import asyncio
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO, StringIO
 from typing import List, Optional
 import base64
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import lru_cache
 from datetime import date, datetime, timedelta
-from typing import Optional
 # 기존 Util 함수들
-from google.cloud import vision
-from google.oauth2 import service_account
-from pydantic import BaseModel
+# (matplotlib, yfinance, finnhub, openai, google vision, dtaidistance 는 로딩이 무거워서 처음 쓰일때 import 함)
+from pydantic import BaseModel, Field
 import urllib.request
+from urllib.parse import urlsplit
 from pandas import Timestamp
 import pandas as pd
 import numpy as np 
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from bs4 import BeautifulSoup, NavigableString
-from scipy.spatial.distance import euclidean
-import seaborn as sns
-#금융관련 APIs
-import finnhub
-import fredpy as fp
-from fredapi import Fred
-import yfinance as yf
-from openai import OpenAI
-from fastdtw import fastdtw
-from dtaidistance import dtw
 #개인 클래스 파일 
 import fredAll
+from fredCache import SeriesStore
+from fredCatalog import SeriesCatalog
+from fredScheduler import ReleaseScheduler
+from fredTransform import parse_spec, compute_cached
+from yieldCurve import YieldCurve, TENORS
+from newsFilter import rank_news, get_matcher
+from naverParse import parse_news_list, parse_news_detail
+from newsStore import NewsStore, dedupe_stories, to_utc_time
+from downsample import downsample_series, downsample_frame
+from httpPool import HttpPool
+from llmGateway import LLMGateway
+from aioUtil import io_executor, cpu_executor, plot_executor, run_in, shutdown_executors, LoopStallMonitor, SWRCache
+from liveFeed import FeedHub, sse_stream, sse_event
+from contextlib import aclosing
+from yahooNews import NewsCrawler, news_item
 #config 파일
 import config
 #FAST API 관련
 import logging
-from fastapi import FastAPI, Query, Form, HTTPException, Request, File, UploadFile
-from fastapi.responses import HTMLResponse
+import sqlite3
+from fastapi import FastAPI, APIRouter, Query, Form, HTTPException, Request, File, UploadFile
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.responses import Response
 
-app = FastAPI()
+router = APIRouter()
 logging.basicConfig(level=logging.DEBUG)
 
 ##############################################          공통          ################################################
 
-# FastAPI에서 정적 파일과 템플릿을 제공하기 위한 설정
+# 앱 시작/종료시 처리. 외부 API 클라이언트들은 첫 요청때 만들어짐
+# FRED 발표일 스케줄러는 백그라운드에서 돌면서 서빙하는 시리즈를 미리 받아두고 발표 직후에만 갱신함 (지표 검색 카탈로그도 하루 한번)
+# 블로킹 작업은 aioUtil 실행기로 보내고, 그래도 이벤트 루프가 0.25초 이상 멈추면 멈춘 코루틴과 스택을 로그로 남김
+# 외부 API(RapidAPI, 네이버, KRX, FRED)는 앱 수명동안 유지되는 공용 커넥션 풀로만 호출함
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    http_pool = get_http_pool()
+    stall_monitor = LoopStallMonitor(threshold=0.25)
+    stall_monitor.start()
+    scheduler = ReleaseScheduler(get_fred(), get_series_store(), SERVED_SERIES,
+                                 catalog=get_fred_catalog(), catalog_scopes=CATALOG_SCOPES)
+    scheduler.start()
+    yield
+    live_feeds.close()
+    await scheduler.stop()
+    stall_monitor.stop()
+    fred_executor.shutdown(wait=False, cancel_futures=True)
+    shutdown_executors()
+    await http_pool.aclose()
+
+# 앱 생성 함수. 라우트는 router 에 등록하고 맨 아래에서 app = create_app() 으로 만든다
+def create_app():
+    app = FastAPI(lifespan=lifespan)
+    # FastAPI에서 정적 파일과 템플릿을 제공하기 위한 설정
+    app.mount("/static", StaticFiles(directory="chartHtml"), name="static")
+    app.include_router(router)
+    return app
+
 templates = Jinja2Templates(directory="chartHtml")
-app.mount("/static", StaticFiles(directory="chartHtml"), name="static")
 
-# API KEY 설정
-fp.api_key =config.FRED_API_KEY
-fred = Fred(api_key=config.FRED_API_KEY)
-finnhub_client = finnhub.Client(api_key=config.FINNHUB_KEY)
-client = OpenAI(api_key = config.OPENAI_API_KEY)
+# API KEY 설정 :: 클라이언트들은 처음 쓰일때 만들어짐 (import 시점에 네트워크 호출이나 무거운 모듈 로딩 없음)
 rapidAPI = config.RAPID_API_KEY
 
+@lru_cache(maxsize=None)
+def get_http_pool():
+    return HttpPool()  # 호스트별 keep-alive 클라이언트 모음
+
+@lru_cache(maxsize=None)
+def get_fred():
+    return fredAll.Fred(api_key=config.FRED_API_KEY, http_get=get_http_pool().get_sync)
+
+@lru_cache(maxsize=None)
+def get_series_store():
+    # FRED 시리즈는 로컬 Parquet 캐시를 거쳐서 읽음. 갱신은 발표일 스케줄러가 하고, TTL 은 스케줄러가 놓친 경우의 안전장치
+    return SeriesStore(get_fred(), refresh_interval=3 * 24 * 60 * 60)
+
+@lru_cache(maxsize=None)
+def get_yield_curve():
+    # 미국채 전 만기를 날짜 x 만기 행렬 하나로 들고 있는 수익률곡선 (채권 탭은 모두 여기서 읽음)
+    return YieldCurve(get_series_store(), executor=fred_executor)
+
+@lru_cache(maxsize=None)
+def get_news_store():
+    return NewsStore()  # 출처별 뉴스 기사 저장소 (중복/유사 기사 묶기)
+
+@lru_cache(maxsize=None)
+def get_news_crawler():
+    return NewsCrawler(pool=get_http_pool())  # Seeking Alpha 헤드라인 검색 크롤러 (본 기사 목록은 newsCache 에 남음)
+
+@lru_cache(maxsize=None)
+def get_fred_catalog():
+    return SeriesCatalog()  # 지표 검색용 FRED 메타데이터 카탈로그
+
+@lru_cache(maxsize=None)
+def get_finnhub_client():
+    import finnhub
+    return finnhub.Client(api_key=config.FINNHUB_KEY)
+
+@lru_cache(maxsize=None)
+def get_llm():
+    # GPT 호출은 전부 여기로 (공용 풀의 api.openai.com 연결 재사용 + 모델별 동시 호출 제한)
+    return LLMGateway(api_key=config.OPENAI_API_KEY, http_client=get_http_pool().async_client('api.openai.com'))
+
+@lru_cache(maxsize=None)
+def get_vision_client():
+    from google.cloud import vision
+    from google.oauth2 import service_account
+    # 서비스 계정 키 파일을 사용하여 인증 정보 생성
+    credentials = service_account.Credentials.from_service_account_file("sonvision-36a28cdac666.json")
+    return vision.ImageAnnotatorClient(credentials=credentials)
+
+@lru_cache(maxsize=None)
+def get_pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+@lru_cache(maxsize=None)
+def get_yfinance():
+    import yfinance as yf
+    return yf
+
 # 차트를 Base64 인코딩된 문자열로 변환하는 기본 함수
 def get_chart_base64(fig):
     buf = BytesIO()
     fig.savefig(buf, format="png", bbox_inches="tight")
-    plt.close(fig)  # 차트 닫기
+    get_pyplot().close(fig)  # 차트 닫기
     return base64.b64encode(buf.getvalue()).decode('utf-8')
 
 def get_chart_base64_plotly(fig):
@@ -78,9 +159,42 @@ def get_chart_base64_plotly(fig):
     img_bytes = fig.to_image(format="png")
     return base64.b64encode(img_bytes).decode('utf-8')
 
+# 외부 API 커넥션 풀 상태 (호스트별 요청수, 에러, 평균 지연, 열린 연결 수)
+@router.get("/api/http-pool")
+async def http_pool_metrics():
+    return get_http_pool().metrics()
+
+# GPT 호출 모델별 대기/진행/에러/타임아웃 수
+@router.get("/api/llm")
+async def llm_metrics():
+    return get_llm().metrics() if get_llm.cache_info().currsize else {}
+
+# GPT 답변 스트리밍 (SSE) 공통 :: 'token' 이벤트로 조각 텍스트, 끝나면 'done', 실패하면 'error'.
+# 클라이언트가 연결을 끊으면 StreamingResponse 가 제너레이터를 취소하고, 그 취소가 llmGateway.stream 까지 내려가서 OpenAI 응답도 닫힘
+async def token_events(model, messages, timeout):
+    async with aclosing(get_llm().stream(model, messages, timeout)) as tokens:
+        async for text in tokens:
+            yield 'token', {'text': text}
+
+async def stream_gpt(events):
+    yield b': start\n\n'  # 헤더와 첫 바이트를 바로 보내서, 준비 작업(데이터 조회, OCR)이나 첫 토큰을 기다리는 동안에도 응답이 시작되게
+    try:
+        async for event, data in events:
+            yield sse_event(event, data)
+        yield sse_event('done', {})
+    except Exception as e:
+        logging.error("An error occurred while streaming GPT answer: %s", str(e))
+        yield sse_event('error', {'detail': str(e) or e.__class__.__name__})
+    finally:
+        await events.aclose()
+
+def gpt_streaming_response(events):
+    return StreamingResponse(stream_gpt(events), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 ##############################################          MAIN          ################################################
 # 루트 경로에 대한 GET 요청 처리
-@app.get("/", response_class=HTMLResponse)
+@router.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     # 초기 페이지 렌더링. plot_html 변수가 없으므로 비워둡니다.
     return templates.TemplateResponse("chart_pilot.html", {"request": request, "plot_html": None})
@@ -88,42 +202,114 @@ async def read_root(request: Request):
 ######################################## 글로벌 주요경제지표 보여주기 [1.핵심지표] Starts ###########################################
 # series id 받아서 데이터 갖고오는 공통함수 
 def fetch_indicator(series_id: str, calculation: str = None) -> pd.DataFrame:
-    # Fetch series data using Fred class
-    df = fred.get_series(series_id=series_id)
-    df = df.reset_index().rename(columns={0: 'value', 'index': 'date'})
-    df['value'] = pd.to_numeric(df['value'], errors='coerce')
-    df['date'] = pd.to_datetime(df['date'])
-    df.set_index('date', inplace=True)
-    if calculation == "YoY":
-        df[f'{series_id}(YoY)'] = (df['value'] - df['value'].shift(12)) / df['value'].shift(12) * 100
-        df = df[[f'{series_id}(YoY)']]
-    
-    return df
+    # 로컬 시리즈 캐시에서 읽고, 계산(YoY 등)은 파생지표 엔진으로 (결과는 캐시에 memo 됨)
+    spec = parse_spec(f"{series_id}:{calculation}" if calculation else series_id)
+    store = get_series_store()
+    derived = compute_cached(store, {series_id: store.get_series(series_id)}, [spec])[spec]
+    return derived.to_frame(f'{series_id}({calculation})' if calculation else 'value')
+
+# FRED 요청용 스레드풀. 지표 여러개를 동시에 받아와도 FRED 쪽 동시 연결수는 이 크기로 제한됨
+fred_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fred")
+
+# 여러 지표를 병렬로 가져오는 함수. requested 는 {이름: TransformSpec}
+# 원본 시리즈들은 병렬로 받고, 파생지표 계산은 전체를 한번에 함. 실패한 지표는 errors 에 담고 성공한 것만 돌려줌
+def fetch_indicators_concurrently(requested: dict):
+    store = get_series_store()
+    series_ids = {series_id for spec in requested.values() for series_id in spec.series_ids}
+    base, base_errors = {}, {}
+    futures = {fred_executor.submit(store.get_series, series_id): series_id for series_id in series_ids}
+    for future in as_completed(futures):
+        series_id = futures[future]
+        try:
+            base[series_id] = future.result()
+        except Exception as e:
+            logging.error("An error occurred while fetching %s: %s", series_id, str(e))
+            base_errors[series_id] = str(e)
+
+    results, errors = {}, {}
+    specs = {}
+    for name, spec in requested.items():
+        failed = [series_id for series_id in spec.series_ids if series_id in base_errors]
+        if failed:
+            errors[name] = base_errors[failed[0]]
+        else:
+            specs[name] = spec
+    derived = compute_cached(store, base, specs.values())
+    for name, spec in specs.items():
+        results[name] = derived[spec].to_frame(name)
+    return results, errors
+
+# 핵심지표 화면에서 쓰는 지표들과 계산방식
+ECONOMIC_INDICATORS = {
+    "CPIAUCSL": "YoY",
+    "PCEPI": "YoY",
+    "PPIFID": "YoY",
+    "DFEDTARU": None,
+    "CSUSHPISA": "YoY",
+    "A191RL1Q225SBEA": None
+}
+# 서버가 내려주는 FRED 시리즈 전체 (발표일 스케줄러가 미리 받아두는 대상)
+SERVED_SERIES = list(ECONOMIC_INDICATORS) + ["FEDFUNDS"] + [series_id for _, series_id in TENORS]
+# 지표 검색 카탈로그를 채우는 FRED 검색어 범위 (스케줄러가 시작할때 + 하루 한번 바뀐 것만 갱신)
+CATALOG_SCOPES = ["consumer price index", "producer price index", "personal consumption expenditures", "inflation",
+                  "interest rate", "treasury yield", "federal funds", "unemployment", "payroll employment",
+                  "gross domestic product", "industrial production", "retail sales", "housing", "money supply",
+                  "exchange rate", "oil price"]
+
+# 서버가 받아두는 시리즈나 지표 검색 카탈로그에 있는 시리즈만 (아무 id 나 FRED 에서 받아서 캐시에 쌓지 않게)
+def check_known_series(spec):
+    for series_id in spec.series_ids:
+        if series_id not in SERVED_SERIES and not get_fred_catalog().contains(series_id):
+            raise ValueError(f"Unknown series id '{series_id}', find it with /api/indicator-search first")
+    return spec
+
+# 지표 합칠때 쓸 수 있는 주기. native 는 각 지표의 원래 관측일들의 합집합을 그대로 씀
+FREQUENCY_RULES = {"native": None, "daily": "D", "weekly": "W", "monthly": "MS"}
+
+# start_date 이전 구간은 리샘플 전에 잘라냄. 단, 창 시작부분이 ffill 되도록 직전 관측치 1개는 남겨둠
+def clip_to_window(df, start_date):
+    pos = df.index.searchsorted(pd.Timestamp(start_date), side="right") - 1
+    return df.iloc[max(pos, 0):]
+
 # 갖고 온 데이터들 합쳐서 Merge 하는 함수 
-def fetch_and_merge_economic_data(start_date="2020-01-01", selected_indicators=None):
-    indicators = {
-        "CPIAUCSL": "YoY",
-        "PCEPI": "YoY",
-        "PPIFID": "YoY",
-        "DFEDTARU": None,
-        "CSUSHPISA": "YoY",
-        "A191RL1Q225SBEA": None
-    }
+def fetch_and_merge_economic_data(start_date="2020-01-01", selected_indicators=None, frequency="native"):
+    indicators = ECONOMIC_INDICATORS
+    if frequency not in FREQUENCY_RULES:
+        raise ValueError(f"frequency should be one of {list(FREQUENCY_RULES)}")
+    rule = FREQUENCY_RULES[frequency]
     
     if not selected_indicators:
         selected_indicators = ["CPIAUCSL"]  # 기본값으로 CPI 설정
 
-    # 선택된 지표에 해당하는 데이터만 가져오기
+    # 선택된 지표에 해당하는 데이터만 병렬로 가져오기
+    # 핵심지표는 기본 계산방식을 쓰고, 그 외에는 'CPIAUCSL:mom', 'DGS10-DGS2:spread' 같은 파생지표 표현을 받음
+    requested, parse_errors = {}, {}
+    for name in selected_indicators:
+        try:
+            if name in indicators:
+                requested[name] = parse_spec(f"{name}:{indicators[name]}" if indicators[name] else name)
+            else:
+                requested[name] = check_known_series(parse_spec(name))
+        except ValueError as e:
+            parse_errors[name] = str(e)
+    results, errors = fetch_indicators_concurrently(requested)
+    errors.update(parse_errors)
+
     dfs = []
-    for series_id, calculation in indicators.items():
-        if series_id in selected_indicators:
-            df = fetch_indicator(series_id, calculation)
-            df = df.resample("D").asfreq().ffill()
+    for name in selected_indicators:  # 요청한 순서대로 합치기
+        if name in results:
+            # YoY 같은 계산은 전체 이력으로 끝난 상태라 여기서 기간을 먼저 잘라도 됨
+            df = clip_to_window(results[name].dropna(), start_date)
+            if rule is not None:
+                df = df.resample(rule).last()
+            df.columns = [name]  # 열 이름을 요청한 지표 이름으로 설정
             dfs.append(df)
-    
-    merged_df = pd.concat(dfs, axis=1).ffill()  # 여러 DataFrame을 합침
-    merged_df.columns = selected_indicators  # 열 이름을 지표 ID로 설정
-    return merged_df[start_date:]
+    if not dfs:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='date')), errors
+
+    # 관측일 합집합 기준으로 합치고 빈칸은 직전 값으로 채움
+    merged_df = pd.concat(dfs, axis=1).sort_index().ffill()
+    return merged_df[start_date:], errors
 
 #서버에서 차트 만들어서 내려주는 형태 :: 차트가 안예뻐서 일단보류;
 '''@app.get("/api/economic-indicators")
@@ -141,14 +327,17 @@ async def get_economic_indicators():
     economic_indicators_chart_base64 = get_chart_base64_plotly(fig)
     return JSONResponse(content={"economic_indicators_chart": economic_indicators_chart_base64}) '''
 
-@app.get("/api/economic-indicators")
-async def get_economic_indicators(indicators: str = None, aiOpinion: Optional[bool] = False):
+async def build_indicator_chart(indicators, frequency, max_points):
     if indicators:
         selected_indicators = indicators.split(",")  # 쉼표로 구분된 문자열을 리스트로 변환
     else:
         selected_indicators = ["CPIAUCSL"]  # 기본값 설정
 
-    df = fetch_and_merge_economic_data("2020-01-01", selected_indicators)
+    try:
+        df, errors = await run_in(io_executor, fetch_and_merge_economic_data, "2020-01-01", selected_indicators, frequency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    df = downsample_frame(df, max_points)  # 화면에 그릴 수 있는 만큼만 내려주기
     labels = df.index.strftime('%Y-%m-%d').tolist()
     datasets = []
 
@@ -161,7 +350,11 @@ async def get_economic_indicators(indicators: str = None, aiOpinion: Optional[bo
             "fill": False
         })
 
-    response_data = {"labels": labels, "datasets": datasets}
+    return {"labels": labels, "datasets": datasets, "errors": errors}
+
+@router.get("/api/economic-indicators")
+async def get_economic_indicators(indicators: str = None, aiOpinion: Optional[bool] = False, frequency: str = "native", max_points: int = Query(default=2000, ge=3)):
+    response_data = await build_indicator_chart(indicators, frequency, max_points)
     #print("labels={}".format(response_data['labels']))
     #print("datasets={}".format(response_data['datasets']))    
     if aiOpinion:
@@ -171,18 +364,28 @@ async def get_economic_indicators(indicators: str = None, aiOpinion: Optional[bo
         response_data["chart_talk"] = ""        
     return JSONResponse(content=response_data)
 
+# 차트 AI 의견만 토큰 단위로 (SSE). 차트는 aiOpinion=false 로 먼저 그리고, 의견은 오는 대로 붙임
+@router.get("/api/economic-indicators/chart-talk/stream")
+async def stream_chart_talk(indicators: str = None, frequency: str = "native", max_points: int = Query(default=2000, ge=3)):
+    response_data = await build_indicator_chart(indicators, frequency, max_points)
+    return gpt_streaming_response(token_events("gpt-4-0125-preview", chart_talk_messages(response_data), 90))
+
+# 지표 검색 :: FRED 에 안가고 로컬 카탈로그에서 바로 검색
+@router.get("/api/indicator-search")
+async def search_indicators(q: str, limit: int = 20, frequency: Optional[str] = None):
+    return {"items": await run_in(io_executor, get_fred_catalog().search, q, limit, frequency)}
+
+def chart_talk_messages(response_data):
+    SYSTEM_PROMPT = "You are an outstanding economist and chart data analyst. I'm going to show you annual chart data for specific economic indicators. Please explain in as much detail as possible and share your opinion on the chart trends. It would be even better if you could explain the future market outlook based on facts. However, Do not provide explanations or definitions for individual indicators. Instead, analyze the patterns of the data and its impact on society or the market, and share your opinion on it. Please mark the part you think is the most important with a red tag so that it appears in red."
+    prompt = "다음이 system 이 이야기한 차트 데이터야. system prompt가 말한대로 분석해줘. 단 답변을 꼭 한국어로 해줘. 차트데이터 : " + str(response_data)
+    return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+            ]
+
 async def gpt4_chart_talk(response_data):
     try:
-        SYSTEM_PROMPT = "You are an outstanding economist and chart data analyst. I'm going to show you annual chart data for specific economic indicators. Please explain in as much detail as possible and share your opinion on the chart trends. It would be even better if you could explain the future market outlook based on facts. However, Do not provide explanations or definitions for individual indicators. Instead, analyze the patterns of the data and its impact on society or the market, and share your opinion on it. Please mark the part you think is the most important with a red tag so that it appears in red."
-        prompt = "다음이 system 이 이야기한 차트 데이터야. system prompt가 말한대로 분석해줘. 단 답변을 꼭 한국어로 해줘. 차트데이터 : " + str(response_data)
-        completion = client.chat.completions.create(
-            model="gpt-4-0125-preview",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt}
-                ]
-        )
-        return completion.choices[0].message.content
+        return await get_llm().chat(model="gpt-4-0125-preview", messages=chart_talk_messages(response_data), timeout=90)
     except Exception as e:
         logging.error("An error occurred in gpt4_news_function: %s", str(e))
         return None
@@ -210,36 +413,21 @@ def convert_data_for_json(data):
 
 # 기준금리 데이터를 가져오는 함수
 def get_base_rate(start_date, end_date):
-    df1 = fp.series('FEDFUNDS', end_date)
-    data = df1.data.loc[(df1.data.index>=start_date) & (df1.data.index<=end_date)]
+    data = get_series_store().get_series('FEDFUNDS', start_date, end_date)
     return data
 
 # 미국채 이자율 데이터를 가져와 보여주는 함수
-def create_interest_rate_chart():
-    rate_10Y = fred.get_series('DGS10').fillna(0)
-    rate_2Y = fred.get_series('DGS2').fillna(0)
-    rate_3M = fred.get_series('DGS3MO').fillna(0)
-
-    # 현재 날짜에서 20년을 빼서 시작 날짜 계산
+def create_interest_rate_chart(max_points=None):
+    # 현재 날짜에서 20년을 빼서 시작 날짜 계산, 수익률곡선 행렬에서 최근 20년간 10Y/2Y/3M 만 꺼냄
     twenty_years_ago = pd.to_datetime('today') - pd.DateOffset(years=20)
-    
-    # 데이터를 최근 20년간으로 필터링
-    rate_10Y = rate_10Y[twenty_years_ago:]
-    rate_2Y = rate_2Y[twenty_years_ago:]
-    rate_3M = rate_3M[twenty_years_ago:]
-
-    # Timestamp 객체를 문자열로 변환
-    rate_10Y_dates = rate_10Y.index.strftime('%Y-%m-%d').tolist()
-    rate_2Y_dates = rate_2Y.index.strftime('%Y-%m-%d').tolist()
-    rate_3M_dates = rate_3M.index.strftime('%Y-%m-%d').tolist()
-
-    # 차트 데이터 준비
-    chart_data = [
-        {'x': rate_10Y_dates, 'y': rate_10Y.values.tolist(), 'type': 'scatter', 'mode': 'lines', 'name': '10Y'},
-        {'x': rate_2Y_dates, 'y': rate_2Y.values.tolist(), 'type': 'scatter', 'mode': 'lines', 'name': '2Y'},
-        {'x': rate_3M_dates, 'y': rate_3M.values.tolist(), 'type': 'scatter', 'mode': 'lines', 'name': '3M'}
-    ]
+    rates = get_yield_curve().refresh().frame(start=twenty_years_ago, tenors=['10Y', '2Y', '3M'])
 
+    # 휴장일/결측은 0 으로 채우지 않고 빼서(선이 0 으로 꺼지지 않게) 트레이스별로 max_points 이하로 줄이기
+    chart_data = []
+    for tenor in rates.columns:
+        rate = downsample_series(rates[tenor].dropna(), max_points)
+        chart_data.append({'x': rate.index.strftime('%Y-%m-%d').tolist(), 'y': rate.values.tolist(),
+                           'type': 'scatter', 'mode': 'lines', 'name': tenor})
 
     # 차트 레이아웃 설정
     chart_layout = {
@@ -257,11 +445,11 @@ def create_interest_rate_chart():
     # JSON으로 변환 가능한 딕셔너리 반환
     return {'data': chart_data, 'layout': chart_layout}
 
-def show_base_rate():
+def show_base_rate(max_points=None):
     # 데이터 가져오기 및 변환   #날짜 입력받는 건 나중에 하자
     start_date = '2000-01-01'
     end_date = '2023-02-01'
-    data = get_base_rate(start_date, end_date)
+    data = downsample_series(get_base_rate(start_date, end_date), max_points)
 
     dates_converted, values = convert_data_for_json(data)
 
@@ -288,24 +476,89 @@ def show_base_rate():
     return {'data': chart_data, 'layout': chart_layout}
 
 # 채권 차트요청 처리
-@app.post("/get_bonds_data")
-async def get_bonds_data():
-    base_rate_chart = show_base_rate()
-    interest_rate_chart = create_interest_rate_chart()
+@router.post("/get_bonds_data")
+async def get_bonds_data(max_points: int = Query(default=2000, ge=3)):
+    base_rate_chart, interest_rate_chart = await asyncio.gather(
+        run_in(io_executor, show_base_rate, max_points),
+        run_in(io_executor, create_interest_rate_chart, max_points))
 
     return JSONResponse({
         "base_rate_chart": base_rate_chart,
         "interest_rate_chart": interest_rate_chart
     })
 
+# 수익률곡선 조회 : 최신(또는 date 시점) 곡선, compare 시점 대비 변화, 스프레드 추이와 역전 구간
+@router.get("/api/yield-curve")
+async def yield_curve(date: Optional[str] = None, compare: Optional[str] = None,
+                      long: str = '10Y', short: str = '2Y', start: Optional[str] = None, max_points: int = Query(default=2000, ge=3)):
+    curve = await run_in(io_executor, get_yield_curve().refresh)
+    if long not in curve.labels or short not in curve.labels:
+        raise HTTPException(status_code=400, detail=f"tenor should be one of {curve.labels}")
+    try:
+        snapshot = curve.snapshot(date)
+        compare = compare or (pd.Timestamp(snapshot.name) - pd.DateOffset(years=1) if snapshot.name is not None else None)
+        delta = curve.shape_delta(compare, date) if compare is not None else None
+        spread = downsample_series(curve.spread(long, short, start=start), max_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return JSONResponse({
+        "date": snapshot.name.strftime('%Y-%m-%d') if snapshot.name is not None else None,
+        "curve": {'x': snapshot.index.tolist(), 'y': [None if pd.isna(v) else v for v in snapshot.values]},
+        "delta": delta,
+        "spread": {'name': spread.name, 'x': spread.index.strftime('%Y-%m-%d').tolist(), 'y': spread.values.tolist()},
+        "inversions": curve.inversions(long, short, start=start),
+    })
+
 #test 
 '''async def rapid():
     get_bonds_data_data = await get_bonds_data()
     print(get_bonds_data_data)
 asyncio.run(rapid())'''
 
+# Seeking Alpha 뉴스 목록 캐시 :: (엔드포인트, 카테고리 묶음, size) 키로 3분간 그대로, 그 뒤 15분까지는 바로 주면서 뒤에서 갱신
+# 여러 사용자가 같은 카테고리를 동시에 열면 RapidAPI 호출은 한번만 나감
+news_list_cache = SWRCache(ttl=180, stale_ttl=900)
+# 뉴스 탭 실시간 피드 :: 소스마다 poller 하나 (목록은 위 캐시를 거쳐서 받으므로 upstream 호출은 ttl 당 한번)
+live_feeds = FeedHub()
+NEWS_FEED_INTERVAL = 60
+NAVER_FEED_INTERVAL = 30  # 네이버 목록은 캐시 없이 바로 긁어오므로 주기만큼만 요청이 나감
+
+# 뉴스 저장소에 넣고 기사별 story_id 를 돌려줌. 저장소 문제로 뉴스 화면이 안 나오면 안되므로 실패하면 None
+def ingest_news(source, articles):
+    try:
+        return [result['story_id'] for result in get_news_store().add(source, articles)]
+    except sqlite3.Error as e:
+        logging.error("An error occurred while storing %s news: %s", source, str(e))
+        return None
+
+# 같은 목록 안에서 이미 나온 story 는 빼기
+def unique_by_story(items, story_ids):
+    if story_ids is None:
+        return items
+    seen, kept = set(), []
+    for item, story_id in zip(items, story_ids):
+        if story_id not in seen:
+            seen.add(story_id)
+            kept.append(item)
+    return kept
+
+# RapidAPI 에서 새로 받아온 Seeking Alpha 목록만 저장소에 넣음 (캐시에서 나가는 건 다시 처리 안함)
+async def collect_seeking_alpha(news_fetch):
+    news_json = await news_fetch
+    items = news_json.get('data', [])
+    articles = [{'title': item['attributes'].get('title'), 'content': item['attributes'].get('content'),
+                 'published': item['attributes'].get('publishOn'), 'url': (item.get('links') or {}).get('self'),
+                 'image': item['attributes'].get('gettyImageUrl')}
+                for item in items]
+    story_ids = await run_in(io_executor, ingest_news, 'seekingalpha', articles)
+    if story_ids is not None:
+        for item, story_id in zip(items, story_ids):
+            item['story_id'] = story_id
+    return dict(news_json, data=unique_by_story(items, story_ids))
+
 #### 채권 관련 뉴스 뽑아내기
-def rapidapi_bond_news(category):
+async def rapidapi_bond_news(category):
     url = "https://seeking-alpha.p.rapidapi.com/news/v2/list"
     querystring = {"category": category, "size": "100", "number": "1"}
     headers = {
@@ -313,56 +566,77 @@ def rapidapi_bond_news(category):
 	    "X-RapidAPI-Host": "seeking-alpha.p.rapidapi.com"
     }    
         
-    response = requests.get(url, headers=headers, params=querystring)
+    response = await get_http_pool().get(url, headers=headers, params=querystring)
+    response.raise_for_status()  # 에러 응답(쿼터 초과 등)은 캐시되지 않게
     return response.json()
 
 # seeking alpha 뉴스에서 쓸데없는 파라미터들 없애기
+# 뉴스 파이프라인은 이 레코드 리스트를 메모리에서 그대로 넘기고, 응답 보낼때 orjson 으로 한번만 직렬화함
+@dataclass
+class NewsRecord:
+    publishOn: Optional[str]
+    gettyImageUrl: Optional[str]
+    title: Optional[str]
+    content: Optional[str]
+    relevance: Optional[dict] = None
+    story_id: Optional[int] = None
+    id: Optional[str] = None  # Seeking Alpha 기사 id (실시간 피드 diff 기준)
+
 def extract_news_data(news_json):
     extracted_data = []
     for item in news_json['data']:
         news_item = item['attributes']
-        extracted_item = {
-            'publishOn': news_item.get('publishOn', None),
-            'gettyImageUrl': news_item.get('gettyImageUrl', None),
-            'title': news_item.get('title', None),
-            'content': news_item.get('content', None)
-        }
-        extracted_data.append(extracted_item)
-    return json.dumps(extracted_data, indent=4, ensure_ascii=False)
+        extracted_data.append(NewsRecord(
+            publishOn=news_item.get('publishOn'),
+            gettyImageUrl=news_item.get('gettyImageUrl'),
+            title=news_item.get('title'),
+            content=news_item.get('content'),
+            relevance=item.get('relevance'),
+            story_id=item.get('story_id'),
+            id=item.get('id')
+        ))
+    return extracted_data
 
-def filter_bond_news(news_json): 
-    # 이 부분이 문제네..
-    bond_keywords = ['bonds', 'treasury', 'FOMC', 'fixed income', 'interest rate', 'inflation', 'yield', 'credit rating', 'default risk', 'duration']
-    filtered_news = {"data": []}
+# 주제(bond/fx/equity/commodity) 키워드가 나온 기사만 관련도 순으로. 키워드/가중치는 newsFilter.TAXONOMIES
+def filter_bond_news(news_json, topic='bond', top_n=None):
+    return {"data": rank_news(news_json['data'], topic, top_n)}
 
-    for item in news_json['data']:
-        title = item['attributes'].get('content', '').lower()
-        if any(keyword in title for keyword in bond_keywords):
-            filtered_news["data"].append(item)
-
-    return filtered_news
-
-# 채권관련 뉴스만 뽑아오도록 해보자 ㅠ
-@app.get("/bond-news/{category}")
-async def fetch_bond_news(category: str):
-    news_json = rapidapi_bond_news(category)
-    filtered_news_json = filter_bond_news(news_json)
-    extracted_data = json.loads(extract_news_data(filtered_news_json))
-    return extracted_data
+# 채권관련 뉴스만 뽑아오도록 해보자 ㅠ  :: topic 으로 다른 탭(fx, equity, commodity)도, top 으로 상위 N개만
+async def load_bond_news(category, topic='bond', top_n=None):
+    news_json = await news_list_cache.get(("bond-news", category, 100), lambda: collect_seeking_alpha(rapidapi_bond_news(category)))
+    return extract_news_data(filter_bond_news(news_json, topic, top_n))
+
+@router.get("/bond-news/{category}")
+async def fetch_bond_news(category: str, topic: str = 'bond', top: Optional[int] = Query(default=None, ge=1)):
+    try:
+        return ORJSONResponse(await load_bond_news(category, topic, top))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# 채권 뉴스 실시간 피드 (SSE) :: 처음엔 snapshot(전체 목록), 이후엔 diff(added 기사 / removed id / order)만
+@router.get("/live/bond-news/{category}")
+async def live_bond_news(request: Request, category: str, topic: str = 'bond', top: Optional[int] = Query(default=None, ge=1)):
+    try:
+        get_matcher(topic)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    events = live_feeds.subscribe(("bond-news", category, topic, top), lambda: load_bond_news(category, topic, top),
+                                  lambda record: record.id, NEWS_FEED_INTERVAL)
+    return StreamingResponse(sse_stream(events, request), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 # 채권뉴스 GPT 이용해서 번역해보기 //메뉴3 일반뉴스 번역에서도 씀
-def translate_gpt(text):
+async def translate_gpt(text):
     try:
         SYSTEM_PROMPT = "다음 내용을 한국어로 번역해줘. url이나 링크 부분만 번역하지마" 
         prompt = f"영어를 한국어로 번역해서 알려줘. 내용은 다음과 같아\n{text}"
-        response = client.chat.completions.create(
+        return await get_llm().chat(
             model="gpt-4",
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
-                ]
+                ],
+            timeout=60
         )
-        return response.choices[0].message.content
     except Exception as e:
         logging.error("An error occurred in translate_gpt function: %s", str(e))
         return None       
@@ -370,11 +644,12 @@ def translate_gpt(text):
 class TranslateRequest(BaseModel):
     title: str
     content: str
-@app.post("/translate")
+@router.post("/translate")
 async def translate_text(request: TranslateRequest):
     # GPT를 호출하여 번역하는 함수
-    translated_title = translate_gpt(request.title)
-    translated_content = translate_gpt(request.content)
+    translated_title, translated_content = await asyncio.gather(
+        translate_gpt(request.title),
+        translate_gpt(request.content))
     
     return {"title": translated_title, "content": translated_content}
 
@@ -388,7 +663,7 @@ asyncio.run(rapid())'''
 
 ######################################## CALENDAR 보여주기 Starts ###########################################
 # 증시 캘린더 관련 함수 
-@app.post("/calendar", response_class=JSONResponse)
+@router.post("/calendar", response_class=JSONResponse)
 async def get_calendar(request: Request):
     calendar_data = await rapidapi_calendar()
     return JSONResponse(content=calendar_data)  # JSON 형식으로 데이터 반환
@@ -403,8 +678,7 @@ async def rapidapi_calendar():
 	    "X-RapidAPI-Host": "trader-calendar.p.rapidapi.com"
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=payload, headers=headers)
+    response = await get_http_pool().post(url, json=payload, headers=headers)
     calendar_data = response.json()
     return calendar_data
 
@@ -412,14 +686,59 @@ async def rapidapi_calendar():
 ######################################## NEWS 보여주기 Starts ##############################################
 
 # Seeking Alpha 관련 뉴스 호출 함수
-@app.post("/seekingNews", response_class=JSONResponse)
+@router.post("/seekingNews", response_class=JSONResponse)
 async def get_seekingNews(request: Request):
     form_data = await request.json()
-    categories = form_data.get("categories", [])
+    categories = tuple(sorted(set(form_data.get("categories", []))))  # 순서만 다른 같은 카테고리 묶음은 같은 캐시
+    return ORJSONResponse(await load_seeking_news(categories))
+
+async def load_seeking_news(categories):
     category_query = "|".join(categories)
-    original_seekingNews = await rapidapi_seekingNews(category_query)
-    seekingNews_data = extract_news_data(original_seekingNews)
-    return JSONResponse(content=seekingNews_data)   
+    original_seekingNews = await news_list_cache.get(("seekingNews", categories, 10), lambda: collect_seeking_alpha(rapidapi_seekingNews(category_query)))
+    return extract_news_data(original_seekingNews)
+
+# Seeking Alpha 뉴스 실시간 피드 (SSE). EventSource 는 GET 만 되므로 카테고리는 ?categories=a&categories=b
+@router.get("/live/seekingNews")
+async def live_seekingNews(request: Request, categories: List[str] = Query(default=[])):
+    categories = tuple(sorted(set(categories)))
+    events = live_feeds.subscribe(("seekingNews", categories), lambda: load_seeking_news(categories),
+                                  lambda record: record.id, NEWS_FEED_INTERVAL)
+    return StreamingResponse(sse_stream(events, request), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# 키워드 검색 결과 전체 기사 목록. 크롤러는 아직 안 본 기사만 받아오고(저장소에 넣음), 이미 본 기사는 저장소에서 꺼내서 채움
+# 크롤 -> 저장 -> 조회를 한번에 하나씩 (다른 크롤이 받아서 아직 저장 안한 기사를 조회에서 놓치지 않게)
+crawl_lock = asyncio.Lock()
+
+async def load_crawled_news(keyword, pages):
+    async with crawl_lock:
+        crawled = await collect_seeking_alpha(get_news_crawler().crawl(keyword, pages))
+        return await crawled_news_list(crawled)
+
+async def crawled_news_list(crawled):
+    try:
+        stored = await run_in(io_executor, get_news_store().by_urls, [urlsplit(link).path for link in crawled['links']])
+    except sqlite3.Error as e:
+        logging.error("An error occurred while loading crawled news: %s", str(e))
+        return crawled  # 저장소를 못 읽으면 이번에 새로 받은 기사만
+    items = []
+    for link in crawled['links']:
+        article = stored.get(urlsplit(link).path)
+        if article is not None:
+            item = news_item(link, article['title'], article['content'], article['published'], article['image'])
+            item['story_id'] = article['story_id']
+            items.append(item)
+    return {"data": unique_by_story(items, [item['story_id'] for item in items]), "meta": crawled.get("meta")}
+
+# 키워드로 Seeking Alpha 헤드라인 검색해서 긁어오기 (RapidAPI 카테고리에 없는 주제용). 새 기사만 실제로 받아옴
+@router.get("/api/crawl-news")
+async def crawl_news(keyword: str, pages: int = Query(default=1, ge=1, le=5)):
+    news_json = await news_list_cache.get(("crawl", keyword, pages), lambda: load_crawled_news(keyword, pages))
+    return ORJSONResponse({"data": extract_news_data(news_json), "meta": news_json.get("meta")})
+
+# 실시간 피드별 구독자 수 / 들고있는 기사 수
+@router.get("/api/live-feeds")
+async def live_feed_metrics():
+    return live_feeds.metrics()
     
 async def rapidapi_seekingNews(categories):
     url = "https://seeking-alpha.p.rapidapi.com/news/v2/list"
@@ -430,7 +749,8 @@ async def rapidapi_seekingNews(categories):
 	    "X-RapidAPI-Host": "seeking-alpha.p.rapidapi.com"
     }
     
-    response = requests.get(url, headers=headers, params=querystring)
+    response = await get_http_pool().get(url, headers=headers, params=querystring)
+    response.raise_for_status()  # 에러 응답(쿼터 초과 등)은 캐시되지 않게
     return response.json() 
 
 '''# RapidAPI 테스트용
@@ -446,66 +766,80 @@ def fred_test():
     print(data2)
 fred_test()'''
 
-# 뉴스 json에서 gpt로 던질 내용만 뽑아내기
-def extract_title_and_content(json_str):
-    json_data = json.loads(json_str)
+# 뉴스 목록(클라이언트가 /seekingNews 응답을 그대로 돌려보낸 리스트)에서 gpt로 던질 내용만 뽑아내기
+def extract_title_and_content(news):
+    if isinstance(news, str):  # 예전 클라이언트는 JSON 문자열로 보냄
+        news = json.loads(news)
     title_and_content = []
-    for item in json_data:
+    for item in news:
         title = item['title']
         content = item['content']
         title_and_content.append({'title': title, 'content': content})
     return title_and_content
 
 # GPT4 에 뉴스요약을 요청 
+def news_sum_messages(newsData, SYSTEM_PROMPT):
+    prompt = "다음이 system 이 이야기한 뉴스 데이터야. system prompt가 말한대로 실행해줘. 단 답변을 꼭 한국어로 해줘. 너의 전망에 대해서는 빨간색으로 보이도록 태그를 달아서 줘. 뉴스 데이터 : " + str(newsData)
+    return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+            ]
+
 async def gpt4_news_sum(newsData, SYSTEM_PROMPT):
     try:
-        prompt = "다음이 system 이 이야기한 뉴스 데이터야. system prompt가 말한대로 실행해줘. 단 답변을 꼭 한국어로 해줘. 너의 전망에 대해서는 빨간색으로 보이도록 태그를 달아서 줘. 뉴스 데이터 : " + str(newsData)
-        completion = client.chat.completions.create(
-            model="gpt-4-0125-preview",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt}
-                ]
-        )
-        return completion.choices[0].message.content
+        return await get_llm().chat(model="gpt-4-0125-preview", messages=news_sum_messages(newsData, SYSTEM_PROMPT), timeout=120)
     except Exception as e:
         logging.error("An error occurred in gpt4_news_sum function: %s", str(e))
         return None
 
-@app.post("/gptRequest")
-async def gpt_request(request_data: dict):
-    action = request_data.get("action")
-    g_news = request_data.get("g_news")
-
-    SYSTEM_PROMPT = ""
+# action 별 SYSTEM_PROMPT 와 GPT 에 넘길 뉴스 데이터. 모르는 action 이면 None
+def gpt_request_prompt(action, g_news):
     if action == "translate":
         # 한국어로 번역하기에 대한 처리
         SYSTEM_PROMPT = "You are an expert in translation. Translate the title and content from the following JSON data into Korean. Return the translated content in the same JSON format, but only translate the title and content into Korean. Do not provide any other response besides the JSON format."
-        gpt_result = await gpt4_news_sum(g_news, SYSTEM_PROMPT)
+        news_json = g_news if isinstance(g_news, str) else json.dumps(g_news, ensure_ascii=False)  # 같은 JSON 형식으로 돌려받도록
+        return SYSTEM_PROMPT, news_json
 
     elif action == "opinions":
         # AI 의견보기에 대한 처리
         SYSTEM_PROMPT = "Given the provided news data, please provide your expert analysis and insights on the current market trends and future prospects. Consider factors such as recent developments, market sentiment, and potential impacts on various industries based on the news. Your analysis should be comprehensive, well-informed, and forward-looking, offering valuable insights for investors and stakeholders. Thank you for your expertise"
-        digest_news = extract_title_and_content(g_news)        
-        gpt_result = await gpt4_news_sum(digest_news, SYSTEM_PROMPT)
+        digest_news = dedupe_stories(extract_title_and_content(g_news))  # 같은 기사가 프롬프트에 두번 안 들어가게
+        return SYSTEM_PROMPT, digest_news
 
     elif action == "summarize":
         # 내용 요약하기에 대한 처리
         SYSTEM_PROMPT = "You're an expert in data summarization. Given the provided JSON data, please summarize its contents systematically and comprehensively into about 20 sentences, ignoring JSON parameters unrelated to news articles."        
-        digest_news = extract_title_and_content(g_news)
-        gpt_result = await gpt4_news_sum(digest_news, SYSTEM_PROMPT)
+        digest_news = dedupe_stories(extract_title_and_content(g_news))
+        return SYSTEM_PROMPT, digest_news
 
     elif action == "navergpt":
         # 네이버 뉴스에 대한 GPT 의견 묻기임 
         SYSTEM_PROMPT = "You have a remarkable ability to grasp the essence of written materials and are adept at summarizing news data. Presented below is a collection of the latest news updates. Please provide a summary of this content in about 10 lines. Additionally, offer a logical and systematic analysis of the potential effects these news items could have on the financial markets or society at large, along with a perspective on future implications."        
-        digest_news = g_news
-        gpt_result = await gpt4_news_sum(digest_news, SYSTEM_PROMPT)        
-        
-    else:
+        digest_news = '\n'.join(dedupe_stories([line for line in g_news.split('\n') if line.strip()], text=lambda line: ('', line)))
+        return SYSTEM_PROMPT, digest_news
+
+    return None
+
+@router.post("/gptRequest")
+async def gpt_request(request_data: dict):
+    prompt = gpt_request_prompt(request_data.get("action"), request_data.get("g_news"))
+    if prompt is None:
         gpt_result = {"error": "Invalid action"}
+    else:
+        SYSTEM_PROMPT, digest_news = prompt
+        gpt_result = await gpt4_news_sum(digest_news, SYSTEM_PROMPT)
     
     return {"result": gpt_result}
 
+# /gptRequest 의 스트리밍 버전 (SSE). 번역(translate)처럼 JSON 전체가 필요한 건 기존 /gptRequest 로
+@router.post("/gptRequest/stream")
+async def gpt_request_stream(request_data: dict):
+    prompt = gpt_request_prompt(request_data.get("action"), request_data.get("g_news"))
+    if prompt is None:
+        raise HTTPException(status_code=400, detail="Invalid action")
+    SYSTEM_PROMPT, digest_news = prompt
+    return gpt_streaming_response(token_events("gpt-4-0125-preview", news_sum_messages(digest_news, SYSTEM_PROMPT), 120))
+
 ######################################## NEWS 보여주기 Ends  ##############################################
 
 ''' 테스트
@@ -524,7 +858,7 @@ class ImageData(BaseModel):
     image: str  # Base64 인코딩된 이미지 데이터
 
 
-@app.post("/perform_ocr")
+@router.post("/perform_ocr")
 async def perform_ocr(data: ImageData):
     # Base64 인코딩된 이미지 데이터를 디코딩
     print(data)
@@ -532,19 +866,14 @@ async def perform_ocr(data: ImageData):
 
     logging.debug(image_data)
 
-    # 서비스 계정 키 파일 경로
-    key_path = "sonvision-36a28cdac666.json"
-
-    # 서비스 계정 키 파일을 사용하여 인증 정보 생성
-    credentials = service_account.Credentials.from_service_account_file(key_path)
-
-    # 인증 정보를 사용하여 Google Cloud Vision 클라이언트 초기화
-    client = vision.ImageAnnotatorClient(credentials=credentials)
+    from google.cloud import vision
+    # 서비스 계정 인증된 Google Cloud Vision 클라이언트 (처음 한번만 생성)
+    client = get_vision_client()
 
     image = vision.Image(content=image_data)
 
     # OCR 처리
-    response = client.text_detection(image=image)
+    response = await run_in(io_executor, client.text_detection, image=image)
     texts = response.text_annotations
 
     if response.error.message:
@@ -562,52 +891,61 @@ def process_ocr_texts(texts):
     return processed_texts
 
 
-@app.post("/ocrGptTest")
-async def perform_ocr(data: ImageData):
+async def ocr_table_texts(data):
     # Base64 인코딩된 이미지 데이터를 디코딩
     image_data = base64.b64decode(data.image.split(',')[1])
 
-    # 서비스 계정 키 파일 경로
-    key_path = "sonvision-36a28cdac666.json"
-
-    # 서비스 계정 키 파일을 사용하여 인증 정보 생성
-    credentials = service_account.Credentials.from_service_account_file(key_path)
-
-    # 인증 정보를 사용하여 Google Cloud Vision 클라이언트 초기화
-    client = vision.ImageAnnotatorClient(credentials=credentials)
+    from google.cloud import vision
+    # 서비스 계정 인증된 Google Cloud Vision 클라이언트 (처음 한번만 생성)
+    client = get_vision_client()
 
     image = vision.Image(content=image_data)
 
     # OCR 처리
-    response = client.text_detection(image=image)
+    response = await run_in(io_executor, client.text_detection, image=image)
     texts = response.text_annotations
 
     if response.error.message:
         raise HTTPException(status_code=500, detail=response.error.message)
 
-    structured_ocr_data = process_ocr_texts(texts)
+    return process_ocr_texts(texts)
+
+@router.post("/ocrGptTest")
+async def perform_ocr(data: ImageData):
+    structured_ocr_data = await ocr_table_texts(data)
     # OCR 결과를 GPT-4 분석 함수에 전달
     analysis_result = await gpt4_pdf_talk(structured_ocr_data)
 
     # 분석 결과 반환
     return {"texts": analysis_result}
 
+def pdf_talk_messages(response_data):
+    SYSTEM_PROMPT = "You are a financial data analyst with outstanding data recognition skills. The following is table data on market data interest rates and exchange rates. This data is not structured because it was read using OCR. However, knowing that this is data read from a table using OCR, please explain this data systematically. Provide as detailed and accurate a response as possible."
+    prompt = f"The following is OCR extracted table data. Analyze it as the system prompt has described. The response should be in Korean. Extracted data: {response_data}"
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
 async def gpt4_pdf_talk(response_data):
     try:
-        SYSTEM_PROMPT = "You are a financial data analyst with outstanding data recognition skills. The following is table data on market data interest rates and exchange rates. This data is not structured because it was read using OCR. However, knowing that this is data read from a table using OCR, please explain this data systematically. Provide as detailed and accurate a response as possible."
-        prompt = f"The following is OCR extracted table data. Analyze it as the system prompt has described. The response should be in Korean. Extracted data: {response_data}"
-        response = client.chat.completions.create(
-            model="gpt-4-0125-preview",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        return response.choices[0].message.content
+        return await get_llm().chat(model="gpt-4-0125-preview", messages=pdf_talk_messages(response_data), timeout=90)
     except Exception as e:
         print("An error occurred in gpt4_chart_talk:", str(e))
         return None
 
+# OCR 표 분석 스트리밍 버전 (SSE) :: OCR 이 끝나면 'ocr' 이벤트, 그 다음부터 분석 토큰
+@router.post("/ocrGptTest/stream")
+async def perform_ocr_stream(data: ImageData):
+    return gpt_streaming_response(ocr_gpt_events(data))
+
+async def ocr_gpt_events(data):
+    structured_ocr_data = await ocr_table_texts(data)
+    yield 'ocr', {'count': len(structured_ocr_data)}
+    async with aclosing(token_events("gpt-4-0125-preview", pdf_talk_messages(structured_ocr_data), 90)) as events:
+        async for event in events:
+            yield event
+
 
 ######################################## 마켓 PDF 분석 Ends  ##############################################            
 ################################### FIN GPT 구현 부분 Starts (본부장님소스) ################################
@@ -618,7 +956,7 @@ def get_curday():
 
 
 def get_news (ticker, Start_date, End_date, count=20):
-    news=finnhub_client.company_news(ticker, Start_date, End_date)
+    news=get_finnhub_client().company_news(ticker, Start_date, End_date)
     if len(news) > count :
         news = random.sample(news, count)
     sum_news = ["[헤드라인]: {} \n [요약]: {} \n".format(
@@ -626,7 +964,7 @@ def get_news (ticker, Start_date, End_date, count=20):
     return sum_news 
 
 def gen_term_stock (ticker, Start_date, End_date):
-    df = yf.download(ticker, Start_date, End_date)['Close']
+    df = get_yfinance().download(ticker, Start_date, End_date)['Close']
     term = '상승하였습니다' if df.iloc[-1] > df.iloc[0] else '하락하였습니다'
     terms = '{}부터 {}까지 {}의 주식가격은, $ {}에서 $ {}으로 {}. 관련된 뉴스는 다음과 같습니다.'.format(Start_date, End_date, ticker, int(df.iloc[0]), int(df.iloc[-1]), term)
     return terms 
@@ -636,14 +974,14 @@ def gen_term_stock (ticker, Start_date, End_date):
 def get_prompt_earning (ticker):
     prompt_news_after7 = ''
     curday = get_curday()
-    profile = finnhub_client.company_profile2(symbol=ticker)
+    profile = get_finnhub_client().company_profile2(symbol=ticker)
     company_template = "[기업소개]:\n\n{name}은 {ipo}에 상장한 {finnhubIndustry}섹터의 기업입니다. "
     intro_company = company_template.format(**profile)    
     
     # find announce calendar 
     Start_date_calen = (datetime.strptime(curday, "%Y-%m-%d") - timedelta(days=90)).strftime("%Y-%m-%d") # 현재 시점 - 3개월 
     End_date_calen = (datetime.strptime(curday, "%Y-%m-%d") + timedelta(days=30)).strftime("%Y-%m-%d")  # 현재 시점 + 1개월 
-    announce_calendar= finnhub_client.earnings_calendar(_from=Start_date_calen, to=End_date_calen, symbol=ticker, international=False).get('earningsCalendar')[0]
+    announce_calendar= get_finnhub_client().earnings_calendar(_from=Start_date_calen, to=End_date_calen, symbol=ticker, international=False).get('earningsCalendar')[0]
         
     # get information from earning announcement
     date_announce= announce_calendar.get('date')
@@ -735,20 +1073,19 @@ def get_prompt_earning (ticker):
 
     return info, prompt_news, prompt, SYSTEM_PROMPT
 
-def query_gpt4(ticker: str):
-    # get_prompt_earning 함수로부터 4개의 값을 올바르게 받음
-    info, prompt_news, prompt, SYSTEM_PROMPT = get_prompt_earning(ticker)
+def earning_messages(prompt, SYSTEM_PROMPT):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+async def query_gpt4(ticker: str):
+    # get_prompt_earning 함수로부터 4개의 값을 올바르게 받음 (finnhub/yfinance 동기 호출이라 실행기에서)
+    info, prompt_news, prompt, SYSTEM_PROMPT = await run_in(io_executor, get_prompt_earning, ticker)
 
     # OpenAI GPT-4 호출
-    completion = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt}
-        ]
-    )
-
-    completion_content = completion.choices[0].message.content if completion.choices else "No completion found."
+    completion_content = await get_llm().chat(model="gpt-4", messages=earning_messages(prompt, SYSTEM_PROMPT), timeout=120) \
+        or "No completion found."
 
     # FastAPI 클라로 보내기 위해 JSON으로 변환하여 반환
     return {
@@ -758,7 +1095,7 @@ def query_gpt4(ticker: str):
     }
     
 def get_historical_eps(ticker, limit=4):
-    earnings = finnhub_client.company_earnings(ticker, limit)
+    earnings = get_finnhub_client().company_earnings(ticker, limit)
     earnings_json = [
         {
             "period":earning["period"],
@@ -770,6 +1107,7 @@ def get_historical_eps(ticker, limit=4):
     earnings_json.sort(key = lambda x:x['period'])
     df_earnings=pd.DataFrame(earnings_json)
     
+    plt = get_pyplot()
     fig, ax = plt.subplots(figsize=(8,5))
     ax.scatter(df_earnings['period'], df_earnings['actual'],c='green', s=500, alpha=0.3, label='actual')
     ax.scatter(df_earnings['period'], df_earnings['estimate'],c='blue', s=500, alpha=0.3, label='estimate')
@@ -785,9 +1123,10 @@ def get_historical_eps(ticker, limit=4):
     return fig
     
 def get_recommend_trend (ticker) : 
-    recommend_trend = finnhub_client.recommendation_trends(ticker)
+    recommend_trend = get_finnhub_client().recommendation_trends(ticker)
     df_recommend_trend = pd.DataFrame(recommend_trend).set_index('period').drop('symbol', axis=1).sort_index()
 
+    plt = get_pyplot()
     fig, ax = plt.subplots(figsize=(8,5))
     width = 0.6  
     
@@ -827,12 +1166,12 @@ def get_one_year_before(end_date):
 def get_stock_data_daily(symbol):
   EndDate = get_curday()
   StartDate = get_one_year_before(EndDate)
-  stock_data = yf.download(symbol, StartDate, EndDate)
+  stock_data = get_yfinance().download(symbol, StartDate, EndDate)
   return stock_data[["Adj Close", "Volume"]]
 
 def get_stock_data_fig (ticker):
     data = get_stock_data_daily(ticker)
-    fig, ax1 = plt.subplots(figsize=(14, 5))
+    fig, ax1 = get_pyplot().subplots(figsize=(14, 5))
     ax1.plot(data['Adj Close'], label='Price(USD)', color='blue')
     ax1.set_xlabel('date')
     ax1.set_ylabel('Price(USD)', color='blue')
@@ -844,16 +1183,14 @@ def get_stock_data_fig (ticker):
     ax2.tick_params('y', colors='green')
     return fig 
 
-@app.get("/api/charts/both/{ticker}")
+@router.get("/api/charts/both/{ticker}")
 async def get_both_charts(ticker: str):
-    # 주식 실적 이력 차트 생성 및 Base64 인코딩
-    fig1 = get_historical_eps(ticker)
-    earnings_chart_base64 = get_chart_base64(fig1)
+    # 주식 실적 이력 차트 생성 및 Base64 인코딩 (pyplot 은 plot_executor 에서만)
+    earnings_chart_base64 = await run_in(plot_executor, lambda: get_chart_base64(get_historical_eps(ticker)))
     
     #print(earnings_chart_base64)
     # 애널리스트 추천 트렌드 차트 생성 및 Base64 인코딩
-    fig2 = get_recommend_trend(ticker)
-    recommendations_chart_base64 = get_chart_base64(fig2)
+    recommendations_chart_base64 = await run_in(plot_executor, lambda: get_chart_base64(get_recommend_trend(ticker)))
 
     # 두 차트의 Base64 인코딩된 이미지 데이터를 JSON으로 반환
     return JSONResponse(content={
@@ -861,16 +1198,26 @@ async def get_both_charts(ticker: str):
         "recommendations_chart": recommendations_chart_base64
     })
   
-@app.get("/api/analysis/{ticker}")
-def get_analysis(ticker: str):
-    result = query_gpt4(ticker)
+@router.get("/api/analysis/{ticker}")
+async def get_analysis(ticker: str):
+    result = await query_gpt4(ticker)
     return JSONResponse(content=result)
+
+# 실적 분석 스트리밍 버전 (SSE) :: 'meta' 이벤트(info, prompt_news) 먼저, 그 다음 분석 토큰
+@router.get("/api/analysis/{ticker}/stream")
+async def get_analysis_stream(ticker: str):
+    return gpt_streaming_response(analysis_events(ticker))
+
+async def analysis_events(ticker):
+    info, prompt_news, prompt, SYSTEM_PROMPT = await run_in(io_executor, get_prompt_earning, ticker)
+    yield 'meta', {'info': info, 'prompt_news': prompt_news}
+    async with aclosing(token_events("gpt-4", earning_messages(prompt, SYSTEM_PROMPT), 120)) as events:
+        async for event in events:
+            yield event
  
-@app.get("/api/stockwave/{ticker}")
-def get_stockwave(ticker: str):
-    fig = get_stock_data_fig(ticker)
-    logging.debug(fig)
-    stockwave_base64 = get_chart_base64(fig)
+@router.get("/api/stockwave/{ticker}")
+async def get_stockwave(ticker: str):
+    stockwave_base64 = await run_in(plot_executor, lambda: get_chart_base64(get_stock_data_fig(ticker)))
     return JSONResponse(content={"stockwave_data": stockwave_base64})
 
 #################################### FIN GPT 구현 부분 Ends (본부장님소스) ###################################
@@ -889,27 +1236,52 @@ queryGPT4()'''
 ############################## 국내 뉴스정보 구현 ::  네이버 검색 API + 금융메뉴 스크래핑 활용 시작 ################################
 
 #1. 네이버 검색 API
-@app.get("/api/search-naver")
-async def search_naver(keyword: str = Query(default="금융")):
-    client_id = config.NAVER_API_KEY
-    client_secret = config.NAVER_SECRET
-    encText = quote(keyword)
-    naver_url = f"https://openapi.naver.com/v1/search/blog?query={encText}"
+NAVER_SEARCH_URL = "https://openapi.naver.com/v1/search/blog"
+NAVER_SEARCH_PAGE = 100   # 한번에 받을 수 있는 최대 개수 (display)
+NAVER_SEARCH_MAX = 1000   # 검색 API 가 주는 최대 start 위치
+# 같은 키워드(특히 기본 키워드 "금융")는 5분동안 로컬에서, 30분까지는 옛 결과를 주면서 뒤에서 갱신
+naver_search_cache = SWRCache(ttl=300, stale_ttl=1800)
 
+async def fetch_naver_search_page(keyword, start, display):
     headers = {
-        "X-Naver-Client-Id": client_id,
-        "X-Naver-Client-Secret": client_secret,
+        "X-Naver-Client-Id": config.NAVER_API_KEY,
+        "X-Naver-Client-Secret": config.NAVER_SECRET,
     }
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(naver_url, headers=headers)
-
+    response = await get_http_pool().get(NAVER_SEARCH_URL, params={"query": keyword, "display": display, "start": start}, headers=headers)
     if response.status_code != 200:
         raise HTTPException(status_code=400, detail=f"Error from Naver API: {response.status_code}")
+    return response.json()
 
-    # Process the response to match the expected format
-    data = response.json()
-    return {"items": data.get("items", [])}
+# 100개씩 나눠서 start 위치별 페이지를 한번에 동시에 요청 -> 몇 페이지든 왕복 한번 시간. 링크가 같은 글은 하나만
+async def load_naver_search(keyword, limit):
+    pages = await asyncio.gather(*[fetch_naver_search_page(keyword, start, min(NAVER_SEARCH_PAGE, limit - start + 1))
+                                   for start in range(1, limit + 1, NAVER_SEARCH_PAGE)])
+    items_by_link = {}
+    for page in pages:
+        for item in page.get("items", []):
+            items_by_link.setdefault(item.get("link"), item)
+    items = list(items_by_link.values())
+    story_ids = await run_in(io_executor, ingest_news, 'naver-search', [
+        {'title': item.get('title'), 'content': item.get('description'), 'url': item.get('link'), 'published': item.get('postdate')}
+        for item in items])
+    return {"total": pages[0].get("total", 0), "items": unique_by_story(items, story_ids)}
+
+@router.get("/api/search-naver")
+async def search_naver(keyword: str = Query(default="금융"), limit: int = Query(default=10, ge=1, le=NAVER_SEARCH_MAX)):
+    return await naver_search_cache.get(("naver-search", keyword, limit), lambda: load_naver_search(keyword, limit))
+
+#1-1. 지금까지 뉴스 엔드포인트들이 모아둔 기사 로컬 검색 (외부 호출 없음)  :: 날짜는 타임존 없으면 한국시간, end 가 날짜만이면 그날 끝까지
+@router.get("/api/news-search")
+async def search_news_store(q: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                            source: Optional[str] = None, limit: int = Query(default=50, ge=1, le=500), per_story: bool = True):
+    start_at = to_utc_time(start) if start else None
+    end_at = to_utc_time(end + ' 23:59:59' if len(end) <= 10 else end) if end else None
+    if (start and start_at is None) or (end and end_at is None):
+        raise HTTPException(status_code=400, detail="Invalid date: start=%s, end=%s" % (start, end))
+    started = time.perf_counter()
+    # 검색어는 newsStore 에서 한글 bigram / 영문 단어 토큰으로만 바꿔서 넘기므로 FTS 문법 오류는 안남
+    items = await run_in(io_executor, get_news_store().search, q, start_at, end_at, source, limit, per_story)
+    return {"query": q, "count": len(items), "took_ms": round((time.perf_counter() - started) * 1000, 2), "items": items}
 
         
 #2. 네이버 증권 주요뉴스 스크래핑  :: 기본 타이틀+내용 가져오기
@@ -921,102 +1293,45 @@ class NewsItem(BaseModel):
     press: str
     wdate: str
     
-@app.get("/naver-scraping-news/", response_model=List[NewsItem])    
+# 사용자가 넘긴 url 은 네이버 증권 페이지만 (아무 호스트나 받아오지 않게)
+def check_naver_url(url):
+    parts = urlsplit(url)
+    host = parts.hostname or ''
+    if parts.scheme not in ('http', 'https') or not (host == 'naver.com' or host.endswith('.naver.com')):
+        raise HTTPException(status_code=400, detail="url should be a naver.com page")
+
+@router.get("/naver-scraping-news/", response_model=List[NewsItem])    
 def fetch_naver_finance_news(url: str):
+    check_naver_url(url)
     try : 
-        response = requests.get(url)
+        response = get_http_pool().get_sync(url)
         # 요청이 성공적일때만
         if response.status_code == 200:
-            # BeautifulSoup 객체를 생성하여 HTML을 파싱
-            soup = BeautifulSoup(response.text, 'html.parser')
-            news_items  = []
-            
-            #메인뉴스랑 다른애들이랑 html 이 좀 다름. 분기쳐주자. 
-            if 'mainnews.naver' in url: #메인뉴스 url은 현재 https://finance.naver.com/news/mainnews.naver 임                
-                news_section = soup.find('div', class_='mainNewsList')
-              # 각 뉴스 아이템을 순회
-                for item in news_section.find_all('li', class_='block1'):
-                    # Extract thumbnail image
-                    thumb_element = item.select_one('.thumb img')
-                    thumb_url = thumb_element['src'] if thumb_element else None
-                    # Extract article subject and remark
-                    # 타이틀이랑 링크까지 갖고오기 
-                    article_subject_element = item.select_one('dd.articleSubject a')
-                    if article_subject_element:
-                        article_subject = article_subject_element.get_text(strip=True)
-                        article_link = article_subject_element['href']
-                    else:
-                        article_subject = None
-                        article_link = None
-                    # Extract article summary // press랑 wdate는 포함안되게 하자
-                    article_summary_element = item.select_one('dd.articleSummary')
-                    if article_summary_element:
-                        summary = ''.join([str(child) for child in article_summary_element.contents if type(child) == NavigableString]).strip()
-                    else:
-                        summary = None
-                    # Extract press name
-                    press = item.select_one('.press').get_text(strip=True) if item.select_one('.press') else None
-                    # Extract writing date
-                    wdate = item.select_one('.wdate').get_text(strip=True) if item.select_one('.wdate') else None
-
-                    news_items.append({
-                        "thumb_url": thumb_url,
-                        "article_subject": article_subject,
-                        "article_link": article_link,
-                        "summary": summary,
-                        "press": press,
-                        "wdate": wdate
-                    })
-                return news_items                
-            else: 
-                news_items = []
-
-                # 'ul class="realtimeNewsList"' 내의 모든 'li' 요소를 찾음 (각 기사 리스트)
-                #  <dl> <dt><dd><dd> 순으로 1개 게시글인데 갑자기 이미지 없어져서 <dt>에 타이틀 들어올때도 있음;; 개하드코딩 필요
-                for li in soup.select('ul.realtimeNewsList > li'):
-                    # 'li' 내의 모든 'dl' 요소 (각 기사) 처리
-                    for dl in li.find_all('dl'):
-                        elements = dl.find_all(['dt', 'dd'])  # 'dt'와 'dd' 요소를 모두 찾음
-                        # 초기화
-                        thumb_url = None
-                        article_subject = ''
-                        article_link = ''
-                        summary = ''
-                        press = ''
-                        wdate = ''
-                        for element in elements:
-                            if element.name == 'dt' and 'thumb' in element.get('class', []):
-                                # 이미지 URL 처리
-                                thumb_url = element.find('img')['src'] if element.find('img') else None
-                            elif element.name == 'dt' and 'articleSubject' in element.get('class', []):
-                                # 이미지 없이 제목만 있는 경우 처리
-                                thumb_url = None  # 이미지가 없으므로 None으로 설정
-                                article_subject = element.find('a').get('title', '')
-                                article_link = "https://news.naver.com" + element.find('a')['href']
-                            elif 'articleSubject' in element.get('class', []):
-                                # 기사 제목 처리
-                                article_subject = element.find('a').get('title', '')
-                                article_link = "https://news.naver.com" + element.find('a')['href']
-                            elif 'articleSummary' in element.get('class', []):
-                                # 기사 요약, 출판사, 작성 날짜 처리
-                                summary = element.contents[0].strip() if element.contents else ''
-                                press = element.find('span', class_='press').text if element.find('span', class_='press') else ''
-                                wdate = element.find('span', class_='wdate').text if element.find('span', class_='wdate') else ''
-                                # 모든 정보가 수집되었으므로 news_items에 추가
-                                news_items.append({
-                                    "thumb_url": thumb_url,
-                                    "article_subject": article_subject,
-                                    "article_link": article_link,
-                                    "summary": summary,
-                                    "press": press,
-                                    "wdate": wdate
-                                })
-                return news_items
+            # 기사 목록 영역만 lxml 로 파싱 (메인뉴스 / 실시간 속보 마크업 분기는 naverParse 에서)
+            news_items = parse_news_list(response.text, url)
+            story_ids = ingest_news('naver-finance', [
+                {'title': item['article_subject'], 'content': item['summary'], 'url': item['article_link'], 'published': item['wdate']}
+                for item in news_items])
+            return unique_by_story(news_items, story_ids)
         else:
             return "Failed to fetch the naverNews with status code: {}".format(response.status_code)
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
       return "An error occurred while fetching the naver news: {}".format(e)        
 
+async def load_naver_finance_news(url):
+    news_items = await run_in(io_executor, fetch_naver_finance_news, url)
+    if isinstance(news_items, str):
+        raise RuntimeError(news_items)  # 실패하면 에러 메시지 문자열이 옴
+    return news_items
+
+# 네이버 증권 뉴스 실시간 피드 (SSE) :: 기사 링크 기준으로 diff
+@router.get("/live/naver-scraping-news/")
+async def live_naver_finance_news(request: Request, url: str):
+    check_naver_url(url)
+    events = live_feeds.subscribe(("naver", url), lambda: load_naver_finance_news(url),
+                                  lambda item: item['article_link'], NAVER_FEED_INTERVAL)
+    return StreamingResponse(sse_stream(events, request), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 #왜 그런지 모르겠는데, 네이버페이지 상의 호출URL과 소스보기로 보여지는 URL이 다르다. 이거때매 url함수만듬;
 def makeNaverUrl(news_url: str) :
     article_id = ""
@@ -1038,41 +1353,70 @@ def clean_html_content(html_content: str) -> str:
     cleaned_content = ' '.join(cleaned_content.split())
     return cleaned_content
 # 네이버 상세 Contents 스크래핑
+# 기사 본문은 한번 나오면 거의 안 바뀌므로 (office_id, article_id) 로 하루 동안 캐시. 같은 기사 동시 요청은 한번만 가져옴
+article_cache = SWRCache(ttl=24 * 60 * 60, maxsize=2000)
+# 일괄 조회때 n.news.naver.com 으로 동시에 나가는 요청 수 제한
+NEWS_DETAIL_CONCURRENCY = 8
+NEWS_DETAIL_BATCH_MAX = 50  # 한번에 받을 수 있는 기사 수
+
+async def load_news_detail(office_id, article_id):
+    # 정리된 본문 HTML, 본문이 없는 기사면 None
+    async def fetch():
+        response = await get_http_pool().get(f"https://n.news.naver.com/mnews/article/{office_id}/{article_id}")
+        response.raise_for_status()
+        # 본문(article#dic_area)만 파싱해서 내용을 가져온 후 개행 문자를 공백으로 치환
+        html_content = await run_in(cpu_executor, parse_news_detail, response.text)
+        return clean_html_content(html_content) if html_content is not None else None
+    return await article_cache.get((office_id, article_id), fetch)
+
 class NewsURL(BaseModel):
     url: str
-@app.post("/api/news-detail")
-def fetch_news_detail(news_url: NewsURL):
+@router.post("/api/news-detail")
+async def fetch_news_detail(news_url: NewsURL):
+    article_id, office_id = makeNaverUrl(news_url.url)
     try:
-        article_id, office_id = makeNaverUrl(news_url.url)
-        new_url = f"https://n.news.naver.com/mnews/article/{office_id}/{article_id}"
-        response = requests.get(new_url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')            
-        newsct_article = soup.find('div', id='newsct_article')
-        if newsct_article is not None:
-            dic_area = newsct_article.find('article', id='dic_area')
-            if dic_area is not None:
-                #return dic_area.prettify()  ## prettify 로 예쁘게ㅋ
-                # decode_contents()로 내용을 가져온 후 개행 문자를 공백으로 치환
-                html_content = dic_area.decode_contents()
-                cleaned_html_content = clean_html_content(html_content)
-                return cleaned_html_content
-            else:
-                raise HTTPException(status_code=404, detail="Article content not found")
-        else:
-            raise HTTPException(status_code=404, detail="News content not found")
-    except requests.exceptions.RequestException as e:
+        content = await load_news_detail(office_id, article_id)
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=400, detail=f"Error fetching Naver news detail: {e}")
+    if content is None:
+        raise HTTPException(status_code=404, detail="Article content not found")
+    return content
+
+# 여러 기사 본문을 한번에 :: 목록 상위 기사들을 미리 받아둘때 씀 (요청 한번에 동시 조회, 캐시된 건 바로)
+class NewsURLs(BaseModel):
+    urls: List[str] = Field(max_length=NEWS_DETAIL_BATCH_MAX)
+@router.post("/api/news-detail/batch")
+async def fetch_news_details(news_urls: NewsURLs):
+    semaphore = asyncio.Semaphore(NEWS_DETAIL_CONCURRENCY)
+
+    async def load(url):
+        article_id, office_id = makeNaverUrl(url)
+        item = {"url": url, "office_id": office_id, "article_id": article_id, "content": None, "error": None}
+        try:
+            async with semaphore:
+                item["content"] = await load_news_detail(office_id, article_id)
+            if item["content"] is None:
+                item["error"] = "Article content not found"
+        except httpx.HTTPError as e:
+            item["error"] = f"Error fetching Naver news detail: {e}"
+        except Exception as e:
+            # 파싱 오류 등도 그 기사만 실패로 (gather 전체가 깨지지 않게)
+            item["error"] = f"Error processing Naver news detail: {e}"
+        return item
+
+    return {"items": await asyncio.gather(*(load(url) for url in dict.fromkeys(news_urls.urls)))}
     
 ############################## 국내 뉴스정보 구현 ::  네이버 검색 API + 금융메뉴 스크래핑 활용 끝 ################################
 ############################## 국내 뉴스정보 구현 ::  국내 주식종목 유사국면 찾기 화면 개발 시작   ################################
 #일단 종목코드 갖고오는것부터 구현하자
-@app.get("/stock-codes/")    
+@router.get("/stock-codes/")    
 async def stock_code_fetch():
     krxurl = 'http://kind.krx.co.kr/corpgeneral/corpList.do?method=download&searchType=13'
     try:
         # 'encoding' 파라미터에 'CP949' 추가
-        code_df = pd.read_html(krxurl, encoding='CP949')[0]
+        response = await get_http_pool().get(krxurl)
+        response.raise_for_status()
+        code_df = (await run_in(io_executor, pd.read_html, StringIO(response.content.decode('CP949'))))[0]
         code_df.종목코드 = code_df.종목코드.map('{:06d}'.format)
         code_df = code_df[['회사명', '종목코드']]
         stock_list = code_df.values.tolist()
@@ -1087,12 +1431,13 @@ class ChartRequest(BaseModel):
     stockCode: str
     fromDate: str
     toDate: str
-@app.post("/stock-chart-data")
-async def get_stock_chart_data(request: ChartRequest):
+@router.post("/stock-chart-data")
+async def get_stock_chart_data(request: ChartRequest, max_points: int = Query(default=2000, ge=3)):
     try:
         ticker_symbol = request.stockCode + ".KS"
-        stock = yf.Ticker(ticker_symbol)
-        hist = stock.history(start=request.fromDate, end=request.toDate)
+        stock = get_yfinance().Ticker(ticker_symbol)
+        hist = await run_in(io_executor, stock.history, start=request.fromDate, end=request.toDate)
+        hist = downsample_frame(hist, max_points, columns=['Open', 'High', 'Low', 'Close'])
         # pandas DataFrame의 인덱스(날짜)를 'Date' 컬럼으로 변환
         hist.reset_index(inplace=True)
         # 'Date' 컬럼을 확인하고 필요한 경우 datetime 타입으로 변환
@@ -1135,29 +1480,10 @@ class StockRequest(BaseModel):
     fromDate_2: str
     toDate_2: str
 
-@app.post("/find-similar-period")
-async def find_similar_period(request: StockRequest):
-    # Yahoo Finance 데이터 로드
-    ticker_symbol = request.stockCode + ".KS"  # For Korean stock codes
-    stock = yf.Ticker(ticker_symbol)
-    
-    # 전체 기간에 대한 역사적 데이터 가져오기
-    hist_full = stock.history(start=request.fromDate_2, end=request.toDate_2)
-    
-    # 참조 기간에 대한 역사적 데이터 가져오기
-    hist_ref = stock.history(start=request.fromDate, end=request.toDate)
-    
-    # 'Close' 가격에 초점을 맞춰 NumPy 배열로 변환
-    series_ref = np.array(hist_ref['Close'], dtype=np.double)
-    series_full = np.array(hist_full['Close'], dtype=np.double)
-    
-    # 참조 기간의 인덱스 찾기
-    ref_start_idx = hist_full.index.get_loc(hist_ref.index[0])
-    ref_end_idx = hist_full.index.get_loc(hist_ref.index[-1])    
-   
-    # 참조 기간의 길이
-    len_ref = len(series_ref)    
-    
+# 전체 기간 내에서 참조 기간과 겹치지 않는 구간들 중 DTW 거리가 가장 낮은 구간의 (시작 인덱스, 거리)
+def find_best_dtw_window(series_ref, series_full, ref_start_idx, ref_end_idx):
+    from dtaidistance import dtw
+    len_ref = len(series_ref)
     # 가장 낮은 DTW 거리와 해당 시작 인덱스 초기화
     lowest_distance = float('inf')
     best_start_index = -1    
@@ -1176,6 +1502,32 @@ async def find_similar_period(request: StockRequest):
                 if distance < lowest_distance:
                     lowest_distance = distance
                     best_start_index = start_index
+    return best_start_index, lowest_distance
+
+@router.post("/find-similar-period")
+async def find_similar_period(request: StockRequest):
+    # Yahoo Finance 데이터 로드
+    ticker_symbol = request.stockCode + ".KS"  # For Korean stock codes
+    stock = get_yfinance().Ticker(ticker_symbol)
+    
+    # 전체 기간 / 참조 기간에 대한 역사적 데이터 같이 가져오기
+    hist_full, hist_ref = await asyncio.gather(
+        run_in(io_executor, stock.history, start=request.fromDate_2, end=request.toDate_2),
+        run_in(io_executor, stock.history, start=request.fromDate, end=request.toDate))
+    
+    # 'Close' 가격에 초점을 맞춰 NumPy 배열로 변환
+    series_ref = np.array(hist_ref['Close'], dtype=np.double)
+    series_full = np.array(hist_full['Close'], dtype=np.double)
+    
+    # 참조 기간의 인덱스 찾기
+    ref_start_idx = hist_full.index.get_loc(hist_ref.index[0])
+    ref_end_idx = hist_full.index.get_loc(hist_ref.index[-1])    
+   
+    # 참조 기간의 길이
+    len_ref = len(series_ref)    
+    
+    # 구간마다 DTW 거리 계산은 CPU 작업이라 cpu_executor 에서
+    best_start_index, lowest_distance = await run_in(cpu_executor, find_best_dtw_window, series_ref, series_full, ref_start_idx, ref_end_idx)
                     
     # 유효한 유사 구간이 없는 경우 처리
     if best_start_index == -1:
@@ -1188,7 +1540,7 @@ async def find_similar_period(request: StockRequest):
     
     # best_start, best_end, lowest_distance 3개 값 나왔으면, 다시 야후로 해당기간 차트데이터 get ㄱㄱ
     chart_request = ChartRequest(stockCode=request.stockCode, fromDate=best_period_start_date, toDate=best_period_end_date)
-    chart_data = await get_stock_chart_data(chart_request)
+    chart_data = await get_stock_chart_data(chart_request, max_points=2000)
  
     return {"chartData": chart_data, 
             "dtwDistance": lowest_distance, 
@@ -1200,4 +1552,7 @@ async def find_similar_period(request: StockRequest):
     request_data = StockRequest(stockCode="068270", fromDate="2020-02-01", toDate="2020-06-30", fromDate_2="2016-01-01", toDate_2="2022-12-31" )
     wow = await find_similar_period(request_data)
     await save_to_txt(wow, "wow.txt")
-asyncio.run(rapid())'''
\ No newline at end of file
+asyncio.run(rapid())'''
+
+# 라우트가 모두 등록된 뒤에 앱 생성 (uvicorn newbond:app)
+app = create_app()
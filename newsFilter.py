@@ -0,0 +1,89 @@
+#뉴스 주제 필터 (키워드 정규식 하나로 한번에 스캔 + 관련도 점수)
+#키워드마다 본문 전체를 다시 훑지 않고, 주제별 키워드를 하나의 alternation 정규식으로 컴파일해서 기사당 한번만 스캔한다.
+#HTML 태그도 같은 정규식에서 먹어버려서 링크/속성 안의 단어는 매칭되지 않는다.
+import re
+from collections import Counter
+from functools import lru_cache
+
+# 주제(탭)별 키워드 -> 가중치
+TAXONOMIES = {
+    'bond': {
+        'bond': 3, 'treasury': 3, 'treasuries': 3, 'fixed income': 3, 'FOMC': 2, 'interest rate': 2, 'yield': 2,
+        'credit rating': 2, 'default risk': 2, 'inflation': 1, 'duration': 1,
+    },
+    'fx': {
+        'forex': 3, 'exchange rate': 3, 'currency': 3, 'currencies': 3, 'DXY': 3, 'dollar': 2, 'yen': 2, 'euro': 2,
+        'yuan': 2, 'korean won': 2, 'devaluation': 2, 'central bank': 1,
+    },
+    'equity': {
+        'stock': 3, 'equity': 3, 'equities': 3, 'shares': 2, 'S&P 500': 2, 'Nasdaq': 2, 'Dow Jones': 2,
+        'earnings': 2, 'IPO': 2, 'buyback': 1, 'dividend': 1, 'valuation': 1,
+    },
+    'commodity': {
+        'commodity': 3, 'commodities': 3, 'crude': 3, 'oil': 2, 'Brent': 2, 'WTI': 2, 'OPEC': 2, 'gold': 2,
+        'silver': 1, 'copper': 1, 'natural gas': 2,
+    },
+}
+
+TITLE_WEIGHT = 2  # 제목에서 나온 키워드는 본문보다 두배로
+
+
+def _normalize(text):
+    return ' '.join(text.lower().split())
+
+
+class KeywordMatcher:
+    """
+    {키워드: 가중치} 를 하나의 정규식으로 컴파일한 매처. 대소문자 무시, 단어 경계 기준이고 복수형(s/es)까지 같은 키워드로 센다.
+    여러 단어 키워드는 사이 공백/줄바꿈 개수와 상관없이 매칭된다.
+    """
+    def __init__(self, keywords):
+        self.weights = {_normalize(keyword): weight for keyword, weight in keywords.items()}
+        # 긴 키워드가 먼저 매칭되도록 (ex. 'interest rate' 가 'rate' 보다 먼저)
+        alternatives = sorted(self.weights, key=len, reverse=True)
+        body = '|'.join(r'\s+'.join(re.escape(word) for word in keyword.split()) for keyword in alternatives)
+        self.pattern = re.compile(r'<[^>]*>|\b(%s)(?:s|es)?\b' % body, re.IGNORECASE)
+
+    def count(self, text):
+        """
+        text 에서 키워드별 매칭 횟수 (HTML 태그 안은 무시)
+        """
+        counts = Counter()
+        if text:
+            for match in self.pattern.finditer(text):
+                keyword = match.group(1)
+                if keyword is not None:
+                    counts[_normalize(keyword)] += 1
+        return counts
+
+    def score(self, title, content):
+        """
+        (키워드별 매칭 횟수, 가중 관련도 점수). 제목 매칭은 TITLE_WEIGHT 배
+        """
+        title_counts, content_counts = self.count(title), self.count(content)
+        score = sum(self.weights[k] * n * TITLE_WEIGHT for k, n in title_counts.items())
+        score += sum(self.weights[k] * n for k, n in content_counts.items())
+        return title_counts + content_counts, score
+
+
+@lru_cache(maxsize=None)
+def get_matcher(topic):
+    if topic not in TAXONOMIES:
+        raise ValueError(f"Unknown topic '{topic}', should be one of {list(TAXONOMIES)}")
+    return KeywordMatcher(TAXONOMIES[topic])
+
+
+def rank_news(items, topic='bond', top_n=None, min_score=1):
+    """
+    Seeking Alpha 뉴스 항목들(item['attributes'] 에 title/content)을 주제 관련도 순으로 정렬해서 돌려준다.
+    각 항목에 'relevance': {'score', 'matches'} 를 붙이고, min_score 미만은 빼고, top_n 이 있으면 그만큼만.
+    """
+    matcher = get_matcher(topic)
+    ranked = []
+    for item in items:
+        attributes = item.get('attributes', {})
+        matches, score = matcher.score(attributes.get('title') or '', attributes.get('content') or '')
+        if score >= min_score:
+            ranked.append(dict(item, relevance={'score': score, 'matches': dict(matches)}))
+    ranked.sort(key=lambda item: item['relevance']['score'], reverse=True)  # 점수가 같으면 원래(최신순) 순서 유지
+    return ranked[:top_n] if top_n else ranked
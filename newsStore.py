@@ -0,0 +1,344 @@
+#뉴스 기사 저장소 (SQLite) + 중복/유사 기사 묶기
+#Seeking Alpha, 네이버 등에서 같은 기사가 계속 들어오므로, 본문 해시로 완전 중복을 거르고 SimHash(64bit)로 거의 같은 기사를
+#같은 story 로 묶는다. 유사 후보는 SimHash 를 8bit 씩 8개 밴드로 나눈 인덱스로 찾는다 (해밍거리 7 이하면 밴드 하나는 반드시 같고,
+#기준인 10 에서도 96% 는 걸림). 제목/본문이 비어서 단어가 하나도 없는 기사는 중복 판정 없이 따로 둔다.
+#검색은 FTS5 (articles_fts). sqlite3 모듈로는 FTS5 토크나이저를 직접 못 붙이므로, 저장할때 한글은 2글자씩(bigram), 영문/숫자는 단어로
+#미리 잘라서 공백으로 이어 넣고 unicode61 이 공백 기준으로 색인하게 한다. 검색어도 같은 방식으로 잘라서 구(phrase)로 찾는다.
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    story_id INTEGER NOT NULL,
+    source TEXT,
+    url TEXT,
+    title TEXT,
+    content TEXT,
+    published TEXT,
+    content_hash TEXT UNIQUE,
+    simhash INTEGER,
+    first_seen TEXT,
+    published_at TEXT,
+    image TEXT
+);
+CREATE INDEX IF NOT EXISTS articles_story ON articles(story_id);
+CREATE INDEX IF NOT EXISTS articles_seen ON articles(first_seen);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, body, content='', tokenize='unicode61 remove_diacritics 0');
+CREATE TABLE IF NOT EXISTS simhash_bands (
+    band INTEGER,
+    value INTEGER,
+    article_id INTEGER,
+    PRIMARY KEY (band, value, article_id)
+) WITHOUT ROWID;
+"""
+
+BANDS = 8
+BAND_BITS = 64 // BANDS
+SHINGLE = 2  # 단어 bigram
+# 이 해밍거리 이하면 같은 기사로 봄. 단어 하나만 바꾼 기사가 30단어에서 p90 10, 50단어 이상은 8 이하이고
+# 관계없는 기사끼리는 19 이상이라 그 사이로 잡음
+MAX_DISTANCE = 10
+SIMHASH_VERSION = 2  # SHINGLE / BANDS 를 바꾸면 올림 -> 저장된 simhash 와 밴드 인덱스를 다시 계산
+
+TAG = re.compile(r'<[^>]*>')
+TOKEN = re.compile(r'\w+')
+SEARCH_TOKEN = re.compile(r'[\uac00-\ud7a3]+|[A-Za-z0-9]+')
+TITLE_WEIGHT = 2.0  # bm25 에서 제목 매칭을 본문보다 2배로
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def normalize_text(title, content):
+    """
+    태그를 빼고 소문자 단어 리스트로 (해시/SimHash 둘 다 이걸 기준으로 계산해서 공백/마크업 차이는 무시)
+    """
+    return TOKEN.findall(TAG.sub(' ', '%s %s' % (title or '', content or '')).lower())
+
+
+def content_hash(tokens):
+    return hashlib.blake2b(' '.join(tokens).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def simhash(tokens, shingle=SHINGLE):
+    """
+    단어 shingle(기본 bigram) 들로 만든 64bit SimHash. 단어가 shingle 개보다 적으면 단어 하나씩
+    """
+    if len(tokens) >= shingle:
+        features = [' '.join(tokens[i:i + shingle]) for i in range(len(tokens) - shingle + 1)]
+    else:
+        features = tokens
+    if not features:
+        return 0
+    digests = b''.join(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest() for feature in features)
+    # feature 마다 64bit 를 펼쳐서 비트별로 (+1 / -1) 합산 -> 양수인 비트만 1
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(features)
+    return int.from_bytes(np.packbits(votes > 0, bitorder='little').tobytes(), 'little')
+
+
+def search_terms(text):
+    """
+    FTS 색인/검색용 토큰. 한글 덩어리는 글자 bigram ('금리인상' -> 금리 리인 인상), 영문/숫자는 소문자 단어
+    """
+    terms = []
+    for chunk in SEARCH_TOKEN.findall(TAG.sub(' ', text or '')):
+        if '\uac00' <= chunk[0] <= '\ud7a3':
+            terms.extend([chunk] if len(chunk) == 1 else [chunk[i:i + 2] for i in range(len(chunk) - 1)])
+        else:
+            terms.append(chunk.lower())
+    return terms
+
+
+def match_query(query):
+    """
+    검색어 -> FTS5 MATCH 식. 띄어쓰기로 나뉜 단어마다 bigram 들을 구(phrase)로 묶고 전부 AND.
+    한 글자 한글('금')은 bigram 에 안 걸리므로 접두어 검색('금*' -> 금리, 금값 ...)으로
+    """
+    phrases = []
+    for word in (query or '').split():
+        terms = search_terms(word)
+        if len(terms) == 1 and len(terms[0]) == 1 and '\uac00' <= terms[0] <= '\ud7a3':
+            phrases.append('"%s"*' % terms[0])
+        elif terms:
+            phrases.append('"%s"' % ' '.join(terms))
+    return ' AND '.join(phrases)
+
+
+def to_utc_time(value):
+    """
+    출처마다 다른 발행시각 표기(ISO8601, '2024.03.01 08:00', '20240301')를 UTC 'YYYY-MM-DD HH:MM:SS' 로. 못 읽으면 None
+    """
+    if not value:
+        return None
+    timestamp = pd.to_datetime(str(value).replace('.', '-'), errors='coerce')
+    if pd.isna(timestamp):
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('Asia/Seoul')  # 타임존 없는건 네이버 (KST)
+    return timestamp.tz_convert('UTC').strftime(TIME_FORMAT)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _signed(value):
+    # SQLite INTEGER 는 부호있는 64bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def _bands(value):
+    mask = (1 << BAND_BITS) - 1
+    return [(band, value >> (band * BAND_BITS) & mask) for band in range(BANDS)]
+
+
+def dedupe_stories(articles, text=lambda a: (a.get('title'), a.get('content')), max_distance=MAX_DISTANCE):
+    """
+    저장소 없이 목록 안에서만 같은/거의 같은 기사를 빼고 처음 나온 것만 남긴다 (GPT 프롬프트에 같은 기사 두번 안 들어가게)
+    """
+    kept, seen_hashes, kept_simhashes = [], set(), []
+    for article in articles:
+        tokens = normalize_text(*text(article))
+        if not tokens:
+            kept.append(article)  # 비교할 내용이 없으면 중복으로 보지 않음
+            continue
+        digest = content_hash(tokens)
+        if digest in seen_hashes:
+            continue
+        value = simhash(tokens)
+        if any(hamming(value, other) <= max_distance for other in kept_simhashes):
+            continue
+        seen_hashes.add(digest)
+        kept_simhashes.append(value)
+        kept.append(article)
+    return kept
+
+
+class NewsStore:
+    """
+    출처별 기사들을 한 SQLite 파일에 모아두는 저장소. add 는 처음 보는 기사만 저장하고, 기사마다 story_id(유사 기사 묶음 id)와
+    상태('new' / 'duplicate' / 'near_duplicate')를 돌려준다. 이미 본 본문은 해시 조회 한번으로 끝나서 SimHash 계산도 안 한다.
+    """
+    def __init__(self, db_path=os.path.join('newsCache', 'news.sqlite'), max_distance=MAX_DISTANCE):
+        self.db_path = db_path
+        self.max_distance = max_distance
+        self._lock = threading.Lock()  # story 배정이 꼬이지 않도록 쓰기는 한번에 하나씩
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'articles'").fetchone() is not None:
+                # 검색 기능(published_at) / 크롤러 목록(image) 전에 만든 DB
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(articles)")]
+                for column in ('published_at', 'image'):
+                    if column not in columns:
+                        conn.execute("ALTER TABLE articles ADD COLUMN %s TEXT" % column)
+            conn.executescript(SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS articles_published ON articles(published_at)")
+            self._backfill(conn)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SIMHASH_VERSION:
+                self._rehash(conn)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _index(self, conn, article_id, title, content):
+        conn.execute("INSERT INTO articles_fts (rowid, title, body) VALUES (?, ?, ?)",
+                     (article_id, ' '.join(search_terms(title)), ' '.join(search_terms(content))))
+
+    def _backfill(self, conn):
+        # 색인이 없던 시절에 들어온 기사들만 이어서 색인 (이후로는 add 에서 같이 넣음)
+        last = conn.execute("SELECT max(rowid) FROM articles_fts").fetchone()[0] or 0
+        rows = conn.execute("SELECT id, title, content, published, first_seen FROM articles WHERE id > ?", (last,)).fetchall()
+        for article_id, title, content, published, first_seen in rows:
+            self._index(conn, article_id, title, content)
+            conn.execute("UPDATE articles SET published_at = ? WHERE id = ? AND published_at IS NULL",
+                         (to_utc_time(published) or first_seen, article_id))
+
+    def _rehash(self, conn):
+        # SimHash 방식이 바뀌기 전에 저장된 기사들의 simhash / 밴드 인덱스를 새 방식으로 (story 묶음은 그대로 둠)
+        conn.execute("DELETE FROM simhash_bands")
+        for article_id, title, content in conn.execute("SELECT id, title, content FROM articles").fetchall():
+            tokens = normalize_text(title, content)
+            if not tokens:
+                conn.execute("UPDATE articles SET simhash = NULL WHERE id = ?", (article_id,))
+                continue
+            value = simhash(tokens)
+            conn.execute("UPDATE articles SET simhash = ? WHERE id = ?", (_signed(value), article_id))
+            conn.executemany("INSERT OR IGNORE INTO simhash_bands (band, value, article_id) VALUES (?, ?, ?)",
+                             [(band, band_value, article_id) for band, band_value in _bands(value)])
+        conn.execute("PRAGMA user_version = %d" % SIMHASH_VERSION)
+
+    def _find_story(self, conn, value):
+        candidates = set()
+        for band, band_value in _bands(value):
+            candidates.update(row[0] for row in conn.execute(
+                "SELECT article_id FROM simhash_bands WHERE band = ? AND value = ?", (band, band_value)))
+        best = None
+        for article_id in candidates:
+            story_id, other = conn.execute("SELECT story_id, simhash FROM articles WHERE id = ?", (article_id,)).fetchone()
+            distance = hamming(value, _unsigned(other))
+            if distance <= self.max_distance and (best is None or distance < best[0]):
+                best = (distance, story_id)
+        return best[1] if best is not None else None
+
+    def add(self, source, articles):
+        """
+        articles: {'title', 'content', 'url', 'published', 'image'(있으면)} 딕셔너리들. 같은 순서로 {'id', 'story_id', 'status'} 리스트를 돌려준다
+        """
+        results = []
+        now = pd.Timestamp.now(tz='UTC').strftime(TIME_FORMAT)
+        with self._lock, closing(self._connect()) as conn, conn:
+            for article in articles:
+                tokens = normalize_text(article.get('title'), article.get('content'))
+                if tokens:
+                    digest = content_hash(tokens)
+                    row = conn.execute("SELECT id, story_id FROM articles WHERE content_hash = ?", (digest,)).fetchone()
+                    if row is not None:
+                        results.append({'id': row[0], 'story_id': row[1], 'status': 'duplicate'})
+                        continue
+                    value = simhash(tokens)
+                    story_id = self._find_story(conn, value)
+                else:
+                    # 제목/본문이 비면 모든 빈 기사가 같은 해시가 되므로 중복 판정 없이 새 story 로 (content_hash NULL)
+                    digest, value, story_id = None, None, None
+                cursor = conn.execute(
+                    "INSERT INTO articles (story_id, source, url, title, content, published, content_hash, simhash, first_seen, published_at, image) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (story_id or 0, source, article.get('url'), article.get('title'), article.get('content'),
+                     article.get('published'), digest, _signed(value) if value is not None else None, now,
+                     to_utc_time(article.get('published')) or now, article.get('image')))
+                article_id = cursor.lastrowid
+                self._index(conn, article_id, article.get('title'), article.get('content'))
+                if story_id is None:
+                    story_id = article_id  # 새 story 는 첫 기사의 id 를 story_id 로
+                    conn.execute("UPDATE articles SET story_id = ? WHERE id = ?", (story_id, article_id))
+                if value is not None:
+                    conn.executemany("INSERT OR IGNORE INTO simhash_bands (band, value, article_id) VALUES (?, ?, ?)",
+                                     [(band, band_value, article_id) for band, band_value in _bands(value)])
+                results.append({'id': article_id, 'story_id': story_id,
+                                'status': 'new' if story_id == article_id else 'near_duplicate'})
+        return results
+
+    def story(self, story_id):
+        """
+        같은 story 로 묶인 기사들 (출처별로 어디서 먼저 나왔는지 보기용)
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT id, source, url, title, published, first_seen FROM articles "
+                                "WHERE story_id = ? ORDER BY id", (story_id,)).fetchall()
+        return [dict(zip(['id', 'source', 'url', 'title', 'published', 'first_seen'], row)) for row in rows]
+
+    def by_urls(self, urls):
+        """
+        url -> 그 url 로 처음 저장된 기사 {'id', 'story_id', 'url', 'title', 'content', 'published', 'image'}. 없는 url 은 빠짐
+        """
+        columns = ['id', 'story_id', 'url', 'title', 'content', 'published', 'image']
+        articles = {}
+        urls = list(dict.fromkeys(urls))
+        with closing(self._connect()) as conn:
+            for i in range(0, len(urls), 500):  # SQLite 변수 개수 제한
+                chunk = urls[i:i + 500]
+                rows = conn.execute("SELECT %s FROM articles WHERE url IN (%s) ORDER BY id DESC"
+                                    % (', '.join(columns), ', '.join('?' * len(chunk))), chunk)
+                for row in rows:
+                    articles[row[2]] = dict(zip(columns, row))  # id 역순이라 마지막에 남는게 처음 저장된 것
+        return articles
+
+    def search(self, query=None, start=None, end=None, source=None, limit=50, per_story=True):
+        """
+        키워드(query) + 발행일 구간(start/end, UTC 'YYYY-MM-DD[ HH:MM:SS]') 검색. 키워드가 있으면 bm25 순, 없으면 최신순.
+        per_story 면 같은 story 는 제일 잘 맞는 기사 하나만
+        """
+        match = match_query(query)
+        conditions, params = [], []
+        if match:
+            sql = ("SELECT a.id, a.story_id, a.source, a.url, a.title, a.published, a.published_at, "
+                   "bm25(articles_fts, ?, 1.0) AS score FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid")
+            params.append(TITLE_WEIGHT)
+            conditions.append("articles_fts MATCH ?")
+            params.append(match)
+        elif query and query.strip():
+            return []  # 검색어가 있는데 색인 토큰이 하나도 안나오면 (기호만 등) 결과 없음
+        else:
+            sql = ("SELECT a.id, a.story_id, a.source, a.url, a.title, a.published, a.published_at, "
+                   "0.0 AS score FROM articles a")
+        if start:
+            conditions.append("a.published_at >= ?")
+            params.append(start)
+        if end:
+            conditions.append("a.published_at <= ?")
+            params.append(end if len(end) > 10 else end + ' 23:59:59')  # 날짜만 주면 그날 끝까지
+        if source:
+            conditions.append("a.source = ?")
+            params.append(source)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY score, a.published_at DESC"
+        if not per_story:
+            sql += " LIMIT ?"
+            params.append(limit)
+        columns = ['id', 'story_id', 'source', 'url', 'title', 'published', 'published_at', 'score']
+        items, seen = [], set()
+        with closing(self._connect()) as conn:
+            for row in conn.execute(sql, params):
+                item = dict(zip(columns, row))
+                if per_story:
+                    if item['story_id'] in seen:
+                        continue
+                    seen.add(item['story_id'])
+                item['score'] = round(-item['score'], 4) + 0.0  # bm25 는 작을수록 잘 맞는 값이라 뒤집어서 크면 좋은 점수로
+                items.append(item)
+                if len(items) >= limit:
+                    break
+        return items
@@ -0,0 +1,59 @@
+import os
+import re
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from fredCatalog import SeriesCatalog
+
+
+class FakeFred:
+    # last_updated 내림차순으로 페이지를 잘라주는 _do_series_search 흉내
+    root_url = 'https://api.stlouisfed.org/fred'
+    max_results_per_request = 2
+
+    def __init__(self, series):
+        self.series = series  # [(series_id, last_updated), ...]
+        self.calls = 0
+
+    def _do_series_search(self, url):
+        self.calls += 1
+        offset = int(re.search(r'offset=(\d+)', url).group(1))
+        rows = sorted(self.series, key=lambda row: row[1], reverse=True)[offset:offset + self.max_results_per_request]
+        if not rows:
+            return None, len(self.series)
+        data = pd.DataFrame({'title': [series_id for series_id, _ in rows], 'units': 'Percent', 'frequency': 'Daily',
+                             'popularity': 1, 'last_updated': [pd.Timestamp(value) for _, value in rows]},
+                            index=[series_id for series_id, _ in rows])
+        return data, len(self.series)
+
+
+def series_ids(catalog):
+    with catalog._connect() as conn:
+        return sorted(row[0] for row in conn.execute("SELECT series_id FROM series"))
+
+
+def test_watermark_kept_when_scan_stops_at_max_pages(tmp_path):
+    catalog = SeriesCatalog(db_path=str(tmp_path / 'catalog.sqlite'))
+    fred = FakeFred([('S%d' % i, '2024-01-%02d 10:00:00' % (i + 1)) for i in range(6)])
+
+    # 6개 중 2페이지(4개)만 보고 끊김 -> 기준점을 옮기면 S0, S1 은 영영 안 들어옴
+    assert catalog.refresh(fred, text='rates', max_pages=2) == 4
+    assert catalog._watermark('search:rates') is None
+    assert catalog.refresh(fred, text='rates', max_pages=5) == 6
+    assert series_ids(catalog) == ['S%d' % i for i in range(6)]
+    assert catalog._watermark('search:rates') == '2024-01-06 10:00:00'
+
+
+def test_incremental_refresh_stops_at_watermark(tmp_path):
+    catalog = SeriesCatalog(db_path=str(tmp_path / 'catalog.sqlite'))
+    fred = FakeFred([('S%d' % i, '2024-01-%02d 10:00:00' % (i + 1)) for i in range(6)])
+    catalog.refresh(fred, text='rates')
+
+    fred.series.append(('NEW', '2024-02-01 10:00:00'))
+    fred.calls = 0
+    assert catalog.refresh(fred, text='rates') == 1
+    assert fred.calls == 1
+    assert catalog._watermark('search:rates') == '2024-02-01 10:00:00'
+    assert catalog.contains('NEW')
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from newsStore import NewsStore, dedupe_stories
+
+ARTICLE = ('Treasury yields rose sharply on Tuesday after stronger than expected retail sales data pushed traders '
+           'to scale back bets on a rate cut by the Federal Reserve at its June policy meeting this year')
+EDITED = ARTICLE.replace('sharply', 'strongly')
+OTHER = ('Oil prices slipped as OPEC members signalled they could raise output next quarter while demand from '
+         'China stayed weak and inventories in the United States climbed for a third straight week')
+
+
+def make_store(tmp_path):
+    return NewsStore(db_path=str(tmp_path / 'news.sqlite'))
+
+
+def test_one_word_edit_is_near_duplicate(tmp_path):
+    store = make_store(tmp_path)
+    first, edited, other = store.add('test', [{'title': 'Yields rise', 'content': ARTICLE},
+                                              {'title': 'Yields rise', 'content': EDITED},
+                                              {'title': 'Oil slips', 'content': OTHER}])
+    assert first['status'] == 'new'
+    assert edited['status'] == 'near_duplicate' and edited['story_id'] == first['story_id']
+    assert other['status'] == 'new' and other['story_id'] != first['story_id']
+    assert store.add('test', [{'title': 'Yields rise', 'content': ARTICLE}])[0]['status'] == 'duplicate'
+
+
+def test_empty_articles_are_not_duplicates(tmp_path):
+    store = make_store(tmp_path)
+    results = store.add('test', [{'title': '', 'content': None}, {'title': None, 'content': '<p></p>'}])
+    assert [result['status'] for result in results] == ['new', 'new']
+    assert results[0]['story_id'] != results[1]['story_id']
+
+
+def test_dedupe_stories():
+    articles = [{'title': 'Yields rise', 'content': ARTICLE}, {'title': 'Yields rise', 'content': EDITED},
+                {'title': '', 'content': ''}, {'title': '', 'content': ''}, {'title': 'Oil slips', 'content': OTHER}]
+    assert dedupe_stories(articles) == [articles[0], articles[2], articles[3], articles[4]]
+
+
+def test_search_one_syllable_korean(tmp_path):
+    store = make_store(tmp_path)
+    store.add('test', [{'title': '금리 인상 우려에 금값 하락', 'content': '국채 금리가 올랐다'},
+                       {'title': '환율 급등', 'content': '달러 강세'}])
+    assert [item['title'] for item in store.search('금')] == ['금리 인상 우려에 금값 하락']
+    assert [item['title'] for item in store.search('금리')] == ['금리 인상 우려에 금값 하락']
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from yieldCurve import TENORS, YieldCurve
+
+
+class FakeStore:
+    # 만기별로 따로 갱신되는 series store 흉내
+    def __init__(self):
+        self.series = {series_id: pd.Series(dtype=float) for _, series_id in TENORS}
+        self.versions = {}
+
+    def update(self, series_id, values):
+        self.series[series_id] = pd.Series(list(values.values()), index=pd.to_datetime(list(values)), dtype=float)
+        self.versions[series_id] = self.versions.get(series_id, 0) + 1
+
+    def get_series(self, series_id):
+        return self.series[series_id]
+
+    def version(self, series_id):
+        return self.versions.get(series_id)
+
+
+def test_tenors_updated_one_after_another():
+    store = FakeStore()
+    curve = YieldCurve(store)
+    store.update('DGS2', {'2024-01-05': 4.4})
+    store.update('DGS10', {'2024-01-05': 4.0})
+    curve.refresh()
+
+    # 2Y 가 먼저 2024-01-08 을 추가하고, 10Y 는 그 다음 refresh 에서 같은 날짜를 추가
+    store.update('DGS2', {'2024-01-05': 4.4, '2024-01-08': 4.3})
+    curve.refresh()
+    store.update('DGS10', {'2024-01-05': 4.0, '2024-01-08': 3.5})
+    curve.refresh()
+
+    frame = curve.frame(tenors=['2Y', '10Y'])
+    assert list(frame.index.strftime('%Y-%m-%d')) == ['2024-01-05', '2024-01-08']
+    assert frame.loc['2024-01-08', '10Y'] == 3.5
+    assert round(curve.spread().loc['2024-01-08'], 4) == -0.8
+
+
+def test_revision_of_existing_row():
+    store = FakeStore()
+    curve = YieldCurve(store)
+    store.update('DGS10', {'2024-01-05': 4.0, '2024-01-08': 4.1})
+    curve.refresh()
+    store.update('DGS10', {'2024-01-05': 3.9, '2024-01-08': 4.1})
+    curve.refresh()
+
+    assert curve.frame(tenors=['10Y'])['10Y'].tolist() == [3.9, 4.1]
+    assert curve.snapshot('2024-01-06')['10Y'] == 3.9
+    assert np.isnan(curve.snapshot()['2Y'])
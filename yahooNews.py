@@ -1,26 +1,252 @@
-import requests
-from bs4 import BeautifulSoup
+#Seeking Alpha 헤드라인 검색 + 기사 크롤러 (비동기)
+#검색 결과 페이지에서 기사 링크를 모으고, 정해진 수의 worker 가 큐에서 기사 url 을 꺼내 받아온다.
+#- 호스트별 요청 간격 제한 (HostRateLimiter)
+#- 조건부 GET: 지난번 받은 ETag / Last-Modified 를 보내서 안 바뀐 페이지는 304 로 끝냄
+#- 이미 받아본 기사 url(seen)은 다시 받지 않음 -> 다시 돌리면 새 기사만 받아옴
+#상태(seen, 검증값, 검색 페이지별 기사 링크)는 newsCache/crawler_state.json 에 남는다. 결과의 data 는 이번에 새로 받은 기사만
+#(RapidAPI news/v2/list 응답과 같은 모양이라 newbond 의 collect_seeking_alpha 로 저장소에 넣음), links 는 검색 결과 전체 기사 url 이라
+#이미 받아둔 기사는 저장소(newsStore)에서 꺼내서 키워드의 전체 목록을 만든다. 벤치마크는 bench/bench_crawler.py
+import asyncio
+import json
+import os
+import re
+import time
+from urllib.parse import quote, urljoin, urlsplit
 
-def requests_get(url):
+from bs4 import BeautifulSoup, SoupStrainer
+
+from aioUtil import cpu_executor, run_in
+from httpPool import HttpPool
+
+BASE_URL = 'https://seekingalpha.com'
+STATE_PATH = os.path.join('newsCache', 'crawler_state.json')
+MAX_SEEN = 5000  # 상태 파일이 끝없이 커지지 않게 최근 것만
+MAX_SEARCHES = 200  # 링크 목록을 기억해두는 검색 페이지 수 (최근 것만)
+HEADERS = {'User-Agent': 'Mozilla/5.0 (compatible; AIPilot news crawler)'}
+
+ARTICLE_ID = re.compile(r'/(?:news|article)/(\d+)')
+SEARCH_LINKS = SoupStrainer('a', attrs={'data-test-id': 'post-list-item-title'})
+
+
+class HostRateLimiter:
+    """
+    호스트마다 초당 rate 번까지만 요청이 나가도록 다음 요청 시각을 잡아준다
+    """
+    def __init__(self, rate=2.0):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = {}
+        self._locks = {}
+
+    async def wait(self, host):
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            self._next[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+def load_state(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        state = {}
+    return {'seen': list(state.get('seen', [])), 'validators': dict(state.get('validators', {})),
+            'retry': list(state.get('retry', [])), 'links': dict(state.get('links', {}))}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        links = dict(list(state['links'].items())[-MAX_SEARCHES:])
+        validators = {url: value for url, value in state['validators'].items() if url in links}
+        json.dump({'seen': state['seen'][-MAX_SEEN:], 'validators': validators, 'retry': state['retry'], 'links': links}, f)
+    os.replace(tmp_path, path)  # 쓰다가 죽어도 이전 상태 파일은 안 깨지게
+
+
+def _meta(soup, **attrs):
+    tag = soup.find('meta', attrs=attrs)
+    return tag.get('content') if tag is not None else None
+
+
+def parse_search_page(html, base_url=BASE_URL):
+    soup = BeautifulSoup(html, 'lxml', parse_only=SEARCH_LINKS)
+    links = [urljoin(base_url, a['href']) for a in soup.find_all('a', href=True)]
+    return list(dict.fromkeys(links))
+
+
+def news_item(url, title, content, published, image):
+    """
+    news/v2/list 의 항목과 같은 모양 ({'id', 'type', 'attributes': {...}, 'links': {'self'}})
+    """
+    match = ARTICLE_ID.search(urlsplit(url).path)
+    return {
+        'id': match.group(1) if match else url,
+        'type': 'news',
+        'attributes': {'publishOn': published, 'gettyImageUrl': image, 'title': title, 'content': content},
+        'links': {'self': urlsplit(url).path},
+    }
+
+
+def parse_article(html, url):
+    soup = BeautifulSoup(html, 'lxml')
+    body = soup.select_one('[data-test-id="content-container"]') or soup.find('article')
+    title = _meta(soup, property='og:title') or (soup.h1.get_text(strip=True) if soup.h1 else None)
+    published = _meta(soup, property='article:published_time')
+    if published is None and soup.find('time', datetime=True) is not None:
+        published = soup.find('time', datetime=True)['datetime']
+    return news_item(url, title, body.decode_contents().strip() if body is not None else None,
+                     published, _meta(soup, property='og:image'))
+
+
+class NewsCrawler:
+    """
+    검색 페이지들 -> 기사 url 큐 -> worker 들이 받아서 파싱. crawl() 은 이번에 새로 받은 기사들(data), 검색 결과 전체 기사 url(links),
+    통계(meta)를 돌려준다. 상태를 같이 쓰므로 crawl 은 한번에 하나씩만 돈다
+    """
+    def __init__(self, pool=None, workers=8, rate=2.0, state_path=STATE_PATH, base_url=BASE_URL):
+        self.pool = pool or HttpPool()
+        self._own_pool = pool is None
+        self.workers = workers
+        self.limiter = HostRateLimiter(rate)
+        self.state_path = state_path
+        self.base_url = base_url
+        self.state = load_state(state_path) if state_path else {'seen': [], 'validators': {}, 'retry': [], 'links': {}}
+        self._seen = set(self.state['seen'])
+        self._lock = asyncio.Lock()
+
+    async def _fetch(self, url, remember=True):
+        """
+        조건부 GET. 안 바뀌었으면(304) None, 바뀌었으면 본문 텍스트.
+        기사는 seen 으로 다시 안 받으므로 검증값은 검색 페이지(remember=True)만 남긴다
+        """
+        headers = dict(HEADERS)
+        validator = self.state['validators'].get(url, {})
+        if validator.get('etag'):
+            headers['If-None-Match'] = validator['etag']
+        if validator.get('last_modified'):
+            headers['If-Modified-Since'] = validator['last_modified']
+        await self.limiter.wait(urlsplit(url).hostname)
+        response = await self.pool.get(url, headers=headers)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        etag, last_modified = response.headers.get('etag'), response.headers.get('last-modified')
+        if remember and (etag or last_modified):
+            self.state['validators'][url] = {'etag': etag, 'last_modified': last_modified}
+        return response.text
+
+    def search_url(self, keyword, page=1):
+        url = '%s/search?q=%s&tab=headlines' % (self.base_url, quote(keyword))
+        return url if page == 1 else '%s&page=%d' % (url, page)
+
+    async def _worker(self, queue, articles, stats, retry):
+        while True:
+            url = await queue.get()
+            try:
+                html = await self._fetch(url, remember=False)
+                if html is None:
+                    stats['not_modified'] += 1
+                else:
+                    articles.append(await run_in(cpu_executor, parse_article, html, url))
+                    stats['fetched'] += 1
+                self._seen.add(url)
+                self.state['seen'].append(url)
+            except Exception as e:
+                # 기사 하나 실패는 건너뛰고 다음번에 다시 시도 (검색 페이지가 304 여도 retry 에서 다시 꺼냄)
+                stats['errors'] += 1
+                stats.setdefault('failed', []).append('%s: %s' % (url, e))
+                retry.append(url)
+            finally:
+                queue.task_done()
+
+    async def _search(self, url):
+        """
+        검색 페이지 하나의 기사 url 목록. 안 바뀌었으면(304) 지난번 목록
+        """
+        if url not in self.state['links']:
+            self.state['validators'].pop(url, None)  # 링크 목록이 없으면 304 를 받아도 쓸 게 없으니 전체를 받음
+        html = await self._fetch(url)
+        if html is None:
+            return None, self.state['links'][url]
+        links = parse_search_page(html, self.base_url)
+        self.state['links'].pop(url, None)
+        self.state['links'][url] = links  # 최근 것이 뒤로 (save_state 에서 오래된 것부터 버림)
+        return html, links
+
+    async def crawl(self, keyword, pages=1):
+        async with self._lock:
+            return await self._crawl(keyword, pages)
+
+    async def _crawl(self, keyword, pages):
+        started = time.perf_counter()
+        stats = {'search_pages': 0, 'search_not_modified': 0, 'links': 0, 'skipped_seen': 0,
+                 'fetched': 0, 'not_modified': 0, 'errors': 0}
+        queue = asyncio.Queue()
+        articles = []
+        queued = set()  # 여러 검색 페이지에 같은 기사가 있어도 한번만
+        links = []  # 검색 결과 전체 (이미 본 기사 포함, 순서대로)
+        retry = []
+        workers = [asyncio.create_task(self._worker(queue, articles, stats, retry)) for _ in range(self.workers)]
+        try:
+            for url in self.state['retry']:
+                if url not in self._seen and url not in queued:
+                    queued.add(url)
+                    queue.put_nowait(url)
+            search_pages = await asyncio.gather(*[self._search(self.search_url(keyword, page)) for page in range(1, pages + 1)],
+                                                return_exceptions=True)
+            for result in search_pages:
+                if isinstance(result, Exception):
+                    stats['errors'] += 1
+                    stats.setdefault('failed', []).append('search: %s' % result)
+                    continue
+                html, page_links = result
+                links.extend(url for url in page_links if url not in links)
+                if html is None:
+                    stats['search_not_modified'] += 1  # 검색 결과가 안 바뀌었으면 새 기사도 없음
+                    continue
+                stats['search_pages'] += 1
+                for url in page_links:
+                    stats['links'] += 1
+                    if url in self._seen:
+                        stats['skipped_seen'] += 1
+                    elif url not in queued:
+                        queued.add(url)
+                        queue.put_nowait(url)
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # 실패했거나 중간에 멈춰서 못 받은 기사는 다음번에
+            self.state['retry'] = retry + [url for url in queued if url not in self._seen and url not in retry]
+            if self.state_path:
+                save_state(self.state_path, self.state)
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        return {'data': articles, 'links': links, 'meta': stats}
+
+    async def aclose(self):
+        if self._own_pool:
+            await self.pool.aclose()
+
+
+async def crawl_finance_news(keyword, pages=1, **kwargs):
+    crawler = NewsCrawler(**kwargs)
     try:
-        return requests.get(url)
-    except Exception as e:
-        print(f"Exception occurred while trying to get url: {url}, error: {str(e)}")
-        return None
+        return await crawler.crawl(keyword, pages)
+    finally:
+        await crawler.aclose()
+
 
 def scrape_finance_news(keyword):
-    encoded_keyword = requests.utils.quote(keyword)
-    search_url = f'https://seekingalpha.com/search?q={encoded_keyword}&tab=headlines'
-    response = requests_get(search_url)
-    if response:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        link_elements = soup.select('a[data-test-id="post-list-item-title"]')
-        for link in link_elements:
-            article_url = "https://seekingalpha.com" + link['href']
-            print("Article URL:", article_url)
-            # 여기에서 추가적으로 각 기사 URL에 대한 스크랩 로직을 구현할 수 있습니다.
-    else:
-        print("Failed to retrieve news")
+    result = asyncio.run(crawl_finance_news(keyword))
+    for item in result['data']:
+        print("Article:", item['attributes']['title'], BASE_URL + item['links']['self'])
+    print("Stats:", result['meta'])
+
 
 if __name__ == '__main__':
     keyword = "international bonds"
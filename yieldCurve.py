@@ -0,0 +1,130 @@
+#미국채 수익률곡선 엔진
+#전 만기(1M~30Y) FRED 시리즈를 날짜 x 만기 numpy 행렬 하나로 들고 있으면서, 스냅샷/스프레드/역전구간/곡선변화를
+#행렬 위의 벡터 연산으로 계산한다. 어느 만기든 store 버전이 바뀌면 행렬을 다시 만든다.
+import threading
+
+import numpy as np
+import pandas as pd
+
+# (만기 라벨, FRED series id)
+TENORS = [('1M', 'DGS1MO'), ('3M', 'DGS3MO'), ('6M', 'DGS6MO'), ('1Y', 'DGS1'), ('2Y', 'DGS2'), ('3Y', 'DGS3'),
+          ('5Y', 'DGS5'), ('7Y', 'DGS7'), ('10Y', 'DGS10'), ('20Y', 'DGS20'), ('30Y', 'DGS30')]
+
+
+class YieldCurve:
+    """
+    series store 위에서 동작하는 수익률곡선. matrix 는 원본(휴장일/미발행 만기는 NaN), filled 는 만기별로 직전 값을 채운 것.
+    """
+    def __init__(self, store, tenors=TENORS, executor=None):
+        self.store = store
+        self.labels = [label for label, _ in tenors]
+        self.series_ids = [series_id for _, series_id in tenors]
+        self.executor = executor
+        self.dates = np.array([], dtype='datetime64[ns]')
+        self.matrix = np.empty((0, len(tenors)))
+        self.filled = self.matrix
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def _column(self, label):
+        return self.labels.index(label)
+
+    def refresh(self):
+        """
+        만기별 시리즈를 store 에서 읽고(신선하면 네트워크 없음), 바뀐 게 있을때만 행렬을 다시 만든다
+        """
+        get = self.store.get_series
+        if self.executor is not None:
+            series = list(self.executor.map(get, self.series_ids))
+        else:
+            series = [get(series_id) for series_id in self.series_ids]
+        with self._lock:
+            versions = [self.store.version(series_id) for series_id in self.series_ids]
+            if versions == self._versions:
+                return self
+            # 만기별로 따로 갱신되므로 늦게 들어온 만기의 과거 날짜 값이나 기존 행의 수정치도 반영되도록 전체를 다시 만든다 (열 11개라 가벼움)
+            dates = pd.DatetimeIndex(sorted(set().union(*(s.index for s in series))))
+            matrix = np.column_stack([s.reindex(dates).to_numpy(dtype=np.float64) for s in series]) if len(dates) \
+                else np.empty((0, len(series)))
+            self.dates = dates.to_numpy()
+            self.matrix = matrix
+            self.filled = pd.DataFrame(matrix).ffill().to_numpy()
+            self._versions = versions
+        return self
+
+    def _rows(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.dates, pd.Timestamp(start).to_datetime64())
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, pd.Timestamp(end).to_datetime64(), side='right')
+        return slice(lo, hi)
+
+    def frame(self, start=None, end=None, tenors=None):
+        """
+        기간/만기를 골라 날짜 x 만기 DataFrame 으로 (원본 값, NaN 유지)
+        """
+        rows = self._rows(start, end)
+        tenors = self.labels if tenors is None else list(tenors)
+        columns = [self._column(label) for label in tenors]
+        return pd.DataFrame(self.matrix[rows][:, columns], index=pd.DatetimeIndex(self.dates[rows], name='date'),
+                            columns=tenors)
+
+    def snapshot(self, date=None):
+        """
+        date 시점(없으면 최신)의 곡선. 그날 값이 없는 만기는 직전 값
+        """
+        if not len(self.dates):
+            return pd.Series(np.nan, index=self.labels)
+        row = len(self.dates) - 1 if date is None else np.searchsorted(self.dates, pd.Timestamp(date).to_datetime64(), side='right') - 1
+        if row < 0:
+            return pd.Series(np.nan, index=self.labels)
+        return pd.Series(self.filled[row], index=self.labels, name=pd.Timestamp(self.dates[row]))
+
+    def spread(self, long='10Y', short='2Y', start=None, end=None):
+        """
+        두 만기 사이 스프레드(%p). 휴장일 행은 빼고 돌려줌
+        """
+        rows = self._rows(start, end)
+        values = self.matrix[rows, self._column(long)] - self.matrix[rows, self._column(short)]
+        spread = pd.Series(values, index=pd.DatetimeIndex(self.dates[rows], name='date'), name=f'{long}-{short}')
+        return spread.dropna()
+
+    def inversions(self, long='10Y', short='2Y', start=None, end=None, min_days=1):
+        """
+        스프레드가 음수였던 구간들 [{start, end, days, min_spread}, ...]
+        """
+        spread = self.spread(long, short, start, end)
+        inverted = (spread.to_numpy() < 0).astype(np.int8)
+        edges = np.diff(np.r_[0, inverted, 0])
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)  # ends 는 구간 다음 위치
+        values = spread.to_numpy()
+        episodes = []
+        for lo, hi in zip(starts, ends):
+            if hi - lo < min_days:
+                continue
+            episodes.append({
+                'start': spread.index[lo].strftime('%Y-%m-%d'),
+                'end': spread.index[hi - 1].strftime('%Y-%m-%d'),
+                'days': int(hi - lo),
+                'min_spread': round(float(values[lo:hi].min()), 4),
+            })
+        return episodes
+
+    def shape_delta(self, date_from, date_to=None):
+        """
+        두 시점 사이 곡선 변화. 만기별 변화(%p)와 수준(평균)/기울기(10Y-3M)/곡률(2*5Y-2Y-10Y) 변화
+        """
+        before, after = self.snapshot(date_from), self.snapshot(date_to)
+
+        def shape(curve):
+            return {'level': curve.mean(), 'slope': curve['10Y'] - curve['3M'],
+                    'curvature': 2 * curve['5Y'] - curve['2Y'] - curve['10Y']}
+
+        def rounded(value):
+            return None if pd.isna(value) else round(float(value), 4)
+
+        shape_before, shape_after = shape(before), shape(after)
+        return {
+            'from': before.name.strftime('%Y-%m-%d') if before.name is not None else None,
+            'to': after.name.strftime('%Y-%m-%d') if after.name is not None else None,
+            'tenors': {label: rounded(value) for label, value in (after - before).items()},
+            'shape': {key: rounded(shape_after[key] - shape_before[key]) for key in shape_after},
+        }